@@ -7,31 +7,49 @@ set -e
 WORKERS="${WORKERS:-4}"
 KEEP_ALIVE="${KEEP_ALIVE:-300}"
 PORT="${PORT:-8080}"
-MAX_REQUESTS="${MAX_REQUESTS:-1000}"
-
-# Create Xvfb socket directory if it doesn't exist
-XVFB_DIR="/tmp/.X11-unix"
-if [ ! -d "$XVFB_DIR" ]; then
-    mkdir -p "$XVFB_DIR"
+# Browsers are recycled in-process (see BROWSER_MAX_*), so worker restarts are opt-in
+MAX_REQUESTS="${MAX_REQUESTS:-}"
+
+# The browser extensions need a headed browser, and so a virtual X server.
+# By default the popup and cookie blockers run headless as init scripts.
+if [ "${USE_BROWSER_EXTENSIONS:-false}" = "true" ]; then
+    # Create Xvfb socket directory if it doesn't exist
+    XVFB_DIR="/tmp/.X11-unix"
+    if [ ! -d "$XVFB_DIR" ]; then
+        mkdir -p "$XVFB_DIR"
+    fi
+
+    # Start Xvfb with suppressed warnings
+    Xvfb :99 -screen 0 1280x1024x24 2>/dev/null &
+    export DISPLAY=:99
+
+    # Wait for Xvfb to be ready
+    sleep 1
 fi
 
-# Start Xvfb with suppressed warnings
-Xvfb :99 -screen 0 1280x1024x24 2>/dev/null &
-export DISPLAY=:99
-
-# Wait for Xvfb to be ready
-sleep 1
-
 echo "Starting server on port $PORT with $WORKERS workers"
 
 # Set environment variables
 export PYTHONPATH=/app
 export PYTHONUNBUFFERED=1
 
+# Optionally share one browser between all workers instead of one per worker
+if [ "${SHARED_BROWSER:-false}" = "true" ]; then
+    export BROWSER_SERVER_PORT="${BROWSER_SERVER_PORT:-9222}"
+    export BROWSER_CDP_ENDPOINT="${BROWSER_CDP_ENDPOINT:-http://127.0.0.1:$BROWSER_SERVER_PORT}"
+    echo "Starting shared browser on port $BROWSER_SERVER_PORT"
+    python browser_server.py &
+fi
+
+HYPERCORN_ARGS=()
+if [ -n "$MAX_REQUESTS" ]; then
+    HYPERCORN_ARGS+=(--max-requests "$MAX_REQUESTS")
+fi
+
 # Use hypercorn to run the application
 exec hypercorn app:app \
     --bind "0.0.0.0:$PORT" \
     --workers "$WORKERS" \
     --keep-alive "$KEEP_ALIVE" \
     --graceful-timeout 30 \
-    --max-requests "$MAX_REQUESTS"
\ No newline at end of file
+    "${HYPERCORN_ARGS[@]}"
\ No newline at end of file
@@ -0,0 +1,97 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+from exceptions import CapacityExceededException
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded wait queue in front of the capture service.
+
+    At most `max_concurrency` captures run at once and at most `max_queue` wait
+    for a slot. A capture that finds the queue full, or waits longer than
+    `max_wait` seconds, is rejected with a CapacityExceededException carrying a
+    Retry-After estimate instead of piling more pages onto the browser.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, max_wait: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait_time = 0.0
+        self.last_wait_time = 0.0
+        self._avg_service_time = 1.0
+
+    @property
+    def saturated(self) -> bool:
+        """Whether a new capture would be rejected: every slot is taken and the queue is full."""
+        return self._semaphore.locked() and self.waiting >= self.max_queue
+
+    def retry_after(self) -> int:
+        """Estimate the seconds until a slot frees up, from the queue depth and service time."""
+        backlog = (self.waiting + 1) / max(1, self.max_concurrency)
+        return max(1, math.ceil(backlog * self._avg_service_time))
+
+    @asynccontextmanager
+    async def admit(self, max_wait: Optional[float] = None):
+        """
+        Hold a capture slot for the duration of the `async with` block.
+
+        `max_wait` (seconds) shortens the queue wait, e.g. to what is left of the request's deadline.
+        """
+        wait = self.max_wait if max_wait is None else min(self.max_wait, max_wait)
+        if self.saturated:
+            self.rejected += 1
+            raise CapacityExceededException("Capture queue is full", retry_after=self.retry_after())
+
+        start = time.monotonic()
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=wait)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise CapacityExceededException(
+                    f"No capture slot became available within {round(wait, 2)}s",
+                    retry_after=self.retry_after()
+                )
+            finally:
+                self.waiting -= 1
+
+        wait_time = time.monotonic() - start
+        self.admitted += 1
+        self.total_wait_time += wait_time
+        self.last_wait_time = wait_time
+        self.active += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+            # Exponential moving average keeps Retry-After responsive to load changes
+            self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * (time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'active': self.active,
+            'max_concurrency': self.max_concurrency,
+            'queue_depth': self.waiting,
+            'max_queue': self.max_queue,
+            'saturated': self.saturated,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'avg_wait_ms': round(self.total_wait_time / self.admitted * 1000, 2) if self.admitted else 0.0,
+            'last_wait_ms': round(self.last_wait_time * 1000, 2),
+            'avg_service_ms': round(self._avg_service_time * 1000, 2)
+        }
@@ -10,11 +10,15 @@ from quart import Quart
 from quart_rate_limiter import RateLimiter
 from playwright.async_api import async_playwright
 
+from admission_controller import AdmissionController
+from blob_store import BlobStore
 from cache_manager import CacheManager
 from config import config, get_logging_config
 from capture_service import CaptureService
+from capture_workers import CaptureWorkerPool
 from routes import register_routes
 from context_manager import ContextManager
+from context_pool import default_pool_size
 
 logger = logging.getLogger(__name__)
 
@@ -26,19 +30,44 @@ class AppContainer:
         self.capture_service = None
         self.cache_manager = None
         self.rate_limiter = None
+        self.admission_controller = None
 
     async def initialize(self):
         try:
-            # Start playwright
-            self.playwright = await async_playwright().start()
-
-            # Initialize capture service
-            self.capture_service = CaptureService()
-            await self.capture_service.initialize(self.playwright)
+            if config.CAPTURE_WORKERS > 0:
+                # Run captures in dedicated worker processes, each with its own browser
+                self.capture_service = CaptureWorkerPool(config.CAPTURE_WORKERS)
+                await self.capture_service.initialize()
+            else:
+                # Start playwright
+                self.playwright = await async_playwright().start()
+
+                # Initialize capture service
+                self.capture_service = CaptureService()
+                await self.capture_service.initialize(self.playwright)
+
+            # Limit concurrent captures to what the browser contexts can serve
+            if config.CAPTURE_WORKERS > 0:
+                contexts = self.capture_service.pool_size * self.capture_service.size
+            else:
+                contexts = config.CONTEXT_POOL_SIZE or default_pool_size()
+            max_concurrency = config.MAX_CONCURRENT_CAPTURES or contexts
+            self.admission_controller = AdmissionController(
+                max_concurrency=max_concurrency,
+                max_queue=config.MAX_QUEUED_CAPTURES,
+                max_wait=config.MAX_QUEUE_WAIT_SECONDS
+            )
 
-            # Initialize cache manager
+            # Initialize the capture cache (disabled unless CACHE_MAX_MB or CACHE_DIR is set)
+            disk_store = None
+            if config.CACHE_DIR:
+                os.makedirs(config.CACHE_DIR, exist_ok=True)
+                disk_store = BlobStore(config.CACHE_DIR, config.CACHE_DISK_MAX_MB * 1024 * 1024)
             self.cache_manager = CacheManager(
-                max_size=config.CACHE_MAX_SIZE if config.CACHE_MAX_SIZE > 0 else None
+                max_bytes=config.CACHE_MAX_MB * 1024 * 1024,
+                default_ttl=config.CACHE_TTL_SECONDS,
+                max_entries=config.CACHE_MAX_SIZE,
+                disk_store=disk_store
             )
         except Exception as e:
             logger.error(f"Failed to initialize AppContainer: {str(e)}")
@@ -47,6 +76,8 @@ class AppContainer:
     async def close(self):
         if self.capture_service:
             await self.capture_service.close()
+        if self.cache_manager:
+            self.cache_manager.close()
         if self.playwright:
             await self.playwright.stop()
 
@@ -63,9 +94,10 @@ def create_app():
     container.rate_limiter = RateLimiter(app)
 
     # Configure caching
-    app.config['CACHING_ENABLED'] = config.CACHE_MAX_SIZE > 0
+    app.config['CACHING_ENABLED'] = config.CACHE_MAX_MB > 0 or bool(config.CACHE_DIR)
     if app.config['CACHING_ENABLED']:
-        app.logger.info(f"Caching enabled with max size: {config.CACHE_MAX_SIZE}")
+        disk_tier = f", {config.CACHE_DISK_MAX_MB}MB on disk at {config.CACHE_DIR}" if config.CACHE_DIR else ""
+        app.logger.info(f"Caching enabled with max size: {config.CACHE_MAX_MB}MB in memory{disk_tier}")
     else:
         app.logger.info("Caching disabled")
 
@@ -0,0 +1,255 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    meta TEXT NOT NULL,
+    expires_at REAL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest);
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO usage (id, bytes) VALUES (0, 0);
+"""
+
+# Blob files written but never indexed (a crash in between) are removed after this long
+ORPHAN_AGE_SECONDS = 3600
+
+# last_access is only rewritten when it's older than this, to keep reads mostly read-only
+TOUCH_INTERVAL_SECONDS = 1.0
+
+
+class BlobStore:
+    """
+    A size-capped, content-addressed store on local disk, shared between processes.
+
+    Values are written once to `<dir>/blobs/<digest[:2]>/<digest>` with an atomic
+    rename, so identical content stored under different keys takes the space of
+    one file. A SQLite index in WAL mode maps keys to digests, metadata and expiry,
+    and lets every worker on the host read and write the store concurrently.
+    Reads go through `mmap`. Least recently used entries are evicted once the
+    blobs exceed `max_bytes`.
+
+    Methods block on disk I/O; call them from a thread in async code.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(directory, 'blobs')
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, 'index.sqlite3'), timeout=10,
+                                   isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        with self._lock:
+            self._db.executescript(SCHEMA)
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.sweep()
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def _read_blob(self, digest: str) -> Optional[bytes]:
+        """The blob's content, or None if another process evicted it since it was looked up."""
+        try:
+            with open(self._blob_path(digest), 'rb') as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    return b''
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return mapped[:]
+        except (FileNotFoundError, ValueError):
+            # ValueError: mmap found the file emptied under it
+            return None
+
+    def _write_blob(self, digest: str, data: bytes):
+        path = self._blob_path(digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written next to its final path and renamed, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def get(self, key: str) -> Optional[Tuple[bytes, Dict[str, Any]]]:
+        """The value and metadata stored under `key`, or None if it's missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                'SELECT digest, meta, expires_at, last_access FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or (row[2] is not None and row[2] <= now):
+                self.misses += 1
+                return None
+            if now - row[3] > TOUCH_INTERVAL_SECONDS:
+                self._db.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+
+        data = self._read_blob(row[0])
+        if data is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return data, json.loads(row[1])
+
+    def put(self, key: str, data: bytes, meta: Optional[Dict[str, Any]] = None,
+            ttl_seconds: Optional[float] = None) -> str:
+        """Store `data` under `key`, replacing any previous value. Returns its digest."""
+        if len(data) > self.max_bytes:
+            return ''
+        digest = hashlib.sha256(data).hexdigest()
+        self._write_blob(digest, data)
+
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds is not None else None
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                previous = self._db.execute('SELECT digest FROM entries WHERE key = ?', (key,)).fetchone()
+                self._db.execute(
+                    'INSERT OR REPLACE INTO entries (key, digest, meta, expires_at, last_access) VALUES (?, ?, ?, ?, ?)',
+                    (key, digest, json.dumps(meta or {}), expires_at, now)
+                )
+                if self._db.execute('INSERT OR IGNORE INTO blobs (digest, size) VALUES (?, ?)',
+                                    (digest, len(data))).rowcount:
+                    self._db.execute('UPDATE usage SET bytes = bytes + ? WHERE id = 0', (len(data),))
+                removed = []
+                if previous and previous[0] != digest:
+                    removed += self._release_blob(previous[0])
+                removed += self._evict()
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self.writes += 1
+
+        self._unlink(removed)
+        # Another process may have evicted the same content between our write and our commit
+        if not os.path.exists(self._blob_path(digest)):
+            self._write_blob(digest, data)
+        return digest
+
+    def delete(self, key: str):
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._db.execute('SELECT digest FROM entries WHERE key = ?', (key,)).fetchone()
+                self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                removed = self._release_blob(row[0]) if row else []
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+        self._unlink(removed)
+
+    def _release_blob(self, digest: str) -> list:
+        """Drop a blob from the index once no entry refers to it. Returns the digests to unlink."""
+        if self._db.execute('SELECT 1 FROM entries WHERE digest = ? LIMIT 1', (digest,)).fetchone():
+            return []
+        row = self._db.execute('SELECT size FROM blobs WHERE digest = ?', (digest,)).fetchone()
+        if row is None:
+            return []
+        self._db.execute('DELETE FROM blobs WHERE digest = ?', (digest,))
+        self._db.execute('UPDATE usage SET bytes = bytes - ? WHERE id = 0', (row[0],))
+        return [digest]
+
+    def _evict(self) -> list:
+        """Delete expired, then least recently used, entries until the blobs fit in `max_bytes`."""
+        removed = []
+        used = self._db.execute('SELECT bytes FROM usage WHERE id = 0').fetchone()[0]
+        while used > self.max_bytes:
+            batch = self._db.execute(
+                'SELECT key, digest FROM entries '
+                'ORDER BY (expires_at IS NOT NULL AND expires_at <= ?) DESC, last_access LIMIT 64',
+                (time.time(),)
+            ).fetchall()
+            if not batch:
+                break
+            for key, digest in batch:
+                self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self.evictions += 1
+                removed += self._release_blob(digest)
+                used = self._db.execute('SELECT bytes FROM usage WHERE id = 0').fetchone()[0]
+                if used <= self.max_bytes:
+                    break
+        return removed
+
+    def _unlink(self, digests: list):
+        for digest in digests:
+            try:
+                os.unlink(self._blob_path(digest))
+            except FileNotFoundError:
+                pass
+
+    def sweep(self):
+        """Remove temporary and unindexed blob files left behind by crashed writers."""
+        cutoff = time.time() - ORPHAN_AGE_SECONDS
+        with self._lock:
+            indexed = {row[0] for row in self._db.execute('SELECT digest FROM blobs')}
+        for root, _, files in os.walk(self.blob_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if name not in indexed and os.path.getmtime(path) < cutoff:
+                        os.unlink(path)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+            used = self._db.execute('SELECT bytes FROM usage WHERE id = 0').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'bytes': used,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+            'writes': self.writes,
+            'evictions': self.evictions
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
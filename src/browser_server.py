@@ -0,0 +1,72 @@
+"""
+Run a single Chromium for every worker on the host to share.
+
+Started by entry.sh when SHARED_BROWSER is enabled. Each hypercorn worker
+connects to it over CDP (see BROWSER_CDP_ENDPOINT) instead of launching its
+own browser, and reconnects if it is restarted.
+"""
+import logging
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from logging.config import dictConfig
+
+from playwright.sync_api import sync_playwright
+
+from config import config, get_logging_config
+from context_manager import enabled_extensions, get_browser_args
+
+logger = logging.getLogger(__name__)
+
+RESTART_DELAY_SECONDS = 1
+
+
+def get_server_args(port: int, user_data_dir: str):
+    """Get the command line for a headless Chromium listening for CDP connections."""
+    return [
+        '--headless=new',
+        f'--remote-debugging-port={port}',
+        '--remote-debugging-address=127.0.0.1',
+        f'--user-data-dir={user_data_dir}',
+        '--no-first-run',
+        '--no-default-browser-check',
+        *get_browser_args(enabled_extensions()),
+        'about:blank'
+    ]
+
+
+def main():
+    dictConfig(get_logging_config())
+
+    with sync_playwright() as playwright:
+        executable = playwright.chromium.executable_path
+
+    stopping = False
+    process = None
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        if process and process.poll() is None:
+            process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    with tempfile.TemporaryDirectory(prefix='pixashot-browser-') as user_data_dir:
+        while not stopping:
+            logger.info(f"Starting shared browser on port {config.BROWSER_SERVER_PORT}")
+            process = subprocess.Popen([executable, *get_server_args(config.BROWSER_SERVER_PORT, user_data_dir)])
+            exit_code = process.wait()
+
+            if not stopping:
+                logger.error(f"Shared browser exited with code {exit_code}, restarting")
+                time.sleep(RESTART_DELAY_SECONDS)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
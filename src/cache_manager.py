@@ -1,37 +1,199 @@
-from functools import lru_cache, wraps
-from quart import request, current_app
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple, Union
+
+from blob_store import BlobStore
+
+logger = logging.getLogger(__name__)
+
+# Fields that change how the capture is returned or cached, not what is captured
+KEY_EXCLUDED_FIELDS = {'template', 'response_type', 'cache', 'cache_ttl'}
+
+Capture = Union[bytes, str]
+
+
+class CachedCapture(NamedTuple):
+    data: Capture
+    size: int
+    expires_at: float
 
 
 class CacheManager:
-    def __init__(self, max_size=None):
-        self.max_size = max_size
-        self.cache = lru_cache(maxsize=max_size)(lambda k: k)() if max_size else None
+    """
+    Two-tier cache of captures, keyed on the normalized request.
+
+    The key hashes the validated CaptureRequest with its defaults applied and
+    template expanded, so GET and POST requests that mean the same thing share
+    an entry. Entries expire after the request's `cache_ttl` (or the default
+    TTL). Concurrent misses for the same key share one capture.
+
+    The first tier is a byte-bounded LRU in this worker's memory. The optional
+    second tier is a `BlobStore` on local disk that every worker on the host
+    shares, so a capture made by one worker is a hit for the others; disk hits
+    are promoted to memory, so the most popular captures never touch the disk.
+    """
+
+    def __init__(self, max_bytes: int = 0, default_ttl: float = 3600, max_entries: int = 0,
+                 disk_store: Optional[BlobStore] = None):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.disk_store = disk_store
+        self._entries: 'OrderedDict[str, CachedCapture]' = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 or self.disk_store is not None
+
+    @staticmethod
+    def cache_key(options) -> str:
+        fields = options.model_dump(mode='json', exclude=KEY_EXCLUDED_FIELDS)
+        normalized = json.dumps(fields, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _size(data: Capture) -> int:
+        return len(data.encode('utf-8')) if isinstance(data, str) else len(data)
+
+    def get(self, key: str) -> Optional[Capture]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry.data
+
+    def set(self, key: str, data: Capture, ttl: Optional[float] = None):
+        """Store a capture in the memory tier."""
+        ttl = self.default_ttl if ttl is None else ttl
+        size = self._size(data)
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = CachedCapture(data, size, time.monotonic() + ttl)
+        self.bytes += size
+
+        while self.bytes > self.max_bytes or (self.max_entries and len(self._entries) > self.max_entries):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
 
-    def cache_key(self):
-        return request.url
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self.bytes -= entry.size
 
-    def get(self, key):
-        return self.cache.get(key) if self.cache else None
+    async def _get_from_disk(self, key: str) -> Optional[Capture]:
+        try:
+            cached = await asyncio.to_thread(self.disk_store.get, key)
+        except Exception as e:
+            logger.warning(f"Capture cache disk read failed: {str(e)}")
+            return None
+        if cached is None:
+            return None
+        body, meta = cached
+        data = body.decode('utf-8') if meta.get('text') else body
+        self.set(key, data, meta['expires_at'] - time.time())
+        return data
 
-    def set(self, key, value):
-        if self.cache:
-            self.cache[key] = value
+    async def _store(self, key: str, data: Capture, ttl: Optional[float]):
+        ttl = self.default_ttl if ttl is None else ttl
+        self.set(key, data, ttl)
+        if self.disk_store is None or ttl <= 0:
+            return
+        text = isinstance(data, str)
+        meta = {'text': text, 'expires_at': time.time() + ttl}
+        try:
+            await asyncio.to_thread(self.disk_store.put, key, data.encode('utf-8') if text else data, meta, ttl)
+        except Exception as e:
+            logger.warning(f"Capture cache disk write failed: {str(e)}")
 
+    async def fetch(self, options, capture: Callable[[], Awaitable[Capture]]) -> Tuple[Capture, str]:
+        """
+        Return the capture for a request and how it was served: HIT, MISS,
+        REFRESH (recaptured and stored) or BYPASS (not cached).
+        """
+        mode = getattr(options, 'cache', None) or 'default'
+        if not self.enabled or mode == 'bypass':
+            self.bypasses += 1
+            return await capture(), 'BYPASS'
 
-def cache_response(func):
-    @wraps(func)
-    async def wrapper(*args, **kwargs):
-        if request.method != 'GET' or not current_app.config['CACHING_ENABLED']:
-            return await func(*args, **kwargs)
+        key = self.cache_key(options)
+        if mode != 'refresh':
+            data = self.get(key)
+            if data is not None:
+                self.hits += 1
+                self.memory_hits += 1
+                return data, 'HIT'
+            in_flight = self._in_flight.get(key)
+            if in_flight is not None:
+                # A cancelled leader leaves this request to capture for itself
+                await asyncio.wait({in_flight})
+                if not in_flight.cancelled():
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return in_flight.result(), 'HIT'
 
-        cache_manager = current_app.cache_manager
-        key = cache_manager.cache_key()
-        response = cache_manager.get(key)
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            if mode != 'refresh' and self.disk_store is not None:
+                data = await self._get_from_disk(key)
+                if data is not None:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    future.set_result(data)
+                    return data, 'HIT'
 
-        if response is None:
-            response = await func(*args, **kwargs)
-            cache_manager.set(key, response)
+            self.misses += 1
+            data = await capture()
+            await self._store(key, data, getattr(options, 'cache_ttl', None))
+            future.set_result(data)
+            return data, 'REFRESH' if mode == 'refresh' else 'MISS'
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters get the error; nobody else needs to retrieve it
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
 
-        return response
+    async def stats(self) -> Dict[str, Any]:
+        """Hit, miss and size counters. The disk tier's are read from SQLite on a thread."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'bypasses': self.bypasses,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+            'disk': await asyncio.to_thread(self.disk_store.stats) if self.disk_store else None
+        }
 
-    return wrapper
+    def close(self):
+        if self.disk_store:
+            self.disk_store.close()
@@ -1,5 +1,5 @@
 from typing import Optional, Literal, Dict, Union, List
-from pydantic import BaseModel, HttpUrl, Field, PositiveInt, PositiveFloat, conint, confloat, model_validator
+from pydantic import BaseModel, HttpUrl, Field, PositiveInt, PositiveFloat, conint, confloat, field_validator, model_validator
 
 from templates import get_template
 
@@ -43,6 +43,10 @@ class CaptureRequest(BaseModel):
     window_width: PositiveInt = Field(1920, description="The width of the browser viewport (pixels)")
     window_height: PositiveInt = Field(1080, description="The height of the browser viewport (pixels)")
     full_page: Optional[bool] = Field(False, description="Take a screenshot of the full page (scrolled to the bottom)")
+    full_page_strategy: Literal["auto", "viewport", "tiled"] = Field(
+        "auto",
+        description="How to capture full pages: one tall viewport, stitched tiles, or tiles only for pages taller than the maximum viewport"
+    )
     selector: Optional[str] = Field(None, description="CSS-like selector of the element to take a screenshot of")
 
     # Random user agent settings
@@ -58,20 +62,45 @@ class CaptureRequest(BaseModel):
     # Interactions
     interactions: Optional[List[InteractionStep]] = Field(None, description="List of interaction steps to perform before capturing")
     wait_for_animation: Optional[bool] = Field(False, description="Wait for animations to complete before capturing")
+    freeze_animations: Optional[bool] = Field(
+        False,
+        description="Jump animations to their end state and disable transitions instead of waiting for them"
+    )
+    virtual_time_budget: Optional[conint(ge=0, le=60000)] = Field(
+        None,
+        description="Fast-forward the page's timers by this many milliseconds of virtual time before capturing"
+    )
+
+    # Response cache options
+    cache: Literal["default", "bypass", "refresh"] = Field(
+        "default",
+        description="Serve from the capture cache, skip it, or capture again and replace the cached copy"
+    )
+    cache_ttl: Optional[conint(ge=0, le=2592000)] = Field(
+        None,
+        description="Seconds to keep this capture cached (defaults to CACHE_TTL_SECONDS)"
+    )
 
     # Image options
     image_quality: Optional[conint(ge=0, le=100)] = Field(90, description="Image quality (0-100)")
     pixel_density: Optional[PositiveFloat] = Field(1.0, description="Device scale factor (DPR)")
     omit_background: Optional[bool] = Field(False, description="Render a transparent background for the image")
     dark_mode: Optional[bool] = Field(False, description="Enable dark mode for the screenshot")
+    dark_mode_fallback: Optional[bool] = Field(
+        False,
+        description="Also apply the dark mode script, for sites that don't follow prefers-color-scheme"
+    )
+    reduced_motion: Optional[bool] = Field(False, description="Emulate prefers-reduced-motion: reduce")
+    forced_colors: Optional[bool] = Field(False, description="Emulate forced-colors: active (high contrast mode)")
 
     # Wait and timeout options
     wait_for_timeout: Optional[PositiveInt] = Field(8000, description="Timeout in milliseconds to wait for page load")
     wait_for_selector: Optional[str] = Field(None, description="Wait for a specific selector to appear in DOM")
     delay_capture: Optional[conint(ge=0)] = Field(0, description="Delay in milliseconds before taking the screenshot")
-    wait_for_network: Literal["idle", "mostly_idle"] = Field(
-        "idle",
-        description="Specify whether to wait for the network to be mostly idle or completely idle"
+    wait_for_network: Literal["stable", "idle", "mostly_idle"] = Field(
+        "stable",
+        description="Wait for the page to be stable (no requests, DOM changes or layout shifts), "
+                    "or for the network to be completely or mostly idle"
     )
 
     # JavaScript options
@@ -80,6 +109,11 @@ class CaptureRequest(BaseModel):
     # Network and resource options
     ignore_https_errors: Optional[bool] = Field(True, description="Ignore HTTPS errors during navigation")
     block_media: Optional[bool] = Field(False, description="Block images, video, and audio from loading")
+    block_resources: Optional[List[Literal["image", "media", "font", "stylesheet", "websocket", "beacon"]]] = Field(
+        None,
+        description="Resource types to abort before they load"
+    )
+    block_ads: Optional[bool] = Field(False, description="Block ad and tracker requests matching the configured filter lists")
     custom_headers: Optional[Dict[str, str]] = Field(None, description="Custom headers to be sent with the request")
 
     # Geolocation options
@@ -93,6 +127,13 @@ class CaptureRequest(BaseModel):
     pdf_width: Optional[str] = Field(None, description="Paper width, accepts values labeled with units")
     pdf_height: Optional[str] = Field(None, description="Paper height, accepts values labeled with units")
 
+    @field_validator('block_resources', mode='before')
+    def split_block_resources(cls, value):
+        # GET requests pass the list as one comma-separated query parameter
+        if isinstance(value, str):
+            return [item.strip() for item in value.split(',') if item.strip()]
+        return value
+
     @model_validator(mode='before')
     def validate_url_or_html_content(cls, values):
         if not values.get('url') and not values.get('html_content'):
@@ -1,18 +1,44 @@
 import logging
+import time
+import traceback
+from typing import Optional
 from playwright.async_api import Page
-from exceptions import ScreenshotServiceException
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt
+from exceptions import BrowserCrashedException, ScreenshotServiceException
 from controllers.main_controller import MainBrowserController
 from controllers.screenshot_controller import ScreenshotController
+from config import config
 from context_manager import ContextManager
+from deadline import Deadline
+from filter_engine import load_filter_engine
+from page_stability import wait_for_page_stable
+from resource_blocker import ResourceBlocker
+from subresource_cache import SubresourceCache
+from retry_tracker import RetryAttemptInfo, before_retry
 
 logger = logging.getLogger(__name__)
 
+# Playwright error messages that mean the page, context or browser went away mid-capture
+BROWSER_CRASH_MARKERS = (
+    'Target crashed',
+    'Target closed',
+    'Target page, context or browser has been closed',
+    'Browser has been closed',
+    'Browser closed',
+    'Connection closed',
+)
+
+
 class CaptureService:
+    # In-flight captures are retried once after a browser crash
+    MAX_CRASH_RETRIES = 1
+
     def __init__(self):
         self.main_controller = None
         self.screenshot_controller = None
         self.context_manager = None
-        self.context = None
+        self.filter_engine = None
+        self.subresource_cache = None
         self.playwright = None
 
     async def initialize(self, playwright):
@@ -21,7 +47,11 @@ class CaptureService:
         self.main_controller = MainBrowserController()
         self.screenshot_controller = ScreenshotController()
         self.context_manager = ContextManager()
-        self.context = await self.context_manager.initialize(playwright)
+        self.filter_engine = load_filter_engine(config.FILTER_LISTS)
+        self.subresource_cache = SubresourceCache.from_config(
+            config.SUBRESOURCE_CACHE_DIR, config.SUBRESOURCE_CACHE_MAX_MB
+        )
+        await self.context_manager.initialize(playwright)
 
     async def _configure_page(self, page: Page, options) -> None:
         """Configure page with user agent and other settings."""
@@ -30,7 +60,7 @@ class CaptureService:
             await page.set_extra_http_headers(headers)
             logger.info(f"Using generated user agent: {headers.get('User-Agent')}")
 
-    async def _resilient_navigation(self, page: Page, url: str, timeout: int):
+    async def _resilient_navigation(self, page: Page, url: str, timeout: int, deadline: Deadline):
         """Attempt navigation with fallback handling for timeouts."""
         try:
             await page.goto(
@@ -41,59 +71,147 @@ class CaptureService:
         except Exception as nav_error:
             logger.warning(f"Navigation timeout or error: {str(nav_error)}. Continuing with capture...")
 
-            # Give a small additional wait to allow more content to load
-            try:
-                await page.wait_for_timeout(1000)  # Wait an extra second
-            except Exception as wait_error:
-                logger.warning(f"Additional wait failed: {str(wait_error)}")
+            # Give content that is still loading up to a second to settle
+            await wait_for_page_stable(page, deadline.budget(1000))
+
+    def _is_browser_crash(self, error: Exception) -> bool:
+        browser = self.context_manager.browser if self.context_manager else None
+        if browser is not None and not browser.is_connected():
+            return True
+        return any(marker in str(error) for marker in BROWSER_CRASH_MARKERS)
+
+    async def capture_screenshot(self, options, deadline: Optional[Deadline] = None) -> bytes:
+        """Capture screenshot, retrying once within the request's deadline if the browser crashes."""
+        deadline = deadline or Deadline(config.CAPTURE_TIMEOUT_MS)
 
-    async def capture_screenshot(self, output_path, options):
-        """Capture screenshot using the configured controllers."""
+        def should_retry(error: BaseException) -> bool:
+            return isinstance(error, BrowserCrashedException) and not deadline.expired
+
+        retry_state = None
         try:
-            page = await self.context.new_page()
-
-            try:
-                # Configure page with user agent
-                await self._configure_page(page, options)
-
-                # Use MainController for page preparation
-                await self.main_controller.prepare_page(page, options)
-
-                # Handle URL navigation or HTML content with resilient navigation
-                if options.url:
-                    await self._resilient_navigation(page, str(options.url), options.wait_for_timeout)
-                else:
-                    await page.set_content(options.html_content)
-
-                # Handle interactions if specified
-                if options.interactions:
-                    await self.main_controller.perform_interactions(page, options.interactions)
-
-                # Prepare for screenshot based on options
-                if options.full_page:
-                    await self.main_controller.prepare_for_full_page_screenshot(page, options.window_width)
-                else:
-                    await self.main_controller.prepare_for_viewport_screenshot(
-                        page,
-                        options.window_width,
-                        options.window_height
-                    )
-
-                # Take the actual screenshot using ScreenshotController
-                await self.screenshot_controller.take_screenshot(page, {
-                    'path': output_path,
-                    'full_page': options.full_page,
-                    'format': options.format,
-                    'quality': options.image_quality if options.format != 'png' else None,
-                    'omit_background': options.omit_background
-                })
-
-            finally:
-                await page.close()
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(self.MAX_CRASH_RETRIES + 1),
+                retry=retry_if_exception(should_retry),
+                before_sleep=before_retry,
+                reraise=True
+            ):
+                retry_state = attempt.retry_state
+                with attempt:
+                    if retry_state.attempt_number > 1:
+                        logger.warning("Retrying capture after browser crash")
+                        await self.context_manager.wait_until_ready(timeout=deadline.remaining_ms() / 1000)
+                    return await self._capture(options, deadline)
 
         except Exception as e:
             logger.error(f"Screenshot capture error: {str(e)}")
-            raise ScreenshotServiceException(str(e))
+            tracker = getattr(retry_state, 'retry_tracker', None)
+            if tracker is None:
+                raise ScreenshotServiceException(str(e))
+
+            tracker.add_attempt(RetryAttemptInfo(len(tracker.attempts) + 1, e, time.time()))
+            raise ScreenshotServiceException({
+                'type': e.__class__.__name__,
+                'message': str(e),
+                'retry_attempts': tracker.get_attempts(),
+                'call_stack': ''.join(traceback.format_exception(e))
+            })
+
+    async def _capture(self, options, deadline: Deadline) -> bytes:
+        """Run a single capture attempt, with each stage drawing on what is left of the deadline."""
+        try:
+            async with self.context_manager.acquire_context(options, deadline.remaining_ms() / 1000) as pooled:
+                page = await self.context_manager.page_pool.acquire(pooled)
+                blocker = ResourceBlocker.from_options(options, self.filter_engine)
+
+                try:
+                    # Configure page with user agent
+                    await self._configure_page(page, options)
+
+                    # The blocker's ad filter route runs first and falls back to the cache's
+                    if self.subresource_cache:
+                        await self.subresource_cache.install(page)
+
+                    # Blocking is only set up for captures that block something
+                    if blocker:
+                        await blocker.install(page)
+
+                    # Settings that must be in place before the page loads
+                    await self.main_controller.prepare_context(page, options)
+
+                    # Handle URL navigation or HTML content with resilient navigation
+                    deadline.check('navigation')
+                    if options.url:
+                        await self._resilient_navigation(
+                            page, str(options.url), deadline.budget(options.wait_for_timeout), deadline
+                        )
+                    else:
+                        await page.set_content(options.html_content, timeout=deadline.budget(options.wait_for_timeout))
+
+                    # Wait for the page to finish loading
+                    await self.main_controller.wait_for_page_ready(page, options, deadline)
+
+                    # Handle interactions if specified
+                    if options.interactions:
+                        await self.main_controller.perform_interactions(page, options.interactions, deadline)
+
+                    # Run the page's timers ahead instead of waiting for them in real time
+                    if options.virtual_time_budget:
+                        await self.main_controller.advance_virtual_time(page, options.virtual_time_budget, deadline)
+
+                    screenshot_options = {
+                        'full_page': options.full_page,
+                        'format': options.format,
+                        'quality': options.image_quality if options.format != 'png' else None,
+                        'omit_background': options.omit_background,
+                        'pixel_density': options.pixel_density
+                    }
+
+                    # Run the in-page preparation steps, including the scroll-through for full pages
+                    deadline.check('page preparation')
+                    scroll = self.screenshot_controller.scroll_args(deadline) if options.full_page else None
+                    preparation = await self.main_controller.prepare_page(page, options, deadline, scroll)
+
+                    # Prepare for screenshot based on options
+                    if options.full_page:
+                        page_height = await self.main_controller.prepare_for_full_page_screenshot(
+                            page,
+                            options.window_width,
+                            options.full_page_strategy,
+                            deadline,
+                            preparation.get('height') if 'scroll' in preparation.get('applied', []) else None
+                        )
+                        if self.screenshot_controller.use_tiles(options.full_page_strategy, page_height):
+                            return await self.screenshot_controller.take_tiled_screenshot(
+                                page, page_height, screenshot_options, deadline
+                            )
+                    else:
+                        await self.main_controller.prepare_for_viewport_screenshot(
+                            page,
+                            options.window_width,
+                            options.window_height,
+                            deadline
+                        )
+
+                    # Take the actual screenshot using ScreenshotController
+                    return await self.screenshot_controller.take_screenshot(page, screenshot_options, deadline)
+
+                except Exception as e:
+                    # Don't return a context from a crashed browser to the pool
+                    if self._is_browser_crash(e):
+                        pooled.broken = True
+                    raise
+
+                finally:
+                    if blocker:
+                        await blocker.uninstall(page)
+                        logger.info(f"Resource blocking: {blocker.stats()}")
+                    # Reset with the context after the response, not before it
+                    self.context_manager.page_pool.release(pooled, page)
+
+        except Exception as e:
+            if self._is_browser_crash(e):
+                raise BrowserCrashedException(str(e)) from e
+            raise
 
     async def close(self):
         """Clean up resources."""
@@ -0,0 +1,339 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+import threading
+import time
+import uuid
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional, Set
+
+from config import config
+from context_pool import default_pool_size
+from deadline import Deadline
+from exceptions import BrowserException, ScreenshotServiceException
+
+logger = logging.getLogger(__name__)
+
+MONITOR_INTERVAL_SECONDS = 1.0
+
+
+def worker_pool_size(workers: int) -> int:
+    """Browser contexts per worker: CONTEXT_POOL_SIZE, or an even share of the available cores."""
+    return config.CONTEXT_POOL_SIZE or max(1, default_pool_size() // max(1, workers))
+
+
+def _expiry(deadline: Deadline) -> Optional[float]:
+    """Wall-clock time a deadline runs out at, which any process on the host can compare against."""
+    remaining_ms = deadline.remaining_ms()
+    return None if math.isinf(remaining_ms) else time.time() + remaining_ms / 1000
+
+
+def _remaining_ms(expires_at: Optional[float]) -> Optional[float]:
+    return None if expires_at is None else max(0.0, (expires_at - time.time()) * 1000)
+
+
+def _take_job(index: int, jobs, results, cancelled=()):
+    """
+    Dequeue a job and report it as assigned before anything can fail.
+
+    Jobs that expired while queued or that the supervisor cancelled are
+    dropped rather than run.
+    """
+    while True:
+        job = jobs.get()
+        if job is None:
+            return None
+
+        job_id, _, expires_at = job
+        if job_id in cancelled:
+            continue
+        if expires_at is not None and expires_at <= time.time():
+            results.put(('error', job_id, {
+                'type': 'TimeoutException',
+                'message': 'Capture deadline exceeded while queued for a worker process'
+            }))
+            continue
+
+        results.put(('started', job_id, index))
+        return job
+
+
+def _share_bytes(data: bytes) -> Dict[str, Any]:
+    """Copy capture output into a shared memory block owned by the supervisor."""
+    shm = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+    try:
+        shm.buf[:len(data)] = data
+        # The supervisor unlinks the block, so this process must not track it
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        return {'name': shm.name, 'size': len(data)}
+    finally:
+        shm.close()
+
+
+def _read_shared_bytes(name: str, size: int) -> bytes:
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(shm.buf[:size])
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+async def _run_worker(index: int, pool_size: int, jobs, results, control):
+    from playwright.async_api import async_playwright
+    from capture_request import CaptureRequest
+    from capture_service import CaptureService
+
+    loop = asyncio.get_running_loop()
+    config.CONTEXT_POOL_SIZE = pool_size
+    playwright = await async_playwright().start()
+    capture_service = CaptureService()
+    await capture_service.initialize(playwright)
+    results.put(('ready', None, index))
+
+    # Run as many jobs at once as this worker has browser contexts
+    slots = asyncio.Semaphore(capture_service.context_manager.context_cache.pool_size)
+    running: Dict[str, asyncio.Task] = {}
+    # Jobs the supervisor gave up on, kept until they would have expired anyway
+    cancelled: Dict[str, Optional[float]] = {}
+
+    async def watch_cancellations():
+        while True:
+            message = await loop.run_in_executor(None, control.get)
+            if message is None:
+                return
+            job_id, expires_at = message
+            now = time.time()
+            for stale in [key for key, expiry in cancelled.items() if expiry is not None and expiry <= now]:
+                del cancelled[stale]
+            cancelled[job_id] = expires_at
+            task = running.get(job_id)
+            if task:
+                task.cancel()
+
+    async def run_job(job_id: str, payload: Dict[str, Any], expires_at: Optional[float]):
+        try:
+            options = CaptureRequest(**payload)
+            data = await capture_service.capture_screenshot(options, Deadline(_remaining_ms(expires_at)))
+            results.put(('done', job_id, _share_bytes(data or b'')))
+        except Exception as e:
+            # Structured error details (e.g. retry attempts) are passed through as-is
+            message = e.args[0] if e.args and isinstance(e.args[0], dict) else str(e)
+            results.put(('error', job_id, {'type': e.__class__.__name__, 'message': message}))
+        finally:
+            running.pop(job_id, None)
+            slots.release()
+
+    watcher = asyncio.create_task(watch_cancellations())
+    try:
+        while True:
+            await slots.acquire()
+            job = await loop.run_in_executor(None, _take_job, index, jobs, results, cancelled)
+            if job is None:
+                slots.release()
+                break
+            running[job[0]] = asyncio.create_task(run_job(*job))
+
+        if running:
+            await asyncio.gather(*running.values(), return_exceptions=True)
+    finally:
+        # Unblock the thread waiting on the control queue
+        control.put(None)
+        await watcher
+        await capture_service.close()
+        await playwright.stop()
+
+
+def _worker_main(index: int, pool_size: int, jobs, results, control):
+    from logging.config import dictConfig
+    from config import get_logging_config
+
+    dictConfig(get_logging_config())
+    asyncio.run(_run_worker(index, pool_size, jobs, results, control))
+
+
+class CaptureWorkerPool:
+    """
+    Supervisor for capture worker processes.
+
+    Each worker owns its own browser and context pool, sized to its share of
+    the cores, and takes CaptureRequest jobs from a shared queue. Workers
+    report a job as theirs as soon as they dequeue it, and drop jobs that
+    expired in the queue or were cancelled by the supervisor; a cancellation
+    also stops the job if it is already running. Capture output comes
+    back through shared memory rather than the result pipe. A worker that dies
+    is restarted and the jobs it had taken fail, without taking down the HTTP
+    process; if no worker manages to start, queued jobs fail too.
+
+    Exposes the same `capture_screenshot` interface as CaptureService.
+    """
+
+    def __init__(self, workers: int):
+        self.size = workers
+        self.pool_size = worker_pool_size(workers)
+        self._mp = multiprocessing.get_context('spawn')
+        self._jobs = self._mp.Queue()
+        self._results = self._mp.Queue()
+        self._processes: Dict[int, Any] = {}
+        self._controls: Dict[int, Any] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._running: Dict[str, int] = {}
+        self._ready: Set[int] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener: Optional[threading.Thread] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self._closing = False
+        self.restarts = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def initialize(self, playwright=None):
+        """Start the worker processes. The HTTP process doesn't need Playwright itself."""
+        self._loop = asyncio.get_running_loop()
+        for index in range(self.size):
+            self._start_worker(index)
+
+        self._listener = threading.Thread(target=self._listen, name='capture-results', daemon=True)
+        self._listener.start()
+        self._monitor = asyncio.create_task(self._monitor_workers())
+        logger.info(f"Started {self.size} capture worker processes")
+
+    def _start_worker(self, index: int):
+        # Each worker gets its own control queue, so cancellations reach all of them
+        self._controls[index] = self._mp.Queue()
+        process = self._mp.Process(
+            target=_worker_main,
+            args=(index, self.pool_size, self._jobs, self._results, self._controls[index]),
+            name=f'capture-worker-{index}',
+            daemon=True
+        )
+        process.start()
+        self._processes[index] = process
+
+    async def capture_screenshot(self, options, deadline: Optional[Deadline] = None) -> bytes:
+        """Run a capture on a worker process and return its output."""
+        if self._closing:
+            raise BrowserException("Capture workers are shutting down")
+
+        deadline = deadline or Deadline(config.CAPTURE_TIMEOUT_MS)
+        job_id = uuid.uuid4().hex
+        future = self._loop.create_future()
+        self._pending[job_id] = future
+        # The deadline travels as an absolute expiry, so time spent queued counts against it
+        expires_at = _expiry(deadline)
+        self._jobs.put((job_id, options.model_dump(mode='json'), expires_at))
+
+        try:
+            return await deadline.wait_for(future, 'capture on a worker process')
+        finally:
+            self._pending.pop(job_id, None)
+            self._running.pop(job_id, None)
+            if future.cancelled():
+                # Timed out or abandoned by the client; don't let a worker spend a context on it
+                self._cancel(job_id, expires_at)
+
+    def _cancel(self, job_id: str, expires_at: Optional[float]):
+        for control in self._controls.values():
+            control.put((job_id, expires_at))
+
+    def _listen(self):
+        """Receive results on a thread so shared memory copies stay off the event loop."""
+        while True:
+            message = self._results.get()
+            if message is None:
+                return
+
+            kind, job_id, payload = message
+            if kind == 'done':
+                try:
+                    payload = _read_shared_bytes(payload['name'], payload['size'])
+                except Exception as e:
+                    kind, payload = 'error', {'type': e.__class__.__name__, 'message': str(e)}
+            self._loop.call_soon_threadsafe(self._dispatch, kind, job_id, payload)
+
+    def _dispatch(self, kind: str, job_id: Optional[str], payload):
+        if kind == 'ready':
+            self._ready.add(payload)
+            return
+        if kind == 'started':
+            self._running[job_id] = payload
+            return
+
+        future = self._pending.get(job_id)
+        if future is None or future.done():
+            return
+
+        if kind == 'done':
+            self.completed += 1
+            future.set_result(payload)
+        else:
+            self.failed += 1
+            future.set_exception(ScreenshotServiceException(payload['message']))
+
+    async def _monitor_workers(self):
+        while not self._closing:
+            await asyncio.sleep(MONITOR_INTERVAL_SECONDS)
+            for index, process in list(self._processes.items()):
+                if process.is_alive() or self._closing:
+                    continue
+
+                logger.error(f"Capture worker {index} exited with code {process.exitcode}, restarting")
+                self.restarts += 1
+                self._fail_running(index, f"Capture worker {index} crashed")
+                if index not in self._ready and not self._ready:
+                    # Nothing is taking jobs off the queue, so they would only time out
+                    self._fail_queued("Capture workers are failing to start")
+                self._ready.discard(index)
+                self._start_worker(index)
+
+    def _fail_running(self, index: int, message: str):
+        for job_id, worker_index in list(self._running.items()):
+            if worker_index != index:
+                continue
+            future = self._pending.get(job_id)
+            if future and not future.done():
+                self.failed += 1
+                future.set_exception(BrowserException(message))
+
+    def _fail_queued(self, message: str):
+        for job_id, future in list(self._pending.items()):
+            if job_id not in self._running and not future.done():
+                self.failed += 1
+                future.set_exception(BrowserException(message))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.size,
+            'pool_size': self.pool_size,
+            'ready': len(self._ready),
+            'alive': sum(1 for process in self._processes.values() if process.is_alive()),
+            'pending': len(self._pending),
+            'running': len(self._running),
+            'completed': self.completed,
+            'failed': self.failed,
+            'restarts': self.restarts
+        }
+
+    async def close(self):
+        """Stop the workers after they finish their current jobs."""
+        self._closing = True
+        if self._monitor:
+            self._monitor.cancel()
+
+        for _ in self._processes:
+            self._jobs.put(None)
+        for control in self._controls.values():
+            control.put(None)
+        for process in self._processes.values():
+            await asyncio.to_thread(process.join, 30)
+            if process.is_alive():
+                process.terminate()
+
+        self._results.put(None)
+        if self._listener:
+            await asyncio.to_thread(self._listener.join, 5)
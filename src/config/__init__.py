@@ -19,7 +19,53 @@ class Config:
     PROXY_USERNAME = os.getenv('PROXY_USERNAME')
     PROXY_PASSWORD = os.getenv('PROXY_PASSWORD')
     URL_SIGNING_SECRET = os.getenv('URL_SIGNING_SECRET')
+    CACHE_MAX_MB = int(os.getenv('CACHE_MAX_MB', 0))
     CACHE_MAX_SIZE = int(os.getenv('CACHE_MAX_SIZE', 0))
+    CACHE_TTL_SECONDS = int(os.getenv('CACHE_TTL_SECONDS', 3600))
+    # Disk tier of the capture cache shared by all workers on the host (disabled if unset)
+    CACHE_DIR = os.getenv('CACHE_DIR', '')
+    CACHE_DISK_MAX_MB = int(os.getenv('CACHE_DISK_MAX_MB', 2048))
+
+    # Total time budget for a capture, from arrival to response, shared by every stage
+    CAPTURE_TIMEOUT_MS = int(os.getenv('CAPTURE_TIMEOUT_MS', 30000))
+
+    # Browser context pool (a size of 0 sizes the pool to the available cores, split between capture workers)
+    CONTEXT_POOL_SIZE = int(os.getenv('CONTEXT_POOL_SIZE', 0))
+    CONTEXT_MAX_USES = int(os.getenv('CONTEXT_MAX_USES', 50))
+    CONTEXT_CACHE_MAX_PROFILES = int(os.getenv('CONTEXT_CACHE_MAX_PROFILES', 8))
+    CONTEXT_CACHE_IDLE_SECONDS = float(os.getenv('CONTEXT_CACHE_IDLE_SECONDS', 300))
+    PAGE_POOL_SIZE = int(os.getenv('PAGE_POOL_SIZE', 1))
+
+    # Shared browser (connect to one Chromium per host over CDP instead of launching one per worker)
+    BROWSER_CDP_ENDPOINT = os.getenv('BROWSER_CDP_ENDPOINT')
+    BROWSER_SERVER_PORT = int(os.getenv('BROWSER_SERVER_PORT', 9222))
+
+    # Browser recycling thresholds (0 disables a threshold)
+    BROWSER_MAX_PAGES = int(os.getenv('BROWSER_MAX_PAGES', 1000))
+    BROWSER_MAX_AGE_SECONDS = int(os.getenv('BROWSER_MAX_AGE_SECONDS', 3600))
+    BROWSER_MAX_RSS_MB = int(os.getenv('BROWSER_MAX_RSS_MB', 2048))
+    BROWSER_DRAIN_TIMEOUT_SECONDS = float(os.getenv('BROWSER_DRAIN_TIMEOUT_SECONDS', 30))
+
+    # Budget for scrolling through full pages to load lazy content
+    FULL_PAGE_SCROLL_MAX_HEIGHT = int(os.getenv('FULL_PAGE_SCROLL_MAX_HEIGHT', 32768))
+    FULL_PAGE_SCROLL_TIMEOUT_MS = int(os.getenv('FULL_PAGE_SCROLL_TIMEOUT_MS', 10000))
+    # Largest tiled full-page capture, in device pixels (the stitching canvas is held in memory)
+    FULL_PAGE_TILED_MAX_PIXELS = int(os.getenv('FULL_PAGE_TILED_MAX_PIXELS', 64_000_000))
+
+    # Comma-separated EasyList/EasyPrivacy-format files used by block_ads
+    FILTER_LISTS = os.getenv('FILTER_LISTS', '')
+
+    # On-disk cache of pages' static subresources shared by all workers (disabled if unset)
+    SUBRESOURCE_CACHE_DIR = os.getenv('SUBRESOURCE_CACHE_DIR', '')
+    SUBRESOURCE_CACHE_MAX_MB = int(os.getenv('SUBRESOURCE_CACHE_MAX_MB', 512))
+
+    # Capture worker processes per HTTP worker (0 runs captures in the HTTP process)
+    CAPTURE_WORKERS = int(os.getenv('CAPTURE_WORKERS', 0))
+
+    # Admission control (a concurrency of 0 matches the number of browser contexts)
+    MAX_CONCURRENT_CAPTURES = int(os.getenv('MAX_CONCURRENT_CAPTURES', 0))
+    MAX_QUEUED_CAPTURES = int(os.getenv('MAX_QUEUED_CAPTURES', 16))
+    MAX_QUEUE_WAIT_SECONDS = float(os.getenv('MAX_QUEUE_WAIT_SECONDS', 10))
 
 
 config = Config()
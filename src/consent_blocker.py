@@ -0,0 +1,53 @@
+import json
+import logging
+import os
+from typing import Any, Dict
+
+from script_registry import script_registry
+
+logger = logging.getLogger(__name__)
+
+CONSENT_RULES_FILE = os.path.join(os.path.dirname(__file__), 'data', 'consent-rules.json')
+
+
+class ConsentBlocker:
+    """
+    Cookie banner and popup removal that works in headless Chromium.
+
+    Replaces the `popup-off` and `dont-care-cookies` extensions, which need a
+    headed browser under Xvfb: `js/consent-blocker.js` runs as a context init
+    script with the rules from `data/consent-rules.json`, so every frame hides
+    and dismisses banners from the moment its document starts loading.
+    """
+
+    def __init__(self, cookies: bool = True, popups: bool = True, rules_file: str = CONSENT_RULES_FILE):
+        self.cookies = cookies
+        self.popups = popups
+        self.rules_file = rules_file
+        self._init_script = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.cookies or self.popups
+
+    def rules(self) -> Dict[str, Any]:
+        """The rules for the enabled blockers."""
+        with open(self.rules_file, 'r') as file:
+            rules = json.load(file)
+        if not self.cookies:
+            rules.pop('cookies', None)
+        if not self.popups:
+            rules.pop('popups', None)
+        return rules
+
+    @property
+    def init_script(self) -> str:
+        if self._init_script is None:
+            source = script_registry.get('consent-blocker').source
+            self._init_script = f"({source})({json.dumps(self.rules(), separators=(',', ':'))});"
+        return self._init_script
+
+    async def install(self, context):
+        """Run the blocker in every page of a new context."""
+        if self.enabled:
+            await context.add_init_script(script=self.init_script)
@@ -1,23 +1,92 @@
+import asyncio
 import os
 import logging
-from typing import List, Dict, Optional
+import time
+from contextlib import asynccontextmanager
+from typing import List, Dict, Optional, Sequence
+
+import psutil
 from playwright.async_api import Browser, BrowserContext
+from tenacity import retry, retry_if_exception_type, stop_after_delay, wait_exponential
 from ua_generator import generate as generate_ua
 from config import config
+from consent_blocker import ConsentBlocker
+from context_pool import ContextCache
+from emulation_profile import EmulationProfile
+from page_pool import PagePool
 from exceptions import BrowserException
 
 logger = logging.getLogger(__name__)
 
+BROWSER_PROCESS_NAMES = ('chrome', 'chromium', 'headless_shell')
+
+EXTENSION_DIR = os.path.join(os.path.dirname(__file__), 'extensions')
+
+
+def enabled_extensions() -> List[str]:
+    """Paths of the blocker extensions to load, if USE_BROWSER_EXTENSIONS is set."""
+    if os.getenv('USE_BROWSER_EXTENSIONS', 'false').lower() != 'true' or not os.path.exists(EXTENSION_DIR):
+        return []
+
+    extension_configs = [
+        ('popup-off', os.getenv('USE_POPUP_BLOCKER', 'true').lower() == 'true'),
+        ('dont-care-cookies', os.getenv('USE_COOKIE_BLOCKER', 'true').lower() == 'true')
+    ]
+    extensions = []
+    for ext_name, is_enabled in extension_configs:
+        ext_path = os.path.join(EXTENSION_DIR, ext_name)
+        if is_enabled and os.path.exists(ext_path):
+            extensions.append(ext_path)
+    return extensions
+
+
+def get_browser_args(extensions: Sequence[str] = ()) -> List[str]:
+    """Get the Chromium command line arguments, loading the given extensions."""
+    browser_args = [
+        '--disable-features=site-per-process',
+        '--no-sandbox',
+        '--disable-setuid-sandbox',
+        '--disable-dev-shm-usage',
+    ]
+
+    if extensions:
+        browser_args.extend([
+            f'--disable-extensions-except={",".join(extensions)}',
+            *[f'--load-extension={ext}' for ext in extensions]
+        ])
+        logger.info(f"Launching browser with extensions: {list(extensions)}")
+
+    return browser_args
+
 
 class ContextManager:
+    # Walking the process tree for RSS is too costly to do after every capture
+    RSS_CHECK_INTERVAL_SECONDS = 10
+
     def __init__(self):
-        self.context = None
+        self.context_cache = None
+        self.page_pool = PagePool(size=config.PAGE_POOL_SIZE)
+        self.playwright = None
         self.browser = None
-        self.extension_dir = os.path.join(os.path.dirname(__file__), 'extensions')
+        self._closing = False
+        self._reconnect_lock = asyncio.Lock()
+        self._reconnect_task = None
+        self._recycle_task = None
+        self._last_rss_check = 0.0
+        self.pages_served = 0
+        self.browser_started_at = time.monotonic()
+        self.recycles = 0
 
-        # Read extension configuration from environment
+        # Read blocker configuration from environment. The blockers run as
+        # init scripts unless the extensions (which need Xvfb) are enabled.
         self.use_popup_blocker = os.getenv('USE_POPUP_BLOCKER', 'true').lower() == 'true'
         self.use_cookie_blocker = os.getenv('USE_COOKIE_BLOCKER', 'true').lower() == 'true'
+        self.use_extensions = os.getenv('USE_BROWSER_EXTENSIONS', 'false').lower() == 'true'
+        self.extensions = enabled_extensions()
+        self.consent_blocker = ConsentBlocker(
+            cookies=self.use_cookie_blocker and not self.use_extensions,
+            popups=self.use_popup_blocker and not self.use_extensions
+        )
 
         # Initialize proxy configuration from environment
         self.default_proxy_config = self._get_proxy_config()
@@ -40,29 +109,6 @@ class ContextManager:
             return proxy_config
         return None
 
-    def _get_extension_args(self) -> List[str]:
-        """Get browser arguments for enabled extensions."""
-        extensions = []
-        if os.path.exists(self.extension_dir):
-            extension_configs = [
-                ('popup-off', self.use_popup_blocker),
-                ('dont-care-cookies', self.use_cookie_blocker)
-            ]
-
-            for ext_name, is_enabled in extension_configs:
-                if is_enabled:
-                    ext_path = os.path.join(self.extension_dir, ext_name)
-                    if os.path.exists(ext_path):
-                        extensions.append(ext_path)
-
-        if not extensions:
-            return []
-
-        return [
-            f'--disable-extensions-except={",".join(extensions)}',
-            *[f'--load-extension={ext}' for ext in extensions]
-        ]
-
     def _generate_headers(self, options) -> Dict[str, str]:
         """Generate headers including user agent based on options."""
         ua_options = {}
@@ -91,54 +137,220 @@ class ContextManager:
 
         return headers
 
-    async def initialize(self, playwright) -> BrowserContext:
-        """Initialize and return a configured browser context."""
-        try:
-            # Base browser arguments
-            browser_args = [
-                '--disable-features=site-per-process',
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-            ]
-
-            # Add extension arguments if any are enabled
-            extension_args = self._get_extension_args()
-            if extension_args:
-                browser_args.extend(extension_args)
-                logger.info(f"Launching browser with extensions: {extension_args}")
-
-            # Launch browser with combined arguments
-            self.browser = await playwright.chromium.launch(args=browser_args)
-
-            # Create initial context with default proxy if configured
-            context_options = {
-                'viewport': {'width': 1920, 'height': 1080},
-                'device_scale_factor': 1.0
-            }
+    def get_profile(self, options=None) -> EmulationProfile:
+        """Get the emulation profile for a request, or the default profile."""
+        if options is None:
+            return EmulationProfile(proxy=EmulationProfile.from_proxy(self.default_proxy_config))
+        return EmulationProfile.from_options(options, self.default_proxy_config)
+
+    async def _create_context(self, profile: EmulationProfile) -> BrowserContext:
+        context = await self.browser.new_context(**profile.to_context_options())
+        await self.consent_blocker.install(context)
+        return context
 
-            if self.default_proxy_config:
-                context_options['proxy'] = self.default_proxy_config
+    @retry(
+        stop=stop_after_delay(30),
+        wait=wait_exponential(multiplier=0.5, max=5),
+        retry=retry_if_exception_type(Exception),
+        reraise=True
+    )
+    async def _connect_browser(self) -> Browser:
+        """Connect to the shared browser server, retrying while it starts up or restarts."""
+        logger.info(f"Connecting to shared browser at {config.BROWSER_CDP_ENDPOINT}")
+        return await self.playwright.chromium.connect_over_cdp(config.BROWSER_CDP_ENDPOINT)
 
-            self.context = await self.browser.new_context(**context_options)
+    async def _start_browser(self) -> Browser:
+        """Launch a browser for this worker or connect to the host's shared browser."""
+        if config.BROWSER_CDP_ENDPOINT:
+            browser = await self._connect_browser()
+        else:
+            # Extensions only load in a headed browser, on the Xvfb display entry.sh starts for them
+            browser = await self.playwright.chromium.launch(
+                headless=not self.use_extensions,
+                args=get_browser_args(self.extensions)
+            )
+
+        browser.on('disconnected', self._on_disconnected)
+        self.pages_served = 0
+        self.browser_started_at = time.monotonic()
+        return browser
+
+    def _create_context_cache(self) -> ContextCache:
+        return ContextCache(
+            self._create_context,
+            pool_size=config.CONTEXT_POOL_SIZE or None,
+            max_uses=config.CONTEXT_MAX_USES,
+            max_profiles=config.CONTEXT_CACHE_MAX_PROFILES,
+            idle_timeout=config.CONTEXT_CACHE_IDLE_SECONDS,
+            on_create=self.page_pool.warm,
+            on_release=self.page_pool.restore
+        )
+
+    async def initialize(self, playwright) -> ContextCache:
+        """Launch the browser and return a cache of warmed, configured contexts."""
+        try:
+            self.playwright = playwright
+            self.browser = await self._start_browser()
+
+            # Create the context cache and warm the default profile
+            self.context_cache = self._create_context_cache()
+            await self.context_cache.warm(self.get_profile())
 
             # Log successful initialization
             proxy_info = "with proxy" if self.default_proxy_config else "without proxy"
-            logger.info(f"Browser context initialized successfully {proxy_info}")
+            logger.info(f"Browser context pool of {self.context_cache.pool_size} initialized successfully {proxy_info}")
 
-            return self.context
+            return self.context_cache
 
         except Exception as e:
             logger.error(f"Failed to initialize browser context: {str(e)}")
             raise BrowserException(f"Browser context initialization failed: {str(e)}")
 
+    def _on_disconnected(self, browser: Browser):
+        if self._closing or browser is not self.browser:
+            return
+        logger.error("Browser disconnected, reconnecting in the background")
+        self._reconnect_task = asyncio.create_task(self._reconnect(browser))
+
+    async def _reconnect(self, dead_browser: Browser):
+        """Replace a dead browser and the contexts that belonged to it."""
+        async with self._reconnect_lock:
+            if self._closing or self.browser is not dead_browser:
+                return
+
+            old_cache = self.context_cache
+            try:
+                self.browser = await self._start_browser()
+                self.context_cache = self._create_context_cache()
+                logger.info("Browser reconnected successfully")
+            except Exception as e:
+                logger.error(f"Failed to reconnect browser: {str(e)}")
+                return
+
+            if old_cache:
+                await old_cache.close()
+
+    async def wait_until_ready(self, timeout: float = 30):
+        """Wait for a background reconnect to finish before starting a capture."""
+        task = self._reconnect_task
+        if task and not task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+            except asyncio.TimeoutError:
+                raise BrowserException(f"Browser did not reconnect within {timeout}s")
+
+    @asynccontextmanager
+    async def acquire_context(self, options=None, timeout: Optional[float] = None):
+        """
+        Lease an isolated browser context matching the request's emulation profile,
+        waiting at most `timeout` seconds for one.
+        """
+        if not self.context_cache:
+            raise BrowserException("Browser context pool is not initialized")
+        try:
+            async with self.context_cache.acquire(self.get_profile(options), timeout) as pooled:
+                yield pooled
+        finally:
+            self.pages_served += 1
+            self._maybe_recycle()
+
+    def get_browser_rss_mb(self) -> float:
+        """Get the resident memory of the Chromium processes started by this worker."""
+        total = 0
+        for process in psutil.Process(os.getpid()).children(recursive=True):
+            try:
+                if any(name in process.name().lower() for name in BROWSER_PROCESS_NAMES):
+                    total += process.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total / 1024 / 1024
+
+    async def _get_recycle_reason(self) -> Optional[str]:
+        """Check the page count, age and memory thresholds for the current browser."""
+        if config.BROWSER_MAX_PAGES and self.pages_served >= config.BROWSER_MAX_PAGES:
+            return f"served {self.pages_served} pages"
+
+        age = time.monotonic() - self.browser_started_at
+        if config.BROWSER_MAX_AGE_SECONDS and age >= config.BROWSER_MAX_AGE_SECONDS:
+            return f"running for {int(age)}s"
+
+        now = time.monotonic()
+        if config.BROWSER_MAX_RSS_MB and now - self._last_rss_check >= self.RSS_CHECK_INTERVAL_SECONDS:
+            self._last_rss_check = now
+            rss_mb = await asyncio.to_thread(self.get_browser_rss_mb)
+            if rss_mb >= config.BROWSER_MAX_RSS_MB:
+                return f"using {int(rss_mb)}MB of memory"
+
+        return None
+
+    def _maybe_recycle(self):
+        # A shared browser belongs to the browser server, not to this worker
+        if self._closing or config.BROWSER_CDP_ENDPOINT:
+            return
+        if self._recycle_task and not self._recycle_task.done():
+            return
+        self._recycle_task = asyncio.create_task(self._check_recycle())
+
+    async def _check_recycle(self):
+        try:
+            reason = await self._get_recycle_reason()
+            if reason:
+                await self._recycle(reason)
+        except Exception as e:
+            logger.error(f"Browser recycling failed: {str(e)}")
+
+    async def _recycle(self, reason: str):
+        """Replace the browser without interrupting captures that are still running on it."""
+        async with self._reconnect_lock:
+            if self._closing:
+                return
+
+            logger.info(f"Recycling browser after it {reason}")
+            old_browser, old_cache = self.browser, self.context_cache
+
+            # Launch and warm the replacement first so new captures never wait on a cold browser
+            new_browser = await self._start_browser()
+            new_cache = self._create_context_cache()
+            try:
+                await new_cache.warm(self.get_profile())
+            except Exception:
+                await new_browser.close()
+                raise
+
+            self.browser, self.context_cache = new_browser, new_cache
+            self.recycles += 1
+
+        await old_cache.close()
+        await self._drain(old_cache)
+        try:
+            await old_browser.close()
+        except Exception as e:
+            logger.warning(f"Error closing recycled browser: {str(e)}")
+
+    async def _drain(self, cache: ContextCache):
+        """Wait for captures still using a retired context cache to finish."""
+        deadline = time.monotonic() + config.BROWSER_DRAIN_TIMEOUT_SECONDS
+        while cache.in_use_count > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if cache.in_use_count > 0:
+            logger.warning(f"Closing recycled browser with {cache.in_use_count} captures still running")
+
+    def stats(self) -> Dict:
+        return {
+            'pages_served': self.pages_served,
+            'age_seconds': int(time.monotonic() - self.browser_started_at),
+            'recycles': self.recycles,
+            'shared': bool(config.BROWSER_CDP_ENDPOINT)
+        }
+
     async def close(self):
         """Clean up resources."""
+        self._closing = True
         try:
-            if self.context:
-                await self.context.close()
+            if self.context_cache:
+                await self.context_cache.close()
             if self.browser:
                 await self.browser.close()
         except Exception as e:
             logger.error(f"Error during context cleanup: {str(e)}")
-            # Don't re-raise as this is cleanup code
\ No newline at end of file
+            # Don't re-raise as this is cleanup code
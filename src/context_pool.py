@@ -0,0 +1,355 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from urllib.parse import urlsplit
+
+from playwright.async_api import BrowserContext
+
+from exceptions import BrowserException, TimeoutException
+
+logger = logging.getLogger(__name__)
+
+# Longest a returned context may take to reset before it is closed instead
+RESET_TIMEOUT_SECONDS = 10.0
+
+
+def default_pool_size() -> int:
+    """Size the pool to the number of cores available to this process."""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+def request_origin(url: str) -> Optional[str]:
+    """The origin of an http(s) URL, as CDP's storage methods expect it."""
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        return None
+    return f"{parts.scheme}://{parts.hostname}" + (f":{port}" if port else '')
+
+
+class PooledContext:
+    """A browser context leased from a ContextPool, with its usage bookkeeping."""
+
+    def __init__(self, context: BrowserContext):
+        self.context = context
+        self.uses = 0
+        self.created_at = time.monotonic()
+        self.broken = False
+        self.idle_pages = []
+        # Pages handed back by captures, reset with the context once the lease ends
+        self.released_pages = []
+        # Origins whose documents were loaded since the last reset, and so may have stored data
+        self.origins = set()
+        context.on('request', self._on_request)
+
+    def _on_request(self, request):
+        if request.resource_type == 'document':
+            origin = request_origin(request.url)
+            if origin:
+                self.origins.add(origin)
+
+
+class ContextPool:
+    """
+    Bounded pool of pre-warmed browser contexts.
+
+    Each capture leases a context for its exclusive use, so cookies, permissions
+    and geolocation never leak between concurrent requests. Contexts are reset
+    when they are returned: localStorage, IndexedDB, cache storage and service
+    workers of every origin the lease loaded a document from are cleared over
+    CDP, along with the HTTP cache. A context without a page to clear them from
+    is recycled instead, as is any context after `max_uses` leases.
+
+    The reset runs in the background once the lease ends, so the capture's
+    response never waits for it. The context's slot stays taken until it is
+    back in the idle pool, or closed if the reset fails or takes longer than
+    `reset_timeout` seconds. `on_release` runs first, as part of the reset.
+    """
+
+    def __init__(self, factory: Callable[[], Awaitable[BrowserContext]], size: Optional[int] = None,
+                 max_uses: int = 50, semaphore: Optional[asyncio.Semaphore] = None,
+                 on_create: Optional[Callable[[PooledContext], Awaitable[None]]] = None,
+                 on_release: Optional[Callable[[PooledContext], Awaitable[None]]] = None,
+                 reset_timeout: float = RESET_TIMEOUT_SECONDS):
+        self.factory = factory
+        self.on_create = on_create
+        self.on_release = on_release
+        self.reset_timeout = reset_timeout
+        self.size = size or default_pool_size()
+        self.max_uses = max_uses
+        self._idle: asyncio.Queue = asyncio.Queue()
+        # Pools in a ContextCache share one semaphore so the concurrency bound is global
+        self._semaphore = semaphore or asyncio.Semaphore(self.size)
+        self._in_use = 0
+        self._returning = set()
+        self._closed = False
+
+    @property
+    def idle_count(self) -> int:
+        return self._idle.qsize()
+
+    @property
+    def in_use_count(self) -> int:
+        return self._in_use
+
+    async def warm(self, count: Optional[int] = None):
+        """Create idle contexts ahead of time so the first requests don't pay for them."""
+        count = min(count or self.size, self.size - self._idle.qsize() - self._in_use)
+        for _ in range(max(0, count)):
+            self._idle.put_nowait(await self._create())
+
+    @asynccontextmanager
+    async def acquire(self, timeout: Optional[float] = None):
+        """
+        Lease a context for the duration of the `async with` block.
+
+        Raises TimeoutException if no context is free, or none can be created,
+        within `timeout` seconds.
+        """
+        if self._closed:
+            raise BrowserException("Context pool is closed")
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutException(f"No browser context became available within {timeout:.1f}s") from None
+
+        pooled = None
+        try:
+            remaining = None if timeout is None else max(0.0, timeout - (loop.time() - started))
+            pooled = await self._checkout(remaining)
+            self._in_use += 1
+            yield pooled
+        finally:
+            if pooled is None:
+                self._semaphore.release()
+            else:
+                self._in_use -= 1
+                task = asyncio.create_task(self._return(pooled))
+                self._returning.add(task)
+                task.add_done_callback(self._returning.discard)
+
+    async def _return(self, pooled: PooledContext):
+        """Reset a context after its lease, then free its slot."""
+        try:
+            await asyncio.wait_for(self._checkin(pooled), self.reset_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Browser context reset took longer than {self.reset_timeout}s, discarding it")
+            await self._discard(pooled)
+        finally:
+            self._semaphore.release()
+
+    async def _create(self) -> PooledContext:
+        try:
+            pooled = PooledContext(await self.factory())
+            if self.on_create:
+                await self.on_create(pooled)
+            return pooled
+        except Exception as e:
+            logger.error(f"Failed to create pooled browser context: {str(e)}")
+            raise BrowserException(f"Failed to create browser context: {str(e)}")
+
+    async def _checkout(self, timeout: Optional[float] = None) -> PooledContext:
+        try:
+            return self._idle.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+
+        creation = asyncio.ensure_future(self._create())
+        try:
+            return await asyncio.wait_for(asyncio.shield(creation), timeout)
+        except asyncio.TimeoutError:
+            # The context is still coming; keep it for the next lease rather than leak it
+            creation.add_done_callback(self._keep_created)
+            raise TimeoutException(f"Browser context creation took longer than {timeout:.1f}s") from None
+
+    def _keep_created(self, creation: asyncio.Future):
+        if creation.cancelled() or creation.exception():
+            return
+        if self._closed:
+            asyncio.create_task(self._discard(creation.result()))
+        else:
+            self._idle.put_nowait(creation.result())
+
+    async def _checkin(self, pooled: PooledContext):
+        pooled.uses += 1
+        recycle = self._closed or pooled.broken or pooled.uses >= self.max_uses
+
+        if not recycle:
+            try:
+                if self.on_release:
+                    await self.on_release(pooled)
+                # Storage can only be cleared through a page's CDP session
+                recycle = bool(pooled.origins) and not pooled.idle_pages
+                if not recycle:
+                    await self._reset(pooled)
+            except Exception as e:
+                logger.warning(f"Failed to reset browser context, discarding it: {str(e)}")
+                await self._discard(pooled)
+                return
+
+        if recycle or self._closed:
+            await self._discard(pooled)
+            if not self._closed:
+                # Replace the recycled context in the background to keep the pool warm
+                asyncio.create_task(self._replenish())
+            return
+
+        self._idle.put_nowait(pooled)
+
+    async def _reset(self, pooled: PooledContext):
+        """Clear per-request state so the next lease starts from a clean context."""
+        context = pooled.context
+        for page in list(context.pages):
+            if page not in pooled.idle_pages:
+                await page.close()
+        await context.clear_cookies()
+        await context.clear_permissions()
+        await context.set_geolocation(None)
+        await self._clear_storage(pooled)
+
+    @staticmethod
+    async def _clear_storage(pooled: PooledContext):
+        origins, pooled.origins = pooled.origins, set()
+        if not origins:
+            return
+        session = await pooled.context.new_cdp_session(pooled.idle_pages[0])
+        try:
+            for origin in origins:
+                await session.send('Storage.clearDataForOrigin', {'origin': origin, 'storageTypes': 'all'})
+            await session.send('Network.clearBrowserCache')
+        finally:
+            await session.detach()
+
+    async def _replenish(self):
+        try:
+            await self.warm(1)
+        except Exception as e:
+            logger.warning(f"Failed to replenish context pool: {str(e)}")
+
+    async def _discard(self, pooled: PooledContext):
+        try:
+            await pooled.context.close()
+        except Exception as e:
+            logger.warning(f"Error closing pooled browser context: {str(e)}")
+
+    async def close(self):
+        """Close all idle contexts; leased contexts are closed when they are returned."""
+        self._closed = True
+        if self._returning:
+            await asyncio.gather(*self._returning, return_exceptions=True)
+        while not self._idle.empty():
+            await self._discard(self._idle.get_nowait())
+
+
+class ContextCache:
+    """
+    LRU of context pools keyed by emulation profile.
+
+    Requests with the same profile (viewport, DPR, mobile, color scheme, user
+    agent, proxy) reuse warm contexts. Pools are evicted when there are more
+    than `max_profiles` of them or when they have been idle for `idle_timeout`
+    seconds. All pools share a single concurrency bound of `pool_size`.
+    """
+
+    def __init__(self, factory: Callable[[Hashable], Awaitable[BrowserContext]], pool_size: Optional[int] = None,
+                 max_uses: int = 50, max_profiles: int = 8, idle_timeout: float = 300,
+                 on_create: Optional[Callable[[PooledContext], Awaitable[None]]] = None,
+                 on_release: Optional[Callable[[PooledContext], Awaitable[None]]] = None):
+        self.factory = factory
+        self.on_create = on_create
+        self.on_release = on_release
+        self.pool_size = pool_size or default_pool_size()
+        self.max_uses = max_uses
+        self.max_profiles = max_profiles
+        self.idle_timeout = idle_timeout
+        self._pools: 'OrderedDict[Hashable, ContextPool]' = OrderedDict()
+        self._last_used: Dict[Hashable, float] = {}
+        self._semaphore = asyncio.Semaphore(self.pool_size)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_pool(self, profile: Hashable, record_lookup: bool = True) -> ContextPool:
+        """Get the pool for a profile, creating it and evicting stale pools as needed."""
+        pool = self._pools.get(profile)
+        if record_lookup:
+            if pool is not None and pool.idle_count > 0:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if pool is None:
+            pool = ContextPool(
+                lambda: self.factory(profile),
+                size=self.pool_size,
+                max_uses=self.max_uses,
+                semaphore=self._semaphore,
+                on_create=self.on_create,
+                on_release=self.on_release
+            )
+            self._pools[profile] = pool
+
+        self._pools.move_to_end(profile)
+        self._last_used[profile] = time.monotonic()
+        self._evict(keep=profile)
+        return pool
+
+    def acquire(self, profile: Hashable, timeout: Optional[float] = None):
+        """Lease a context matching the profile, waiting at most `timeout` seconds."""
+        return self.get_pool(profile).acquire(timeout)
+
+    async def warm(self, profile: Hashable, count: Optional[int] = None):
+        """Pre-create contexts for a profile without counting it as a lookup."""
+        await self.get_pool(profile, record_lookup=False).warm(count)
+
+    def _evict(self, keep: Hashable):
+        now = time.monotonic()
+        for profile in list(self._pools):
+            if profile == keep:
+                continue
+            over_capacity = len(self._pools) > self.max_profiles
+            idle_too_long = now - self._last_used[profile] > self.idle_timeout
+            if over_capacity or idle_too_long:
+                self._remove(profile)
+
+    def _remove(self, profile: Hashable):
+        pool = self._pools.pop(profile)
+        self._last_used.pop(profile, None)
+        self.evictions += 1
+        # Leased contexts are closed when they are returned to the closed pool
+        asyncio.create_task(pool.close())
+
+    @property
+    def in_use_count(self) -> int:
+        return sum(pool.in_use_count for pool in self._pools.values())
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'profiles': len(self._pools),
+            'pool_size': self.pool_size,
+            'in_use': self.in_use_count,
+            'idle': sum(pool.idle_count for pool in self._pools.values()),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    async def close(self):
+        """Close every pool. Pools are kept so in-flight leases can still be counted."""
+        for pool in list(self._pools.values()):
+            await pool.close()
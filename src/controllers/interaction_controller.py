@@ -1,15 +1,20 @@
+import asyncio
 import logging
-import time
+from typing import Optional
 from playwright.async_api import Page
-from playwright._impl._errors import Error as PlaywrightError
+from deadline import Deadline
 from exceptions import InteractionException, TimeoutException
+from network_tracker import NetworkTracker
+from page_stability import wait_for_page_stable
 
 logger = logging.getLogger(__name__)
 
 
 class InteractionController:
-    async def perform_interactions(self, page: Page, interactions: list):
+    async def perform_interactions(self, page: Page, interactions: list, deadline: Optional[Deadline] = None):
+        deadline = deadline or Deadline.unlimited()
         for step in interactions:
+            deadline.check(f"interaction {step.action}")
             try:
                 if step.action == "click":
                     await self._click(page, step.selector)
@@ -20,7 +25,7 @@ class InteractionController:
                 elif step.action == "scroll":
                     await self._scroll(page, step.x, step.y)
                 elif step.action == "wait_for":
-                    await self._handle_wait_for(page, step.wait_for)
+                    await self._handle_wait_for(page, step.wait_for, deadline)
             except Exception as e:
                 logger.error(f"Error performing interaction {step.action}: {str(e)}")
                 raise InteractionException(f"Failed to perform {step.action}: {str(e)}")
@@ -37,20 +42,25 @@ class InteractionController:
     async def _scroll(self, page: Page, x: int, y: int):
         await page.evaluate(f"window.scrollTo({x}, {y})")
 
-    async def _handle_wait_for(self, page: Page, wait_for_option):
+    async def _handle_wait_for(self, page: Page, wait_for_option, deadline: Deadline):
         try:
             if wait_for_option.type == "network_idle":
-                await self.wait_for_network_idle(page, wait_for_option.value)
+                await self.wait_for_network_idle(page, deadline.budget(int(wait_for_option.value)))
             elif wait_for_option.type == "network_mostly_idle":
-                await self.wait_for_network_mostly_idle(page, wait_for_option.value)
+                await self.wait_for_network_mostly_idle(page, deadline.budget(int(wait_for_option.value)))
             elif wait_for_option.type == "selector":
-                await self.wait_for_selector(page, wait_for_option.value, timeout=30000)  # Default 30s timeout
+                # Default 30s timeout
+                await self.wait_for_selector(page, wait_for_option.value, timeout=deadline.budget(30000))
             elif wait_for_option.type == "timeout":
-                await page.wait_for_timeout(wait_for_option.value)
+                await page.wait_for_timeout(deadline.budget(int(wait_for_option.value)))
         except TimeoutException as e:
             logger.warning(f"Timeout during wait_for action: {str(e)}")
             raise
 
+    async def wait_for_page_stable(self, page: Page, timeout: int) -> bool:
+        """Wait until requests, DOM mutations, fonts and layout shifts have all gone quiet."""
+        return await wait_for_page_stable(page, timeout)
+
     async def wait_for_network_idle(self, page: Page, timeout: int):
         try:
             await page.wait_for_load_state('networkidle', timeout=timeout)
@@ -58,60 +68,17 @@ class InteractionController:
             logger.warning(f"Timeout waiting for network idle: {timeout}ms")
             raise TimeoutException(f"Network did not become idle within {timeout}ms")
 
-    async def wait_for_network_mostly_idle(self, page: Page, timeout: int, idle_threshold: int = 2,
-                                           check_interval: int = 100):
-        """Wait for network activity to become mostly idle with improved error handling."""
-        try:
-            async def check_network_activity():
-                try:
-                    return await page.evaluate('''() => {
-                        return {
-                            pendingRequests: window.performance.getEntriesByType('resource')
-                                .filter(r => !r.responseEnd).length,
-                            recentRequests: window.performance.getEntriesByType('resource')
-                                .filter(r => r.responseEnd > performance.now() - 1000).length
-                        };
-                    }''')
-                except Exception:
-                    return {'pendingRequests': 0, 'recentRequests': 0}
-
-            start_time = time.time()
-            previous_activity = await check_network_activity()
-
-            while time.time() - start_time < timeout / 1000:  # Convert timeout to seconds
-                try:
-                    # Use shorter wait intervals
-                    await page.wait_for_timeout(min(check_interval, 50))
-
-                    current_activity = await check_network_activity()
-
-                    activity_delta = (
-                            abs(current_activity['recentRequests'] - previous_activity['recentRequests']) +
-                            abs(current_activity['pendingRequests'] - previous_activity['pendingRequests'])
-                    )
-
-                    if activity_delta <= idle_threshold:
-                        logger.debug("Network considered mostly idle")
-                        return
-
-                    previous_activity = current_activity
-
-                except PlaywrightError as e:
-                    # Handle specific Playwright errors
-                    if "Target closed" in str(e) or "Target page, context or browser has been closed" in str(e):
-                        logger.warning("Page closed during network wait, considering as idle")
-                        return
-                    raise
-                except Exception as e:
-                    logger.warning(f"Error during network activity check: {str(e)}")
-                    # Continue checking despite errors
+    async def wait_for_network_mostly_idle(self, page: Page, timeout: int, idle_threshold: int = 2):
+        """Wait for network activity to become mostly idle, without raising on timeout."""
+        tracker = NetworkTracker.for_page(page)
+        if tracker is None:
+            logger.warning("Page has no network tracker, skipping network mostly idle wait")
+            return
 
+        if await tracker.wait_for_mostly_idle(timeout, idle_threshold):
+            logger.debug("Network considered mostly idle")
+        else:
             logger.warning(f"Network did not become mostly idle within {timeout}ms")
-            # Don't raise an exception, just return
-
-        except Exception as e:
-            logger.error(f"Error in wait_for_network_mostly_idle: {str(e)}")
-            # Don't raise an exception, just return
 
     async def wait_for_selector(self, page: Page, selector: str, timeout: int):
         try:
@@ -127,21 +94,40 @@ class InteractionController:
             logger.warning(f"Navigation exceeded {timeout} seconds. Proceeding without waiting for full load.")
             raise TimeoutException(f"Navigation to {url} timed out after {timeout} seconds")
 
-    async def wait_for_animations(self, page: Page, timeout: int = 5000):
+    async def advance_virtual_time(self, page: Page, budget_ms: int, timeout: int) -> bool:
+        """
+        Fast-forward the page's timers and animations by `budget_ms` of virtual
+        time, which Chromium runs as fast as it can while no fetches are pending.
+
+        Waits at most `timeout` ms of wall-clock time. Returns False if the
+        budget didn't run out in time or virtual time isn't supported.
+        """
         try:
-            await page.evaluate(f"""
-                () => new Promise((resolve) => {{
-                    const checkAnimations = () => {{
-                        const animating = document.querySelector(':scope *:not(:where(:hover, :active))');
-                        if (!animating) {{
-                            resolve();
-                        }} else {{
-                            requestAnimationFrame(checkAnimations);
-                        }}
-                    }};
-                    checkAnimations();
-                    setTimeout(resolve, {timeout});
-                }})
-            """)
+            session = await page.context.new_cdp_session(page)
         except Exception as e:
-            logger.warning(f"Error waiting for animations: {str(e)}")
\ No newline at end of file
+            logger.warning(f"Virtual time needs a Chromium CDP session: {str(e)}")
+            return False
+
+        expired = asyncio.get_running_loop().create_future()
+        session.on('Emulation.virtualTimeBudgetExpired',
+                   lambda _: expired.done() or expired.set_result(True))
+        try:
+            await session.send('Emulation.setVirtualTimePolicy', {
+                'policy': 'pauseIfNetworkFetchesPending',
+                'budget': budget_ms
+            })
+            await asyncio.wait_for(expired, timeout / 1000)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"Virtual time budget of {budget_ms}ms did not run out within {timeout}ms")
+            return False
+        except Exception as e:
+            logger.warning(f"Error advancing virtual time: {str(e)}")
+            return False
+        finally:
+            # Virtual time stays paused once the budget is spent, which would stall the page's timers
+            try:
+                await session.send('Emulation.setVirtualTimePolicy', {'policy': 'advance'})
+                await session.detach()
+            except Exception as e:
+                logger.warning(f"Error restoring real time: {str(e)}")
@@ -1,11 +1,12 @@
-import asyncio
-import os
 import logging
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 from playwright.async_api import Page
-from exceptions import BrowserException, JavaScriptExecutionException
+from deadline import Deadline
+from exceptions import BrowserException, JavaScriptExecutionException, TimeoutException
 from controllers.interaction_controller import InteractionController
 from controllers.screenshot_controller import ScreenshotController
+from preparation_plan import PreparationPlan
+from script_registry import script_registry
 
 logger = logging.getLogger(__name__)
 
@@ -15,76 +16,77 @@ class MainBrowserController:
         self.interaction_controller = InteractionController()
         self.screenshot_controller = ScreenshotController()
 
-        # Initialize paths for JS files (moved from ContentController)
-        self.dynamic_content_detector_path = os.path.join(os.path.dirname(__file__),
-                                                          '../js/dynamic-content-detector.js')
-        self.dark_mode_js_path = os.path.join(os.path.dirname(__file__), '../js/dark-mode.js')
-
-    async def prepare_page(self, page: Page, options):
-        """Prepare page with improved error handling and more resilient network waiting."""
+    async def prepare_context(self, page: Page, options):
+        """Apply the settings that have to be in place before navigation."""
+        if options.geolocation:
+            try:
+                await self.set_geolocation(page, options.geolocation)
+            except Exception as e:
+                logger.warning(f"Geolocation setup failed, continuing: {str(e)}")
+
+    async def prepare_page(self, page: Page, options, deadline: Optional[Deadline] = None,
+                           scroll: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Run the request's preparation steps in the loaded page in one round-trip.
+
+        Returns the page's report: the applied steps, per-step errors and the
+        page height (after scrolling through it, if `scroll` is given).
+        """
+        deadline = deadline or Deadline.unlimited()
+        plan = PreparationPlan.from_options(options, deadline, scroll)
         try:
-            await self.prevent_horizontal_overflow(page)
-
-            # Combine network waits into a single operation with better error handling
-            if options.wait_for_network in ('idle', 'mostly_idle'):
-                try:
-                    # Use shorter timeout for network wait
-                    timeout = min(options.wait_for_timeout, 5000)
-                    if options.wait_for_network == 'idle':
-                        try:
-                            await self.interaction_controller.wait_for_network_idle(page, timeout)
-                        except Exception as e:
-                            logger.warning(f"Network idle wait failed, continuing: {str(e)}")
-                    else:
-                        try:
-                            await self.interaction_controller.wait_for_network_mostly_idle(page, timeout)
-                        except Exception as e:
-                            logger.warning(f"Network mostly idle wait failed, continuing: {str(e)}")
-                    setattr(page, '_waited_for_network', True)
-                except Exception as e:
-                    logger.warning(f"Network wait failed, continuing with page preparation: {str(e)}")
-
-            # Execute independent operations in parallel with error handling
-            tasks = []
-            if options.dark_mode:
-                tasks.append(self.apply_dark_mode(page))
-            if options.geolocation:
-                tasks.append(self.set_geolocation(page, options.geolocation))
-
-            if tasks:
-                try:
-                    await asyncio.gather(*tasks, return_exceptions=True)
-                except Exception as e:
-                    logger.warning(f"Some page preparation tasks failed: {str(e)}")
-
-            if options.wait_for_animation:
-                try:
-                    await self.interaction_controller.wait_for_animations(page, timeout=2000)
-                except Exception as e:
-                    logger.warning(f"Animation wait failed, continuing: {str(e)}")
-
-            if options.custom_js:
-                try:
-                    await self.execute_custom_js(page, options.custom_js)
-                except Exception as e:
-                    logger.warning(f"Custom JS execution failed: {str(e)}")
-
-            if options.wait_for_selector:
-                try:
-                    await self.interaction_controller.wait_for_selector(
-                        page,
-                        options.wait_for_selector,
-                        min(options.wait_for_timeout, 5000)
-                    )
-                except Exception as e:
-                    logger.warning(f"Selector wait failed: {str(e)}")
-
-            logger.info('Page prepared successfully')
+            # Custom JS may return a promise that never settles
+            result = await deadline.wait_for(
+                script_registry.invoke(page, 'prepare-page', plan.to_script_arg()), 'page preparation'
+            )
+        except TimeoutException:
+            raise
         except Exception as e:
             logger.error(f"Error preparing page: {str(e)}")
             error_message = f"Failed to prepare page: {str(e)}"
             raise BrowserException(error_message) from e
 
+        errors = result.get('errors') or {}
+        for step, error in errors.items():
+            logger.warning(f"Page preparation step {step} failed: {error}")
+
+        # Steps the page couldn't run itself are retried through Playwright. Custom JS
+        # that ran and failed isn't, since its side effects would happen twice.
+        if 'custom_js' in errors and result.get('evalBlocked'):
+            try:
+                await self.execute_custom_js(page, options.custom_js)
+            except Exception as e:
+                logger.warning(f"Custom JS execution failed: {str(e)}")
+
+        if 'wait_for_selector' in errors and 'not a valid selector' in errors['wait_for_selector']:
+            # Playwright-only selector syntax (text=, xpath=, ...)
+            try:
+                await self.interaction_controller.wait_for_selector(
+                    page,
+                    options.wait_for_selector,
+                    deadline.budget(min(options.wait_for_timeout, 5000))
+                )
+            except Exception as e:
+                logger.warning(f"Selector wait failed: {str(e)}")
+
+        logger.info(f"Page prepared in {result.get('elapsed')}ms, applied: {result.get('applied')}")
+        return result
+
+    async def wait_for_page_ready(self, page: Page, options, deadline: Optional[Deadline] = None):
+        """Wait for the navigated page to load according to the request's wait_for_network mode."""
+        deadline = deadline or Deadline.unlimited()
+        # Use shorter timeout for network wait
+        timeout = deadline.budget(min(options.wait_for_timeout, 5000))
+        try:
+            if options.wait_for_network == 'stable':
+                await self.interaction_controller.wait_for_page_stable(page, timeout)
+            elif options.wait_for_network == 'idle':
+                await self.interaction_controller.wait_for_network_idle(page, timeout)
+            else:
+                await self.interaction_controller.wait_for_network_mostly_idle(page, timeout)
+        except Exception as e:
+            logger.warning(f"Network wait failed, continuing: {str(e)}")
+
     # Content management methods (moved from ContentController)
     async def execute_custom_js(self, page: Page, custom_js: str):
         """Execute custom JavaScript on the page."""
@@ -94,47 +96,6 @@ class MainBrowserController:
             logger.error(f"Error executing custom JavaScript: {str(e)}")
             raise JavaScriptExecutionException(f"Error executing custom JavaScript: {str(e)}")
 
-    async def wait_for_dynamic_content(self, page: Page, check_interval: int = 1000, max_unchanged_checks: int = 5):
-        """Wait for dynamic content to finish loading."""
-        try:
-            with open(self.dynamic_content_detector_path, 'r') as file:
-                js_content = file.read()
-                await page.evaluate(js_content)
-            await page.evaluate(f'detectDynamicContentLoading({check_interval}, {max_unchanged_checks})')
-        except Exception as e:
-            logger.error(f"Error waiting for dynamic content: {str(e)}")
-            raise JavaScriptExecutionException(f"Failed to wait for dynamic content: {str(e)}")
-
-    async def apply_dark_mode(self, page: Page):
-        """Apply dark mode to the page."""
-        try:
-            with open(self.dark_mode_js_path, 'r') as file:
-                dark_mode_js = file.read()
-            await page.evaluate(dark_mode_js)
-            logger.info("Dark mode applied successfully")
-        except Exception as e:
-            logger.error(f"Error applying dark mode: {str(e)}")
-            raise JavaScriptExecutionException(f"Failed to apply dark mode: {str(e)}")
-
-    async def prevent_horizontal_overflow(self, page: Page):
-        """Prevent horizontal overflow on the page."""
-        try:
-            await page.evaluate("""
-                () => {
-                    const style = document.createElement('style');
-                    style.textContent = `
-                        body, html {
-                            max-width: 100vw !important;
-                            overflow-x: hidden !important;
-                        }
-                    `;
-                    document.head.appendChild(style);
-                }
-            """)
-        except Exception as e:
-            logger.error(f"Error preventing horizontal overflow: {str(e)}")
-            raise JavaScriptExecutionException(f"Failed to prevent horizontal overflow: {str(e)}")
-
     # Geolocation methods (moved from GeolocationController)
     async def set_geolocation(self, page: Page, location: Optional[Dict[str, float]]):
         """Set the geolocation for the page."""
@@ -143,52 +104,15 @@ class MainBrowserController:
             return
 
         try:
-            context = page.context
-            await context.grant_permissions(['geolocation'])
-            await context.set_geolocation(location)
-
             # Handle both dictionary and mock object
             latitude = location['latitude'] if isinstance(location, dict) else location.latitude
             longitude = location['longitude'] if isinstance(location, dict) else location.longitude
             accuracy = location['accuracy'] if isinstance(location, dict) else location.accuracy
 
-            await page.add_init_script(f"""
-                const mockGeolocation = {{
-                    getCurrentPosition: (success) => {{
-                        success({{
-                            coords: {{
-                                latitude: {latitude},
-                                longitude: {longitude},
-                                accuracy: {accuracy},
-                                altitude: null,
-                                altitudeAccuracy: null,
-                                heading: null,
-                                speed: null
-                            }},
-                            timestamp: Date.now()
-                        }});
-                    }},
-                    watchPosition: (success) => {{
-                        success({{
-                            coords: {{
-                                latitude: {latitude},
-                                longitude: {longitude},
-                                accuracy: {accuracy},
-                                altitude: null,
-                                altitudeAccuracy: null,
-                                heading: null,
-                                speed: null
-                            }},
-                            timestamp: Date.now()
-                        }});
-                        return 0;
-                    }},
-                }};
-                Object.defineProperty(navigator, 'geolocation', {{
-                    value: mockGeolocation,
-                    configurable: true,
-                }});
-            """)
+            # Chromium's own geolocation emulation, which the context pool resets between leases
+            context = page.context
+            await context.grant_permissions(['geolocation'])
+            await context.set_geolocation({'latitude': latitude, 'longitude': longitude, 'accuracy': accuracy})
 
             logger.info(f"Geolocation set to: {location}")
         except Exception as e:
@@ -196,19 +120,32 @@ class MainBrowserController:
             raise BrowserException(f"Failed to set geolocation: {str(e)}")
 
     # Screenshot preparation methods (delegated to ScreenshotController)
-    async def prepare_for_full_page_screenshot(self, page: Page, window_width: int):
+    async def prepare_for_full_page_screenshot(self, page: Page, window_width: int, strategy: str = 'viewport',
+                                               deadline: Optional[Deadline] = None,
+                                               page_height: Optional[int] = None) -> int:
         """Prepare for taking a full page screenshot."""
-        return await self.screenshot_controller.prepare_for_full_page_screenshot(page, window_width)
+        return await self.screenshot_controller.prepare_for_full_page_screenshot(
+            page, window_width, strategy, deadline, page_height
+        )
 
-    async def prepare_for_viewport_screenshot(self, page: Page, window_width: int, window_height: int):
+    async def prepare_for_viewport_screenshot(self, page: Page, window_width: int, window_height: int,
+                                              deadline: Optional[Deadline] = None):
         """Prepare for taking a viewport screenshot."""
-        return await self.screenshot_controller.prepare_for_viewport_screenshot(page, window_width, window_height)
+        return await self.screenshot_controller.prepare_for_viewport_screenshot(
+            page, window_width, window_height, deadline
+        )
 
     # Interaction methods (delegated to InteractionController)
     async def goto_with_timeout(self, page: Page, url: str, timeout: float = 5.0):
         """Navigate to a URL with timeout."""
         return await self.interaction_controller.goto_with_timeout(page, url, timeout)
 
-    async def perform_interactions(self, page: Page, interactions: list):
+    async def advance_virtual_time(self, page: Page, budget_ms: int, deadline: Optional[Deadline] = None) -> bool:
+        """Fast-forward the page's timers by a virtual time budget."""
+        deadline = deadline or Deadline.unlimited()
+        # Virtual time usually runs far faster than real time; the budget itself bounds the wait
+        return await self.interaction_controller.advance_virtual_time(page, budget_ms, deadline.budget(budget_ms))
+
+    async def perform_interactions(self, page: Page, interactions: list, deadline: Optional[Deadline] = None):
         """Perform a series of interactions on the page."""
-        return await self.interaction_controller.perform_interactions(page, interactions)
\ No newline at end of file
+        return await self.interaction_controller.perform_interactions(page, interactions, deadline)
\ No newline at end of file
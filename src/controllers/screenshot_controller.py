@@ -1,25 +1,41 @@
+import asyncio
 from playwright.async_api import Page, TimeoutError
 import logging
+from typing import Optional
+from config import config
+from deadline import Deadline
 from exceptions import BrowserException, TimeoutException
+from page_stability import wait_for_page_stable
+from script_registry import script_registry
+from tile_stitcher import FORMAT_MAX_HEIGHT, TileStitcher
 
 logger = logging.getLogger(__name__)
 
 
 class ScreenshotController:
     MAX_VIEWPORT_HEIGHT = 16384
+    MAX_TILED_PIXELS = config.FULL_PAGE_TILED_MAX_PIXELS
+    TILE_HEIGHT = 4096
     NETWORK_IDLE_TIMEOUT_MS = 5000
-    SCROLL_PAUSE_MS = 500
+    # Upper bound on waiting for the page to settle after scrolling or resizing
+    SETTLE_TIMEOUT_MS = 1000
+    # Budget for scrolling through a page to trigger lazy loading
+    SCROLL_MAX_HEIGHT = config.FULL_PAGE_SCROLL_MAX_HEIGHT
+    SCROLL_TIMEOUT_MS = config.FULL_PAGE_SCROLL_TIMEOUT_MS
+    SCROLL_IMAGE_TIMEOUT_MS = 1000
+    SCROLL_SETTLE_MS = 50
     SCREENSHOT_TIMEOUT_MS = 10000
 
-    async def take_screenshot(self, page: Page, options: dict) -> bytes:
-        """Take a screenshot with graceful timeout handling."""
+    async def take_screenshot(self, page: Page, options: dict, deadline: Optional[Deadline] = None) -> bytes:
+        """Take a screenshot with graceful timeout handling and return the image bytes."""
+        deadline = deadline or Deadline.unlimited()
+        deadline.check('taking the screenshot')
         screenshot_options = {
-            'path': options.get('path'),
             'full_page': options.get('full_page', False),
             'type': options.get('format', 'png'),
             'quality': options.get('quality') if options.get('format') != 'png' else None,
             'omit_background': options.get('omit_background', False),
-            'timeout': self.SCREENSHOT_TIMEOUT_MS
+            'timeout': deadline.budget(self.SCREENSHOT_TIMEOUT_MS)
         }
 
         try:
@@ -28,9 +44,10 @@ class ScreenshotController:
         except TimeoutError as e:
             logger.warning(f"Initial screenshot attempt timed out: {str(e)}. Attempting fallback capture...")
 
-            # Remove timeout and try again with minimal options
+            # Try again with minimal options and whatever time is left
+            deadline.check('the fallback screenshot')
             fallback_options = screenshot_options.copy()
-            fallback_options.pop('timeout', None)  # Remove timeout
+            fallback_options['timeout'] = deadline.budget()
 
             try:
                 # Attempt fallback screenshot with minimal waiting
@@ -61,9 +78,9 @@ class ScreenshotController:
         try:
             # Remove potentially problematic options
             minimal_options = {
-                'path': options.get('path'),
                 'type': options.get('format', 'png'),
-                'full_page': options.get('full_page', False)
+                'full_page': options.get('full_page', False),
+                'timeout': options.get('timeout', 0)
             }
 
             # Try to stabilize the page state
@@ -77,72 +94,143 @@ class ScreenshotController:
             logger.error(f"Fallback screenshot failed: {str(e)}")
             raise
 
-    async def prepare_for_full_page_screenshot(self, page: Page, window_width: int):
-        """Prepare page for full-page screenshot with improved timeout handling."""
+    def tiled_height_limit(self, width: int, pixel_density: float, image_format: str) -> int:
+        """
+        Tallest page (CSS pixels) a tiled capture covers: the pixel budget and
+        the encoder's height limit both apply to device pixels.
+        """
+        limit = self.MAX_TILED_PIXELS / (width * pixel_density ** 2)
+        if image_format in FORMAT_MAX_HEIGHT:
+            limit = min(limit, FORMAT_MAX_HEIGHT[image_format] / pixel_density)
+        return max(1, int(limit))
+
+    def use_tiles(self, strategy: str, page_height: int) -> bool:
+        """Decide whether a full-page capture is taken in tiles rather than one tall viewport."""
+        return strategy == 'tiled' or (strategy == 'auto' and page_height > self.MAX_VIEWPORT_HEIGHT)
+
+    async def take_tiled_screenshot(self, page: Page, page_height: int, options: dict,
+                                    deadline: Optional[Deadline] = None) -> bytes:
+        """
+        Capture the page in fixed-height clip regions and stitch them together.
+
+        Each tile is decoded and pasted on a worker thread while the next tile
+        is being captured, and the renderer never has to paint more than one
+        tile at a time.
+        """
+        deadline = deadline or Deadline.unlimited()
+        width = page.viewport_size['width']
+        image_format = options.get('format', 'png')
+        pixel_density = options.get('pixel_density') or 1.0
+        max_height = self.tiled_height_limit(width, pixel_density, image_format)
+        if page_height > max_height:
+            logger.warning(f"Truncating full-page capture of {page.url} from {page_height}px to {max_height}px "
+                           f"({width}px wide at DPR {pixel_density}, {image_format})")
+            page_height = max_height
+        stitcher = TileStitcher(page_height, image_format, transparent=options.get('omit_background', False))
+
+        pending = None
         try:
-            # Scroll to bottom with reduced timeout
-            try:
-                await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-            except Exception as e:
-                logger.warning(f"Initial scroll failed: {str(e)}. Continuing with capture...")
-
-            # Try network idle wait with short timeout
-            try:
-                await page.wait_for_load_state('networkidle', timeout=1000)
-            except TimeoutError:
-                logger.warning("Network idle timeout reached, continuing with capture")
-
-            # Get page height with fallback
-            try:
-                full_height = await page.evaluate('document.body.scrollHeight')
-                if not isinstance(full_height, (int, float)) or full_height <= 0:
-                    full_height = self.MAX_VIEWPORT_HEIGHT
-            except Exception:
-                full_height = self.MAX_VIEWPORT_HEIGHT
-                logger.warning(f"Failed to get page height, using maximum: {self.MAX_VIEWPORT_HEIGHT}")
-
-            # Enforce maximum height limit
-            full_height = min(full_height, self.MAX_VIEWPORT_HEIGHT)
-
-            # Set viewport size
-            try:
-                await page.set_viewport_size({'width': window_width, 'height': full_height})
-            except Exception as e:
-                logger.warning(f"Viewport size adjustment failed: {str(e)}")
-
-            # Final scroll to top
-            try:
-                await page.evaluate('window.scrollTo(0, 0)')
-            except Exception as e:
-                logger.warning(f"Final scroll failed: {str(e)}")
+            for top in range(0, page_height, self.TILE_HEIGHT):
+                height = min(self.TILE_HEIGHT, page_height - top)
+                deadline.check('capturing the next tile')
+                # Tiles are lossless so stitching doesn't compound compression artefacts
+                tile = await page.screenshot(
+                    type='png',
+                    full_page=True,
+                    clip={'x': 0, 'y': top, 'width': width, 'height': height},
+                    omit_background=options.get('omit_background', False),
+                    timeout=deadline.budget(self.SCREENSHOT_TIMEOUT_MS)
+                )
+                if pending:
+                    await pending
+                pending = asyncio.ensure_future(asyncio.to_thread(stitcher.add, tile, height))
+
+            if pending:
+                await pending
+                pending = None
+        finally:
+            if pending and not pending.done():
+                await asyncio.gather(pending, return_exceptions=True)
+
+        logger.info(f"Stitched full-page screenshot from {-(-page_height // self.TILE_HEIGHT)} tiles")
+        return await asyncio.to_thread(stitcher.encode, options.get('quality'))
+
+    def scroll_args(self, deadline: Deadline) -> dict:
+        """Arguments for js/lazy-load-scroller.js within the capture's budget."""
+        return {
+            'maxHeight': self.SCROLL_MAX_HEIGHT,
+            'timeoutMs': deadline.budget(self.SCROLL_TIMEOUT_MS),
+            'imageTimeoutMs': self.SCROLL_IMAGE_TIMEOUT_MS,
+            'settleMs': self.SCROLL_SETTLE_MS
+        }
 
-            # Brief pause to let the page settle
-            await page.wait_for_timeout(self.SCROLL_PAUSE_MS)
+    async def scroll_through_page(self, page: Page, deadline: Optional[Deadline] = None) -> dict:
+        """
+        Scroll down one viewport at a time, waiting for images that come into
+        view, until the height is stable or the pixel/time budget runs out.
+        The page is left scrolled to the top.
+        """
+        deadline = deadline or Deadline.unlimited()
+        result = await script_registry.invoke(page, 'lazy-load-scroller', self.scroll_args(deadline))
+        logger.info(f"Scrolled through page in {result['steps']} steps ({result['elapsed']}ms), "
+                    f"stopped at {result['reason']}, height {result['height']}px")
+        return result
+
+    async def prepare_for_full_page_screenshot(self, page: Page, window_width: int, strategy: str = 'viewport',
+                                               deadline: Optional[Deadline] = None,
+                                               page_height: Optional[int] = None) -> int:
+        """
+        Prepare page for full-page screenshot with improved timeout handling.
+
+        Returns the measured page height. Pass `page_height` if the page was
+        already scrolled through (e.g. by the preparation plan). The viewport is
+        only stretched to the page height when the capture won't be taken in tiles.
+        """
+        deadline = deadline or Deadline.unlimited()
+        full_height = self.MAX_VIEWPORT_HEIGHT
+        try:
+            if page_height is None:
+                # Scroll through the page so lazy-loaded content renders
+                try:
+                    result = await self.scroll_through_page(page, deadline)
+                    page_height = result['height']
+                except Exception as e:
+                    logger.warning(f"Scrolling through page failed, using maximum height: {str(e)}")
+
+            if isinstance(page_height, (int, float)) and page_height > 0:
+                full_height = page_height
+
+            if not self.use_tiles(strategy, full_height):
+                # Enforce maximum height limit
+                viewport_height = min(full_height, self.MAX_VIEWPORT_HEIGHT)
+
+                # Set viewport size
+                try:
+                    await page.set_viewport_size({'width': window_width, 'height': viewport_height})
+                except Exception as e:
+                    logger.warning(f"Viewport size adjustment failed: {str(e)}")
+
+            # Let the page settle
+            await wait_for_page_stable(page, deadline.budget(self.SETTLE_TIMEOUT_MS))
 
         except Exception as e:
             logger.error(f"Error in prepare_for_full_page_screenshot: {str(e)}")
             logger.warning("Continuing with capture despite preparation errors...")
 
-    async def prepare_for_viewport_screenshot(self, page: Page, window_width: int, window_height: int):
+        return int(full_height)
+
+    async def prepare_for_viewport_screenshot(self, page: Page, window_width: int, window_height: int,
+                                              deadline: Optional[Deadline] = None):
         """Prepare page for viewport-specific screenshot."""
+        deadline = deadline or Deadline.unlimited()
         try:
-            # Set viewport size
-            await page.set_viewport_size({
-                'width': window_width,
-                'height': window_height
-            })
-
-            # Wait for network idle with timeout
-            try:
-                await page.wait_for_load_state('networkidle', timeout=self.NETWORK_IDLE_TIMEOUT_MS)
-            except TimeoutError:
-                logger.warning("Network idle timeout reached during viewport preparation")
-
-            # Scroll to top of page
-            await page.evaluate('window.scrollTo(0, 0)')
+            # Pooled pages usually have the right size already
+            viewport = {'width': window_width, 'height': window_height}
+            if page.viewport_size != viewport:
+                await page.set_viewport_size(viewport)
 
-            # Brief pause to let the page settle
-            await page.wait_for_timeout(self.SCROLL_PAUSE_MS)
+            # Wait for the resized page to settle
+            await wait_for_page_stable(page, deadline.budget(self.NETWORK_IDLE_TIMEOUT_MS))
 
         except Exception as e:
             logger.error(f"Error in prepare_for_viewport_screenshot: {str(e)}")
@@ -0,0 +1,61 @@
+import asyncio
+import math
+import time
+from typing import Awaitable, Optional, TypeVar
+
+from exceptions import TimeoutException
+
+T = TypeVar('T')
+
+
+class Deadline:
+    """
+    Time budget for one capture, shared by every stage of the pipeline.
+
+    Created when the request arrives. Each stage asks for `budget(cap)`, its
+    own limit clipped to what is left, so the stages can't add up to more than
+    the request's total.
+    """
+
+    def __init__(self, timeout_ms: Optional[float]):
+        self.timeout_ms = timeout_ms
+        self.expires_at = time.monotonic() + timeout_ms / 1000 if timeout_ms is not None else None
+
+    @classmethod
+    def unlimited(cls) -> 'Deadline':
+        return cls(None)
+
+    def remaining_ms(self) -> float:
+        if self.expires_at is None:
+            return math.inf
+        return max(0.0, (self.expires_at - time.monotonic()) * 1000)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining_ms() <= 0
+
+    def budget(self, cap_ms: Optional[float] = None) -> int:
+        """
+        Get a timeout (ms) for the next stage: `cap_ms` or whatever remains, if less.
+
+        Never returns 0 for a limited deadline, since Playwright reads a zero
+        timeout as "wait forever".
+        """
+        remaining = self.remaining_ms()
+        if cap_ms is not None:
+            remaining = min(remaining, cap_ms)
+        if math.isinf(remaining):
+            return 0
+        return max(1, int(remaining))
+
+    def check(self, stage: str):
+        """Raise if the budget ran out before `stage` could start."""
+        if self.expired:
+            raise TimeoutException(f"Capture deadline of {self.timeout_ms}ms exceeded before {stage}")
+
+    async def wait_for(self, awaitable: Awaitable[T], stage: str) -> T:
+        """Await a stage that has no timeout of its own, raising as `check` does if the budget runs out."""
+        try:
+            return await asyncio.wait_for(awaitable, self.remaining_ms() / 1000)
+        except asyncio.TimeoutError:
+            raise TimeoutException(f"Capture deadline of {self.timeout_ms}ms exceeded during {stage}") from None
@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from ua_generator import generate as generate_ua
+
+
+@dataclass(frozen=True)
+class EmulationProfile:
+    """
+    The context-level emulation settings a capture needs.
+
+    Playwright fixes these when a context is created, so requests that share a
+    profile can share warm contexts while requests that differ need their own.
+    """
+    width: int = 1920
+    height: int = 1080
+    device_scale_factor: float = 1.0
+    is_mobile: bool = False
+    color_scheme: str = 'light'
+    reduced_motion: str = 'no-preference'
+    forced_colors: str = 'none'
+    user_agent_options: Optional[Tuple[Tuple[str, str], ...]] = None
+    proxy: Optional[Tuple[Tuple[str, str], ...]] = None
+
+    @classmethod
+    def from_options(cls, options, proxy: Optional[Dict[str, str]] = None) -> 'EmulationProfile':
+        """Build the profile for a CaptureRequest."""
+        user_agent_options = None
+        if getattr(options, 'use_random_user_agent', False):
+            user_agent_options = tuple(
+                (key, value) for key, value in (
+                    ('device', getattr(options, 'user_agent_device', None)),
+                    ('platform', getattr(options, 'user_agent_platform', None)),
+                    ('browser', getattr(options, 'user_agent_browser', None)),
+                ) if value
+            )
+
+        return cls(
+            width=options.window_width,
+            height=options.window_height,
+            device_scale_factor=float(options.pixel_density or 1.0),
+            is_mobile=getattr(options, 'user_agent_device', None) == 'mobile',
+            color_scheme='dark' if options.dark_mode else 'light',
+            reduced_motion='reduce' if getattr(options, 'reduced_motion', False) else 'no-preference',
+            forced_colors='active' if getattr(options, 'forced_colors', False) else 'none',
+            user_agent_options=user_agent_options,
+            proxy=cls.from_proxy(proxy)
+        )
+
+    @staticmethod
+    def from_proxy(proxy: Optional[Dict[str, str]]) -> Optional[Tuple[Tuple[str, str], ...]]:
+        """Convert a Playwright proxy dict into a hashable profile field."""
+        return tuple(sorted(proxy.items())) if proxy else None
+
+    def to_context_options(self) -> Dict:
+        """Get the keyword arguments for `browser.new_context`."""
+        context_options = {
+            'viewport': {'width': self.width, 'height': self.height},
+            'device_scale_factor': self.device_scale_factor,
+            'is_mobile': self.is_mobile,
+            'has_touch': self.is_mobile,
+            'color_scheme': self.color_scheme,
+            'reduced_motion': self.reduced_motion,
+            'forced_colors': self.forced_colors
+        }
+
+        if self.user_agent_options is not None:
+            context_options['user_agent'] = generate_ua(**dict(self.user_agent_options)).text
+
+        if self.proxy:
+            context_options['proxy'] = dict(self.proxy)
+
+        return context_options
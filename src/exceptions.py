@@ -6,6 +6,10 @@ class BrowserException(ScreenshotServiceException):
     """Exception raised for errors in browser operations"""
 
 
+class BrowserCrashedException(BrowserException):
+    """Exception raised when the browser crashes or disconnects during a capture"""
+
+
 class NetworkException(ScreenshotServiceException):
     """Exception raised for network-related errors"""
 
@@ -36,3 +40,11 @@ class SignatureExpiredError(AuthenticationError):
 
 class InvalidSignatureError(AuthenticationError):
     pass
+
+
+class CapacityExceededException(ScreenshotServiceException):
+    """Exception raised when a capture can't be admitted because the service is saturated"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
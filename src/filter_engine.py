@@ -0,0 +1,374 @@
+import logging
+import os
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# URL tokens: the runs of characters that can't be part of a separator
+TOKEN_RE = re.compile(r'[a-z0-9%]+')
+
+# A rule that is just `||host^` only needs a hostname lookup
+DOMAIN_RULE_RE = re.compile(r'^\|\|([a-z0-9][a-z0-9.-]*[a-z0-9])\^$')
+
+# What `^` matches: anything but a letter, digit or one of _-.%, or the end of the URL
+SEPARATOR_REGEX = r'(?:[^a-z0-9_\-.%]|$)'
+
+# Filter list type options and the Playwright resource types they match
+TYPE_OPTIONS = {
+    'script': ('script',),
+    'image': ('image',),
+    'stylesheet': ('stylesheet',),
+    'css': ('stylesheet',),
+    'xmlhttprequest': ('xhr', 'fetch'),
+    'xhr': ('xhr', 'fetch'),
+    'media': ('media',),
+    'font': ('font',),
+    'ping': ('ping', 'beacon'),
+    'websocket': ('websocket',),
+    'subdocument': ('document',),
+    'frame': ('document',),
+    'other': ('other', 'eventsource', 'manifest', 'texttrack'),
+}
+
+# Options that don't change which requests a rule blocks
+IGNORED_OPTIONS = {'match-case', 'object', 'object-subrequest', 'genericblock'}
+
+
+def hostname(url: str) -> str:
+    """The hostname of a lower-case URL, without parsing the rest of it."""
+    start = url.find('://')
+    start = start + 3 if start != -1 else 0
+    end = len(url)
+    for char in '/?#':
+        index = url.find(char, start, end)
+        if index != -1:
+            end = index
+    host = url[start:end]
+    at = host.rfind('@')
+    if at != -1:
+        host = host[at + 1:]
+    colon = host.rfind(':')
+    if colon != -1 and not host.endswith(']'):
+        host = host[:colon]
+    return host
+
+
+def host_suffixes(host: str) -> Iterable[str]:
+    """`a.b.example.com`, `b.example.com`, `example.com`, `com`."""
+    yield host
+    index = host.find('.')
+    while index != -1:
+        yield host[index + 1:]
+        index = host.find('.', index + 1)
+
+
+def base_domain(host: str) -> str:
+    """
+    Approximate registrable domain: the last two labels, or three under short
+    second-level labels like `co.uk`. Good enough to tell first and third party apart.
+    """
+    labels = host.split('.')
+    if len(labels) > 2 and len(labels[-1]) == 2 and len(labels[-2]) <= 3:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+def pattern_to_regex(pattern: str) -> str:
+    prefix = suffix = ''
+    if pattern.startswith('||'):
+        prefix = r'^[a-z][a-z0-9+.\-]*://(?:[^/?#]*\.)?'
+        pattern = pattern[2:]
+    elif pattern.startswith('|'):
+        prefix = '^'
+        pattern = pattern[1:]
+    if pattern.endswith('|'):
+        suffix = '$'
+        pattern = pattern[:-1]
+
+    parts = []
+    for char in pattern:
+        if char == '*':
+            parts.append('.*')
+        elif char == '^':
+            parts.append(SEPARATOR_REGEX)
+        else:
+            parts.append(re.escape(char))
+    return prefix + ''.join(parts) + suffix
+
+
+def pattern_tokens(pattern: str) -> List[str]:
+    """
+    Tokens every URL matching the pattern must contain whole: runs of token
+    characters not next to a wildcard or an unanchored end of the pattern.
+    """
+    tokens = []
+    for match in TOKEN_RE.finditer(pattern):
+        start, end = match.span()
+        if start == 0 or pattern[start - 1] == '*':
+            continue
+        if end == len(pattern) or pattern[end] == '*':
+            continue
+        if len(match.group()) > 1:
+            tokens.append(match.group())
+    return tokens
+
+
+class FilterRule:
+    __slots__ = ('text', 'pattern', 'exception', 'important', 'resource_types', 'excluded_types',
+                 'third_party', 'include_domains', 'exclude_domains', 'hits', '_regex')
+
+    def __init__(self, text: str, pattern: str, exception: bool = False):
+        self.text = text
+        self.pattern = pattern
+        self.exception = exception
+        self.important = False
+        self.resource_types: Optional[FrozenSet[str]] = None
+        self.excluded_types: FrozenSet[str] = frozenset()
+        self.third_party: Optional[bool] = None
+        self.include_domains: FrozenSet[str] = frozenset()
+        self.exclude_domains: FrozenSet[str] = frozenset()
+        self.hits = 0
+        self._regex = None
+
+    @property
+    def regex(self):
+        # Compiled on first use: most rules never see a URL with their token
+        if self._regex is None:
+            self._regex = re.compile(pattern_to_regex(self.pattern))
+        return self._regex
+
+    def applies(self, resource_type: str, third_party: bool, source_host: Optional[str]) -> bool:
+        """Whether the rule's options allow it for this request (its pattern is checked separately)."""
+        if self.resource_types is not None and resource_type not in self.resource_types:
+            return False
+        if resource_type in self.excluded_types:
+            return False
+        if self.third_party is not None and self.third_party != third_party:
+            return False
+        if self.include_domains or self.exclude_domains:
+            suffixes = set(host_suffixes(source_host)) if source_host else set()
+            if self.include_domains and not suffixes & self.include_domains:
+                return False
+            if suffixes & self.exclude_domains:
+                return False
+        return True
+
+
+def parse_rule(line: str) -> Optional[FilterRule]:
+    """Parse one filter list line. Returns None for comments, cosmetic and unsupported rules."""
+    line = line.strip()
+    if not line or line.startswith(('!', '[')):
+        return None
+    # Element hiding rules (##, #@#, #?#, #$#) are applied in the page, not to requests
+    if '#' in line and re.search(r'#[@?$%]*#', line):
+        return None
+
+    exception = line.startswith('@@')
+    text = line
+    if exception:
+        line = line[2:]
+
+    options = ''
+    dollar = line.rfind('$')
+    if dollar != -1 and re.fullmatch(r'[\w\-~=.|,*]+', line[dollar + 1:]):
+        line, options = line[:dollar], line[dollar + 1:]
+
+    # Regular expression rules would need a regex scan per URL
+    if len(line) > 1 and line.startswith('/') and line.endswith('/'):
+        return None
+
+    # Leading and trailing wildcards are implied
+    pattern = line.lower().strip('*') or '*'
+
+    rule = FilterRule(text, pattern, exception)
+    if options and not _apply_options(rule, options.lower()):
+        return None
+    return rule
+
+
+def _apply_options(rule: FilterRule, options: str) -> bool:
+    resource_types = set()
+    excluded_types = set()
+    for option in options.split(','):
+        negated = option.startswith('~')
+        name = option[1:] if negated else option
+        if name in TYPE_OPTIONS:
+            (excluded_types if negated else resource_types).update(TYPE_OPTIONS[name])
+        elif name in ('third-party', '3p'):
+            rule.third_party = not negated
+        elif name in ('first-party', '1p'):
+            rule.third_party = negated
+        elif name.startswith('domain='):
+            domains = name[len('domain='):].split('|')
+            rule.include_domains = frozenset(d for d in domains if d and not d.startswith('~'))
+            rule.exclude_domains = frozenset(d[1:] for d in domains if d.startswith('~'))
+        elif name == 'important':
+            rule.important = True
+        elif name in IGNORED_OPTIONS:
+            continue
+        else:
+            # popup, csp, redirect, removeparam, document, ... change more than blocking
+            return False
+
+    if resource_types:
+        rule.resource_types = frozenset(resource_types)
+    rule.excluded_types = frozenset(excluded_types)
+    return True
+
+
+class RuleSet:
+    """
+    Rules indexed for lookup by URL.
+
+    Plain `||host^` rules go in a hostname hash table, checked once per suffix
+    of the request's host. Every other rule is indexed under its rarest token,
+    so a URL is only matched against the rules sharing one of its tokens.
+    """
+
+    def __init__(self, rules: List[FilterRule]):
+        self.by_domain: Dict[str, List[FilterRule]] = {}
+        self.by_token: Dict[str, List[FilterRule]] = {}
+        self.untokenized: List[FilterRule] = []
+
+        pattern_rules = []
+        for rule in rules:
+            match = DOMAIN_RULE_RE.match(rule.pattern)
+            if match:
+                self.by_domain.setdefault(match.group(1), []).append(rule)
+            else:
+                pattern_rules.append((rule, pattern_tokens(rule.pattern)))
+
+        frequency = Counter(token for _, tokens in pattern_rules for token in set(tokens))
+        for rule, tokens in pattern_rules:
+            if tokens:
+                token = min(tokens, key=lambda t: (frequency[t], -len(t)))
+                self.by_token.setdefault(token, []).append(rule)
+            else:
+                self.untokenized.append(rule)
+
+    def __len__(self):
+        return (sum(len(rules) for rules in self.by_domain.values()) +
+                sum(len(rules) for rules in self.by_token.values()) + len(self.untokenized))
+
+    def find(self, url: str, host: str, resource_type: str, third_party: bool,
+             source_host: Optional[str]) -> Optional[FilterRule]:
+        by_domain = self.by_domain
+        if by_domain:
+            for suffix in host_suffixes(host):
+                for rule in by_domain.get(suffix, ()):
+                    if rule.applies(resource_type, third_party, source_host):
+                        return rule
+
+        by_token = self.by_token
+        seen = set()
+        for token in TOKEN_RE.findall(url):
+            if token in seen:
+                continue
+            seen.add(token)
+            for rule in by_token.get(token, ()):
+                if rule.applies(resource_type, third_party, source_host) and rule.regex.search(url):
+                    return rule
+
+        for rule in self.untokenized:
+            if rule.applies(resource_type, third_party, source_host) and rule.regex.search(url):
+                return rule
+        return None
+
+
+class FilterEngine:
+    """
+    Blocks requests matching EasyList/EasyPrivacy-format filter lists.
+
+    Network rules are compiled into a blocking and an exception `RuleSet`;
+    element hiding rules and options that rewrite rather than block requests
+    are skipped when the lists are parsed.
+    """
+
+    def __init__(self, rules: Iterable[FilterRule]):
+        rules = list(rules)
+        self.blocking = RuleSet([rule for rule in rules if not rule.exception])
+        self.exceptions = RuleSet([rule for rule in rules if rule.exception])
+        self.checked = 0
+        self.blocked = 0
+        self.excepted = 0
+        self.match_time_ns = 0
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> 'FilterEngine':
+        return cls(rule for rule in map(parse_rule, lines) if rule is not None)
+
+    @classmethod
+    def from_files(cls, paths: Iterable[str]) -> 'FilterEngine':
+        def lines():
+            for path in paths:
+                with open(path, 'r', encoding='utf-8', errors='replace') as file:
+                    yield from file
+
+        return cls.from_lines(lines())
+
+    def __len__(self):
+        return len(self.blocking) + len(self.exceptions)
+
+    def match(self, url: str, resource_type: str = 'other',
+              source_host: Optional[str] = None) -> Optional[FilterRule]:
+        """The blocking rule for a request, or None if it should load."""
+        start = time.perf_counter_ns()
+        try:
+            self.checked += 1
+            url = url.lower()
+            host = hostname(url)
+            # Without a source page (inline HTML), every request counts as third party
+            third_party = source_host is None or base_domain(host) != base_domain(source_host)
+
+            rule = self.blocking.find(url, host, resource_type, third_party, source_host)
+            if rule is None:
+                return None
+            if not rule.important and self.exceptions.find(url, host, resource_type, third_party, source_host):
+                self.excepted += 1
+                return None
+
+            rule.hits += 1
+            self.blocked += 1
+            return rule
+        finally:
+            self.match_time_ns += time.perf_counter_ns() - start
+
+    def top_rules(self, limit: int = 10) -> List[Dict[str, Any]]:
+        rules = [rule for rules in self.blocking.by_domain.values() for rule in rules if rule.hits]
+        rules += [rule for rules in self.blocking.by_token.values() for rule in rules if rule.hits]
+        rules += [rule for rule in self.blocking.untokenized if rule.hits]
+        rules.sort(key=lambda rule: rule.hits, reverse=True)
+        return [{'rule': rule.text, 'hits': rule.hits} for rule in rules[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'rules': len(self),
+            'checked': self.checked,
+            'blocked': self.blocked,
+            'excepted': self.excepted,
+            'avg_match_us': round(self.match_time_ns / self.checked / 1000, 2) if self.checked else 0.0,
+            'top_rules': self.top_rules()
+        }
+
+
+def load_filter_engine(paths: str) -> Optional[FilterEngine]:
+    """Compile the comma-separated filter list files, or return None if none are configured."""
+    files = []
+    for path in (path.strip() for path in (paths or '').split(',')):
+        if not path:
+            continue
+        if os.path.exists(path):
+            files.append(path)
+        else:
+            logger.warning(f"Filter list not found, skipping: {path}")
+    if not files:
+        return None
+
+    start = time.perf_counter()
+    engine = FilterEngine.from_files(files)
+    logger.info(f"Compiled {len(engine)} filter rules from {len(files)} lists "
+                f"in {(time.perf_counter() - start) * 1000:.0f}ms")
+    return engine
@@ -0,0 +1,135 @@
+// File: consent-blocker.js
+
+// Headless replacement for the cookie and popup blocking extensions, run as
+// an init script in every frame. Hides known consent banners and overlays
+// with a stylesheet, clicks their reject (or else accept) buttons as they
+// appear, and hides other fixed overlays that look like consent, newsletter
+// or notification prompts. The stylesheet is switched off while buttons are
+// looked for, since a hidden button has no layout and wouldn't be clicked.
+// Mutations are only watched for `watchMs`.
+(rules) => {
+    if (window.__pixashotConsent) {
+        return window.__pixashotConsent;
+    }
+    const report = window.__pixashotConsent = {hidden: 0, clicked: 0, overlays: 0};
+
+    const addStyle = (css) => {
+        if (!css) {
+            return null;
+        }
+        const style = document.createElement('style');
+        style.textContent = css;
+        (document.head || document.documentElement).appendChild(style);
+        return style;
+    };
+
+    const hide = [];
+    if (rules.cookies) {
+        hide.push(...rules.cookies.hide);
+    }
+    if (rules.popups) {
+        hide.push(...rules.popups.hide);
+    }
+
+    let unlocked = false;
+    const unlock = () => {
+        if (!unlocked) {
+            unlocked = true;
+            addStyle((rules.unlock || []).join('\n'));
+        }
+    };
+
+    const clicked = new WeakSet();
+    const clickConsent = () => {
+        const pairs = rules.cookies ? rules.cookies.click : {};
+        for (const container in pairs) {
+            const root = document.querySelector(container);
+            if (!root) {
+                continue;
+            }
+            for (const selector of pairs[container]) {
+                const button = root.querySelector(selector) || document.querySelector(selector);
+                if (button && !clicked.has(button) && button.getClientRects().length) {
+                    clicked.add(button);
+                    button.click();
+                    report.clicked++;
+                    unlock();
+                    break;
+                }
+            }
+        }
+    };
+
+    const keywords = rules.popups && rules.popups.keywords ? new RegExp(rules.popups.keywords, 'i') : null;
+    const hideOverlays = () => {
+        if (!keywords || !document.body) {
+            return;
+        }
+        const viewport = window.innerWidth * window.innerHeight;
+        for (const element of document.body.children) {
+            const style = getComputedStyle(element);
+            if (style.position !== 'fixed' && style.position !== 'sticky') {
+                continue;
+            }
+            if ((parseInt(style.zIndex, 10) || 0) < rules.popups.minZIndex) {
+                continue;
+            }
+            const rect = element.getBoundingClientRect();
+            const coverage = viewport ? rect.width * rect.height / viewport : 0;
+            if (coverage >= rules.popups.minCoverage && keywords.test(element.textContent || '')) {
+                element.style.setProperty('display', 'none', 'important');
+                report.overlays++;
+                unlock();
+            }
+        }
+    };
+
+    let hideStyle = null;
+    const run = () => {
+        if (hideStyle) {
+            hideStyle.disabled = true;
+        }
+        try {
+            clickConsent();
+        } finally {
+            if (hideStyle) {
+                hideStyle.disabled = false;
+            }
+        }
+        hideOverlays();
+        report.hidden = hide.length ? document.querySelectorAll(hide.join(',')).length : 0;
+        if (report.hidden) {
+            unlock();
+        }
+    };
+
+    const start = () => {
+        hideStyle = addStyle(hide.length ? `${hide.join(',\n')} { display: none !important; }` : '');
+
+        let scheduled = false;
+        const observer = new MutationObserver(() => {
+            if (!scheduled) {
+                scheduled = true;
+                setTimeout(() => {
+                    scheduled = false;
+                    run();
+                }, 100);
+            }
+        });
+        observer.observe(document.documentElement, {childList: true, subtree: true});
+        setTimeout(() => observer.disconnect(), rules.watchMs || 10000);
+
+        if (document.readyState === 'loading') {
+            document.addEventListener('DOMContentLoaded', run, {once: true});
+        } else {
+            run();
+        }
+    };
+
+    if (document.documentElement) {
+        start();
+    } else {
+        document.addEventListener('readystatechange', start, {once: true});
+    }
+    return report;
+}
@@ -1,5 +1,8 @@
-// dark_mode.js
-(() => {
+// File: dark-mode.js
+
+// Fallback for sites that don't follow prefers-color-scheme, which the
+// browser context already emulates natively.
+() => {
     // Set color-scheme to dark
     document.documentElement.style.colorScheme = 'dark';
 
@@ -11,19 +14,10 @@
         document.head.appendChild(meta);
     }
 
-    // Set prefers-color-scheme media query (for Tailwind's media strategy)
-    const darkModeMediaQuery = window.matchMedia('(prefers-color-scheme: dark)');
-    Object.defineProperty(darkModeMediaQuery, 'matches', { get: () => true });
-    window.dispatchEvent(new Event('dark-mode-change'));
-
     // Add 'dark' class to <html> element (for Tailwind's class strategy)
     document.documentElement.classList.add('dark');
 
     // Attempt to trigger any custom dark mode logic
+    window.dispatchEvent(new Event('dark-mode-change'));
     document.dispatchEvent(new CustomEvent('darkmode', { detail: { darkMode: true } }));
-
-    // Force re-render for frameworks that might not react to class changes
-    document.body.style.display = 'none';
-    document.body.offsetHeight; // Trigger reflow
-    document.body.style.display = '';
-})();
\ No newline at end of file
+}
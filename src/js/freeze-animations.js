@@ -0,0 +1,37 @@
+// File: freeze-animations.js
+
+// Puts every animation in its final state so captures are deterministic:
+// finite animations jump to their end, infinite ones pause where they are,
+// and transitions and newly started animations are disabled by a stylesheet.
+() => {
+    const style = document.createElement('style');
+    style.textContent = `
+        *, *::before, *::after {
+            transition-duration: 0s !important;
+            transition-delay: 0s !important;
+            animation-play-state: paused !important;
+            caret-color: transparent !important;
+        }
+    `;
+    (document.head || document.documentElement).appendChild(style);
+
+    let finished = 0;
+    let paused = 0;
+    for (const animation of document.getAnimations()) {
+        const timing = animation.effect && animation.effect.getComputedTiming();
+        try {
+            if (timing && timing.endTime !== Infinity) {
+                animation.finish();
+                finished++;
+            } else {
+                animation.pause();
+                paused++;
+            }
+        } catch (e) {
+            // Animations with a zero playback rate can't be finished
+            animation.pause();
+            paused++;
+        }
+    }
+    return {finished, paused};
+}
@@ -0,0 +1,91 @@
+// File: lazy-load-scroller.js
+
+// Scrolls through the page one viewport at a time so lazy-loaded content
+// renders, waiting only for images that actually entered the viewport.
+// Stops once the bottom is reached and the height stays put, or when the
+// pixel or time budget runs out, then scrolls back to the top.
+({maxHeight, timeoutMs, imageTimeoutMs, settleMs}) => new Promise((resolve) => {
+    const start = performance.now();
+    const pending = new Set();
+    const sleep = (ms) => new Promise((done) => setTimeout(done, ms));
+    const pageHeight = () => Math.max(
+        document.body ? document.body.scrollHeight : 0,
+        document.documentElement ? document.documentElement.scrollHeight : 0
+    );
+
+    const imageObserver = new IntersectionObserver((entries) => {
+        for (const entry of entries) {
+            if (!entry.isIntersecting) {
+                continue;
+            }
+            imageObserver.unobserve(entry.target);
+            if (!entry.target.complete) {
+                pending.add(entry.target);
+            }
+        }
+    });
+    const observeImages = (root) => {
+        if (root.tagName === 'IMG') {
+            imageObserver.observe(root);
+        } else if (root.querySelectorAll) {
+            root.querySelectorAll('img').forEach((img) => imageObserver.observe(img));
+        }
+    };
+    observeImages(document);
+
+    // Images added by infinite scroll or lazy frameworks
+    const mutationObserver = new MutationObserver((mutations) => {
+        for (const mutation of mutations) {
+            mutation.addedNodes.forEach(observeImages);
+        }
+    });
+    mutationObserver.observe(document.documentElement, {childList: true, subtree: true});
+
+    const waitForVisibleImages = () => {
+        const loads = [...pending].map((img) => img.complete ? null : new Promise((done) => {
+            img.addEventListener('load', done, {once: true});
+            img.addEventListener('error', done, {once: true});
+        })).filter(Boolean);
+        pending.clear();
+        return loads.length ? Promise.race([Promise.all(loads), sleep(imageTimeoutMs)]) : null;
+    };
+
+    const finish = (reason, steps) => {
+        imageObserver.disconnect();
+        mutationObserver.disconnect();
+        window.scrollTo(0, 0);
+        resolve({height: pageHeight(), steps, reason, elapsed: Math.round(performance.now() - start)});
+    };
+
+    (async () => {
+        let y = 0;
+        let steps = 0;
+        while (true) {
+            window.scrollTo(0, y);
+            steps++;
+
+            // Give intersection callbacks a chance to run before collecting images
+            await sleep(settleMs);
+            const loads = waitForVisibleImages();
+            if (loads) {
+                await loads;
+            }
+
+            const height = pageHeight();
+            if (y + window.innerHeight >= height) {
+                // At the bottom: done unless scrolling here made the page grow
+                await sleep(settleMs);
+                if (pageHeight() <= height) {
+                    return finish('bottom', steps);
+                }
+            }
+            if (y + window.innerHeight >= maxHeight) {
+                return finish('max_height', steps);
+            }
+            if (performance.now() - start >= timeoutMs) {
+                return finish('timeout', steps);
+            }
+            y += Math.max(window.innerHeight, 100);
+        }
+    })().catch(() => finish('error', 0));
+})
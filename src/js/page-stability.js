@@ -0,0 +1,64 @@
+// File: page-stability.js
+
+// Resolves once the DOM has stopped changing, web fonts have loaded and no
+// layout shift has happened for `quietMs`, or after `timeoutMs` at the latest.
+({quietMs, timeoutMs}) => new Promise((resolve) => {
+    const start = performance.now();
+    let lastChange = start;
+    let fontsReady = !document.fonts || document.fonts.status === 'loaded';
+    let timer = null;
+
+    const touch = () => {
+        lastChange = performance.now();
+    };
+
+    const mutationObserver = new MutationObserver(touch);
+    mutationObserver.observe(document.documentElement || document, {
+        childList: true,
+        subtree: true,
+        attributes: true,
+        characterData: true
+    });
+
+    let shiftObserver = null;
+    try {
+        shiftObserver = new PerformanceObserver((list) => {
+            if (list.getEntries().some((entry) => !entry.hadRecentInput)) {
+                touch();
+            }
+        });
+        shiftObserver.observe({type: 'layout-shift'});
+    } catch (e) {
+        // Layout shift entries aren't supported everywhere
+    }
+
+    if (!fontsReady) {
+        document.fonts.ready.then(() => {
+            fontsReady = true;
+        });
+    }
+
+    const finish = (stable) => {
+        mutationObserver.disconnect();
+        if (shiftObserver) {
+            shiftObserver.disconnect();
+        }
+        clearTimeout(timer);
+        resolve({stable, elapsed: Math.round(performance.now() - start)});
+    };
+
+    const check = () => {
+        const now = performance.now();
+        const quietFor = now - lastChange;
+        if (fontsReady && quietFor >= quietMs) {
+            return finish(true);
+        }
+        if (now - start >= timeoutMs) {
+            return finish(false);
+        }
+        // Timers rather than animation frames, which don't run for hidden pages
+        timer = setTimeout(check, Math.max(10, Math.min(quietMs - quietFor, timeoutMs - (now - start))));
+    };
+
+    check();
+})
@@ -0,0 +1,100 @@
+// File: prepare-page.js
+
+// Runs every preparation step for a capture in one call and reports what
+// happened. Steps that fail are recorded in `errors` without stopping the
+// rest, so the caller can retry just those the slow way.
+async (plan) => {
+    const scripts = window.__pixashot;
+    const start = performance.now();
+    const applied = [];
+    const errors = {};
+    let evalBlocked = false;
+    const sleep = (ms) => new Promise((done) => setTimeout(done, ms));
+
+    const step = async (name, run) => {
+        try {
+            await run();
+            applied.push(name);
+        } catch (e) {
+            errors[name] = String(e && e.message || e);
+        }
+    };
+
+    const isVisible = (element) => !!(element && (
+        element.offsetWidth || element.offsetHeight || element.getClientRects().length
+    ));
+
+    if (plan.preventOverflow) {
+        await step('prevent_overflow', () => scripts['prevent-horizontal-overflow']());
+    }
+
+    if (plan.darkMode) {
+        await step('dark_mode', () => scripts['dark-mode']());
+    }
+
+    if (plan.customJs) {
+        // Pages whose CSP forbids eval report it in evalBlocked and are retried outside the page
+        await step('custom_js', async () => {
+            let result;
+            try {
+                result = (0, eval)(plan.customJs);
+            } catch (e) {
+                // Tell a refused eval apart from the script's own errors, which mustn't run it twice
+                try {
+                    (0, eval)('0');
+                } catch (refused) {
+                    evalBlocked = true;
+                }
+                throw e;
+            }
+            // Function expressions are called, like page.evaluate does
+            await (typeof result === 'function' ? result() : result);
+        });
+    }
+
+    if (plan.waitForSelector) {
+        await step('wait_for_selector', async () => {
+            const deadline = performance.now() + plan.selectorTimeoutMs;
+            while (!isVisible(document.querySelector(plan.waitForSelector))) {
+                if (performance.now() >= deadline) {
+                    throw new Error(`Selector '${plan.waitForSelector}' not found within ${plan.selectorTimeoutMs}ms`);
+                }
+                await sleep(50);
+            }
+        });
+    }
+
+    if (plan.freezeAnimations) {
+        await step('freeze_animations', () => scripts['freeze-animations']());
+    }
+
+    if (plan.waitForAnimationsMs) {
+        await step('wait_for_animations', async () => {
+            // Infinite animations never finish, so only wait for the others
+            const running = document.getAnimations().filter((animation) => {
+                const timing = animation.effect && animation.effect.getComputedTiming();
+                return animation.playState === 'running' && timing && timing.endTime !== Infinity;
+            });
+            await Promise.race([
+                Promise.all(running.map((animation) => animation.finished.catch(() => null))),
+                sleep(plan.waitForAnimationsMs)
+            ]);
+        });
+    }
+
+    let scroll = null;
+    if (plan.scroll) {
+        await step('scroll', async () => {
+            scroll = await scripts['lazy-load-scroller'](plan.scroll);
+        });
+    } else {
+        window.scrollTo(0, 0);
+    }
+
+    const height = scroll ? scroll.height : Math.max(
+        document.body ? document.body.scrollHeight : 0,
+        document.documentElement ? document.documentElement.scrollHeight : 0
+    );
+
+    return {applied, errors, evalBlocked, height, scroll, elapsed: Math.round(performance.now() - start)};
+}
@@ -0,0 +1,12 @@
+// File: prevent-horizontal-overflow.js
+
+() => {
+    const style = document.createElement('style');
+    style.textContent = `
+        body, html {
+            max-width: 100vw !important;
+            overflow-x: hidden !important;
+        }
+    `;
+    document.head.appendChild(style);
+}
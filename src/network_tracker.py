@@ -0,0 +1,129 @@
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Optional, Tuple
+
+from playwright.async_api import Page
+
+# Completion timestamps kept for the "mostly idle" check
+RECENT_COMPLETIONS_SIZE = 256
+
+
+class NetworkTracker:
+    """
+    Track a page's network activity from Playwright's request events.
+
+    Attached once when a page is created. It keeps a count of in-flight
+    requests and a ring buffer of recent completions, and waiters are resolved
+    from the events themselves, so waiting for the network never polls the page.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.last_activity = time.monotonic()
+        self.recent_completions = deque(maxlen=RECENT_COMPLETIONS_SIZE)
+        self._waiters = set()
+
+    @classmethod
+    def attach(cls, page: Page) -> 'NetworkTracker':
+        tracker = cls()
+        page.on('request', tracker._on_request)
+        page.on('requestfinished', tracker._on_request_done)
+        page.on('requestfailed', tracker._on_request_done)
+        setattr(page, '_pixashot_network', tracker)
+        return tracker
+
+    @staticmethod
+    def for_page(page: Page) -> Optional['NetworkTracker']:
+        return getattr(page, '_pixashot_network', None)
+
+    def reset(self):
+        """Forget requests from a previous navigation (their events may never arrive)."""
+        self.in_flight = 0
+        self.recent_completions.clear()
+        self._touch()
+
+    def _touch(self):
+        self.last_activity = time.monotonic()
+        for waiter in list(self._waiters):
+            waiter()
+
+    def _on_request(self, request):
+        self.in_flight += 1
+        self._touch()
+
+    def _on_request_done(self, request):
+        self.in_flight = max(0, self.in_flight - 1)
+        self.recent_completions.append(time.monotonic())
+        self._touch()
+
+    def recent_completion_count(self, window_ms: float) -> int:
+        cutoff = time.monotonic() - window_ms / 1000
+        return sum(1 for finished_at in self.recent_completions if finished_at >= cutoff)
+
+    async def _wait_for(self, check: Callable[[], Tuple[bool, Optional[float]]], timeout_ms: float) -> bool:
+        """
+        Resolve a future once `check` holds, re-evaluating it on every network event.
+
+        `check` returns whether the condition holds and, if it doesn't, how many
+        seconds until it could start holding without another event (or None).
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        timer = None
+
+        def evaluate():
+            nonlocal timer
+            if future.done():
+                return
+            if timer:
+                timer.cancel()
+                timer = None
+            holds, recheck_after = check()
+            if holds:
+                future.set_result(True)
+            elif recheck_after is not None:
+                timer = loop.call_later(recheck_after, evaluate)
+
+        self._waiters.add(evaluate)
+        try:
+            evaluate()
+            return await asyncio.wait_for(future, max(0, timeout_ms) / 1000)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._waiters.discard(evaluate)
+            if timer:
+                timer.cancel()
+
+    async def wait_for_idle(self, quiet_ms: float, timeout_ms: float) -> bool:
+        """Wait until no request has been in flight for `quiet_ms`. Returns False on timeout."""
+        quiet = quiet_ms / 1000
+
+        def check():
+            if self.in_flight:
+                return False, None
+            quiet_for = time.monotonic() - self.last_activity
+            return quiet_for >= quiet, quiet - quiet_for
+
+        return await self._wait_for(check, timeout_ms)
+
+    async def wait_for_mostly_idle(self, timeout_ms: float, idle_threshold: int = 2,
+                                   window_ms: float = 500) -> bool:
+        """
+        Wait until at most `idle_threshold` requests are in flight and at most
+        `idle_threshold` finished in the last `window_ms`. Returns False on timeout.
+        """
+        window = window_ms / 1000
+
+        def check():
+            if self.in_flight > idle_threshold:
+                return False, None
+            now = time.monotonic()
+            in_window = [finished_at for finished_at in self.recent_completions if finished_at >= now - window]
+            if len(in_window) <= idle_threshold:
+                return True, None
+            # Holds once enough of the completions have aged out of the window
+            return False, in_window[len(in_window) - idle_threshold - 1] + window - now
+
+        return await self._wait_for(check, timeout_ms)
@@ -0,0 +1,132 @@
+import logging
+import time
+from typing import Any, Dict
+
+from playwright.async_api import Page
+
+from network_tracker import NetworkTracker
+
+logger = logging.getLogger(__name__)
+
+
+class PagePool:
+    """
+    Warm pages kept on each pooled context and reset between captures.
+
+    Reusing a page saves the `new_page()`/`close()` round-trips on the hot path.
+    A page is only returned to the pool if it is healthy: not closed or
+    crashed and without per-request state that can't be undone, such as a
+    websocket route.
+    """
+
+    def __init__(self, size: int = 1):
+        self.size = size
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.wait_time_ms = 0.0
+        self.max_wait_time_ms = 0.0
+        self.acquisitions = 0
+
+    async def warm(self, pooled):
+        """Pre-create pages for a newly created context."""
+        while len(pooled.idle_pages) < self.size:
+            pooled.idle_pages.append(await self._new_page(pooled))
+
+    async def acquire(self, pooled) -> Page:
+        """Get a ready page for the leased context."""
+        start = time.perf_counter()
+        try:
+            while pooled.idle_pages:
+                page = pooled.idle_pages.pop()
+                if self._is_healthy(page):
+                    self.reused += 1
+                    return page
+                await self._discard(page)
+            return await self._new_page(pooled)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.acquisitions += 1
+            self.wait_time_ms += elapsed_ms
+            self.max_wait_time_ms = max(self.max_wait_time_ms, elapsed_ms)
+
+    def release(self, pooled, page: Page):
+        """Hand a page back after a capture. It is reset by `restore` once the lease ends."""
+        pooled.released_pages.append(page)
+
+    async def restore(self, pooled):
+        """
+        Reset the context's released pages and keep them warm, or close those
+        that can't be reused. Runs as the context pool's `on_release`, in the
+        background after the capture has responded.
+        """
+        while pooled.released_pages:
+            page = pooled.released_pages.pop()
+            if len(pooled.idle_pages) >= self.size or not self._is_healthy(page):
+                await self._discard(page)
+                continue
+
+            try:
+                await self._reset(page)
+            except Exception as e:
+                logger.warning(f"Failed to reset pooled page, discarding it: {str(e)}")
+                await self._discard(page)
+                continue
+
+            pooled.idle_pages.append(page)
+
+    @staticmethod
+    def mark_not_reusable(page: Page):
+        """Flag a page that carries per-request state that can't be reset (e.g. a websocket route)."""
+        setattr(page, '_pixashot_reusable', False)
+
+    async def _new_page(self, pooled) -> Page:
+        page = await pooled.context.new_page()
+        self.created += 1
+        setattr(page, '_pixashot_crashed', False)
+        setattr(page, '_pixashot_reusable', True)
+        setattr(page, '_pixashot_viewport', page.viewport_size)
+        page.on('crash', lambda _: setattr(page, '_pixashot_crashed', True))
+        NetworkTracker.attach(page)
+        return page
+
+    def _is_healthy(self, page: Page) -> bool:
+        if page.is_closed() or getattr(page, '_pixashot_crashed', True):
+            return False
+        return getattr(page, '_pixashot_reusable', False)
+
+    async def _reset(self, page: Page):
+        """Return the page to a blank state matching the context defaults."""
+        # sessionStorage belongs to the tab, so the context's storage reset doesn't reach it
+        for frame in page.frames:
+            try:
+                await frame.evaluate('() => sessionStorage.clear()')
+            except Exception:
+                pass
+        await page.goto('about:blank')
+        tracker = NetworkTracker.for_page(page)
+        if tracker:
+            tracker.reset()
+        await page.unroute_all(behavior='ignoreErrors')
+        await page.set_extra_http_headers({})
+        viewport = getattr(page, '_pixashot_viewport', None)
+        if viewport and page.viewport_size != viewport:
+            await page.set_viewport_size(viewport)
+
+    async def _discard(self, page: Page):
+        self.discarded += 1
+        try:
+            if not page.is_closed():
+                await page.close()
+        except Exception as e:
+            logger.warning(f"Error closing pooled page: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'size': self.size,
+            'created': self.created,
+            'reused': self.reused,
+            'discarded': self.discarded,
+            'avg_wait_ms': round(self.wait_time_ms / self.acquisitions, 2) if self.acquisitions else 0.0,
+            'max_wait_ms': round(self.max_wait_time_ms, 2)
+        }
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+import time
+
+from playwright.async_api import Page
+
+from network_tracker import NetworkTracker
+from script_registry import script_registry
+
+logger = logging.getLogger(__name__)
+
+# How long the page has to stay quiet to count as stable
+STABILITY_QUIET_MS = 50
+
+
+async def wait_for_page_stable(page: Page, timeout: int, quiet_ms: int = STABILITY_QUIET_MS) -> bool:
+    """
+    Wait until the page is quiet: no requests in flight, no DOM mutations or
+    layout shifts for `quiet_ms` and web fonts loaded.
+
+    Returns as soon as that holds, or False once `timeout` (ms) runs out.
+    """
+    start = time.monotonic()
+    tracker = NetworkTracker.for_page(page)
+
+    while True:
+        remaining_ms = timeout - (time.monotonic() - start) * 1000
+        if remaining_ms <= 0:
+            logger.warning(f"Page did not become stable within {timeout}ms")
+            return False
+
+        checks = [script_registry.invoke(page, 'page-stability', {'quietMs': quiet_ms, 'timeoutMs': remaining_ms})]
+        if tracker:
+            checks.append(tracker.wait_for_idle(quiet_ms, remaining_ms))
+
+        try:
+            dom_result, *network_idle = await asyncio.gather(*checks)
+        except Exception as e:
+            logger.warning(f"Page stability check failed: {str(e)}")
+            return False
+
+        if not dom_result.get('stable') or not all(network_idle):
+            logger.warning(f"Page did not become stable within {timeout}ms")
+            return False
+
+        # A request may have started while the DOM check was still settling
+        if tracker is None or tracker.in_flight == 0:
+            logger.debug(f"Page stable after {round((time.monotonic() - start) * 1000)}ms")
+            return True
@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+@dataclass(frozen=True)
+class PreparationPlan:
+    """
+    The in-page preparation steps a capture needs, run by js/prepare-page.js
+    in a single round-trip instead of one evaluate per step.
+    """
+    prevent_overflow: bool = True
+    dark_mode: bool = False
+    custom_js: Optional[str] = None
+    wait_for_selector: Optional[str] = None
+    selector_timeout_ms: int = 0
+    wait_for_animations_ms: int = 0
+    freeze_animations: bool = False
+    scroll: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_options(cls, options, deadline, scroll: Optional[Dict[str, Any]] = None) -> 'PreparationPlan':
+        """
+        Build the plan for a CaptureRequest. `scroll` holds the lazy-load
+        scroller arguments for full-page captures; without it the page is
+        scrolled back to the top.
+        """
+        return cls(
+            # Dark mode itself is emulated natively by the context; the script is opt-in
+            dark_mode=bool(options.dark_mode and getattr(options, 'dark_mode_fallback', False)),
+            custom_js=options.custom_js or None,
+            wait_for_selector=options.wait_for_selector or None,
+            selector_timeout_ms=deadline.budget(min(options.wait_for_timeout, 5000)) if options.wait_for_selector else 0,
+            # Frozen animations are already in their end state, so there is nothing to wait for
+            wait_for_animations_ms=(
+                deadline.budget(2000) if options.wait_for_animation and not getattr(options, 'freeze_animations', False)
+                else 0
+            ),
+            freeze_animations=bool(getattr(options, 'freeze_animations', False)),
+            scroll=scroll
+        )
+
+    def to_script_arg(self) -> Dict[str, Any]:
+        return {
+            'preventOverflow': self.prevent_overflow,
+            'darkMode': self.dark_mode,
+            'customJs': self.custom_js,
+            'waitForSelector': self.wait_for_selector,
+            'selectorTimeoutMs': self.selector_timeout_ms,
+            'waitForAnimationsMs': self.wait_for_animations_ms,
+            'freezeAnimations': self.freeze_animations,
+            'scroll': self.scroll
+        }
@@ -0,0 +1,153 @@
+import logging
+from typing import Any, Dict, FrozenSet, Optional
+
+from playwright.async_api import Page, Route
+
+from filter_engine import FilterEngine, hostname
+from page_pool import PagePool
+
+logger = logging.getLogger(__name__)
+
+# Request option values and the Playwright resource types they block
+RESOURCE_TYPES = {
+    'image': ('image',),
+    'media': ('media',),
+    'font': ('font',),
+    'stylesheet': ('stylesheet',),
+    'websocket': ('websocket',),
+    'beacon': ('ping',),
+}
+
+# Playwright resource types and the CDP types the Fetch domain pauses them by.
+# WebSockets aren't paused by Fetch and are routed separately.
+CDP_RESOURCE_TYPES = {
+    'image': 'Image',
+    'media': 'Media',
+    'font': 'Font',
+    'stylesheet': 'Stylesheet',
+    'ping': 'Ping',
+}
+PLAYWRIGHT_RESOURCE_TYPES = {cdp_type: name for name, cdp_type in CDP_RESOURCE_TYPES.items()}
+
+
+class ResourceBlocker:
+    """
+    Aborts a page's requests by resource type, and ads and trackers matched
+    by the filter lists.
+
+    Resource types are blocked in the browser: the page's CDP session enables
+    the Fetch domain with a pattern per blocked type, so only those requests
+    are paused and failed, and every other request loads without a trip
+    through Python and with the HTTP cache still on. Filter lists match on
+    URLs, so `block_ads` also routes the page's requests through a lookup in
+    the compiled lists, which turns the cache off for that page.
+    """
+
+    totals = {'captures': 0, 'blocked': 0, 'blocked_by_filter': 0}
+
+    def __init__(self, blocked_types: FrozenSet[str], filter_engine: Optional[FilterEngine] = None,
+                 source_url: Optional[str] = None):
+        self.blocked_types = blocked_types
+        self.filter_engine = filter_engine
+        self.source_host = hostname(source_url.lower()) if source_url else None
+        self.blocked = 0
+        self.blocked_by_type: Dict[str, int] = {}
+        self.blocked_by_filter = 0
+        self._session = None
+
+    @classmethod
+    def from_options(cls, options, filter_engine: Optional[FilterEngine] = None) -> Optional['ResourceBlocker']:
+        """Build a blocker for a CaptureRequest, or None if it doesn't block anything."""
+        names = set(getattr(options, 'block_resources', None) or ())
+        if getattr(options, 'block_media', False):
+            names.update(('image', 'media'))
+
+        if getattr(options, 'block_ads', False):
+            if filter_engine is None:
+                logger.warning("block_ads requested but no filter lists are configured (FILTER_LISTS)")
+        else:
+            filter_engine = None
+
+        if not names and filter_engine is None:
+            return None
+        url = getattr(options, 'url', None)
+        return cls(frozenset(resource_type for name in names for resource_type in RESOURCE_TYPES[name]),
+                   filter_engine, str(url) if url else None)
+
+    async def install(self, page: Page):
+        patterns = [{'resourceType': CDP_RESOURCE_TYPES[resource_type], 'requestStage': 'Request'}
+                    for resource_type in sorted(self.blocked_types) if resource_type in CDP_RESOURCE_TYPES]
+        if patterns:
+            self._session = await page.context.new_cdp_session(page)
+            self._session.on('Fetch.requestPaused', self._on_request_paused)
+            await self._session.send('Fetch.enable', {'patterns': patterns})
+        if self.filter_engine:
+            await page.route('**/*', self._handle)
+        if 'websocket' in self.blocked_types and hasattr(page, 'route_web_socket'):
+            # Sockets aren't routed through page.route. Not connecting the route
+            # to the server leaves the socket without a backend.
+            PagePool.mark_not_reusable(page)
+            await page.route_web_socket('**/*', self._handle_web_socket)
+        ResourceBlocker.totals['captures'] += 1
+
+    async def uninstall(self, page: Page):
+        """Stop blocking by type, so a pooled page loads everything again."""
+        if self._session is None:
+            return
+        session, self._session = self._session, None
+        try:
+            await session.detach()
+        except Exception as e:
+            logger.warning(f"Failed to detach resource blocking session: {str(e)}")
+            PagePool.mark_not_reusable(page)
+
+    async def _on_request_paused(self, event: Dict[str, Any]):
+        session = self._session
+        if session is None:
+            # Detaching disabled Fetch, which lets paused requests carry on
+            return
+        self._count(PLAYWRIGHT_RESOURCE_TYPES.get(event.get('resourceType'), 'other'))
+        try:
+            await session.send('Fetch.failRequest', {'requestId': event['requestId'], 'errorReason': 'BlockedByClient'})
+        except Exception as e:
+            # The page navigated away or was closed while the request was paused
+            logger.debug(f"Failed to block request: {str(e)}")
+
+    async def _handle(self, route: Route):
+        resource_type = route.request.resource_type
+        if self._filtered(route.request, resource_type):
+            self.blocked_by_filter += 1
+            self._count(resource_type)
+            ResourceBlocker.totals['blocked_by_filter'] += 1
+            await route.abort('blockedbyclient')
+        else:
+            # Passes the request on to earlier routes (the subresource cache), or lets it load
+            await route.fallback()
+
+    def _filtered(self, request, resource_type: str) -> bool:
+        # Filter lists apply to subframes, never to the page being captured
+        if resource_type == 'document' and request.is_navigation_request():
+            try:
+                if request.frame.parent_frame is None:
+                    return False
+            except Exception:
+                return False
+        return self.filter_engine.match(request.url, resource_type, self.source_host) is not None
+
+    async def _handle_web_socket(self, web_socket_route):
+        self._count('websocket')
+        # Closing from the route side tells the page the connection failed
+        await web_socket_route.close()
+
+    def _count(self, resource_type: str):
+        self.blocked += 1
+        self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+        ResourceBlocker.totals['blocked'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'blocked_types': sorted(self.blocked_types),
+            'blocked': self.blocked,
+            'blocked_by_type': dict(self.blocked_by_type),
+            'blocked_by_filter': self.blocked_by_filter
+        }
@@ -0,0 +1,47 @@
+import base64
+import json
+from typing import Any, AsyncIterator, Dict
+
+# Multiple of 3 so base64 chunks concatenate without intermediate padding
+STREAM_CHUNK_SIZE = 3 * 16 * 1024
+
+
+async def iter_bytes(data: bytes, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Stream a capture in fixed-size chunks."""
+    view = memoryview(data)
+    for offset in range(0, len(view), chunk_size):
+        yield bytes(view[offset:offset + chunk_size])
+
+
+def _json_envelope(fields: Dict[str, Any]):
+    """Split `{"file": "<base64>", ...fields}` into the parts around the base64 payload."""
+    prefix = b'{"file": "'
+    if fields:
+        suffix = '", ' + json.dumps(fields)[1:]
+    else:
+        suffix = '"}'
+    return prefix, suffix.encode('utf-8')
+
+
+def base64_json_length(data: bytes, fields: Dict[str, Any]) -> int:
+    """Get the exact size of the document produced by iter_base64_json."""
+    prefix, suffix = _json_envelope(fields)
+    return len(prefix) + 4 * ((len(data) + 2) // 3) + len(suffix)
+
+
+async def iter_base64_json(data: bytes, fields: Dict[str, Any],
+                           chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    Stream `{"file": "<base64 of data>", **fields}` without building the whole document.
+
+    Only one chunk of base64 is held at a time, instead of the full base64
+    string plus its JSON-serialised copy.
+    """
+    chunk_size -= chunk_size % 3
+    prefix, suffix = _json_envelope(fields)
+    view = memoryview(data)
+
+    yield prefix
+    for offset in range(0, len(view), chunk_size):
+        yield base64.b64encode(view[offset:offset + chunk_size])
+    yield suffix
@@ -1,9 +1,6 @@
 import os
 import base64
 import logging
-import random
-import tempfile
-import time
 from datetime import datetime
 from urllib.parse import parse_qs, urlparse
 import psutil
@@ -16,9 +13,13 @@ from quart import (
     send_file, jsonify,
 )
 
-from cache_manager import cache_response
 from capture_request import CaptureRequest
-from exceptions import ScreenshotServiceException
+from capture_workers import CaptureWorkerPool
+from config import config
+from deadline import Deadline
+from exceptions import CapacityExceededException, ScreenshotServiceException
+from response_streaming import base64_json_length, iter_base64_json, iter_bytes
+from resource_blocker import ResourceBlocker
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,8 @@ def register_routes(app):
         """
         Handle screenshot capture requests with development-aware error handling.
         """
+        # Every stage, including waiting for a capture slot, draws on one time budget
+        deadline = Deadline(config.CAPTURE_TIMEOUT_MS)
         try:
             # Parse request parameters
             if request.method == 'POST':
@@ -47,69 +50,63 @@ def register_routes(app):
                     'message': 'Only POST and GET methods are supported'
                 }), 400
 
-            capture_service = current_app.config['container'].capture_service
+            container = current_app.config['container']
+            capture_service = container.capture_service
+            admission_controller = container.admission_controller
+
+            async def run_capture():
+                async with admission_controller.admit(max_wait=deadline.remaining_ms() / 1000):
+                    return await capture_service.capture_screenshot(options, deadline)
+
+            # Cache hits are served without waiting for a capture slot
+            file_data, cache_status = await container.cache_manager.fetch(options, run_capture)
+            cache_headers = {'X-Cache': cache_status}
 
             # Handle HTML format separately
             if options.format == 'html':
-                html_content = await capture_service.capture_screenshot(None, options)
+                html_content = file_data
                 if options.response_type == 'json':
                     return jsonify({
                         'file': base64.b64encode(html_content.encode()).decode('utf-8'),
                         'format': 'html'
-                    }), 200
+                    }), 200, cache_headers
                 else:
                     response = await make_response(html_content)
                     response.headers['Content-Type'] = 'text/html'
+                    response.headers.update(cache_headers)
                     return response
 
-            # Generate unique output filename
-            if options.url:
-                hostname = urlparse(str(options.url)).hostname.replace('.', '-')
-            else:
-                hostname = 'html-content'
-
-            timestamp = int(time.time())
-            random_suffix = int(random.random() * 10000)
-            output_path = f"{tempfile.gettempdir()}/{hostname}_{timestamp}_{random_suffix}.{options.format}"
-
-            # Capture the screenshot
-            try:
-                await capture_service.capture_screenshot(output_path, options)
-            except Exception as capture_error:
-                if os.path.exists(output_path):
-                    os.remove(output_path)
-                raise capture_error
-
             # Handle different response types
-            try:
-                if options.response_type == 'empty':
-                    os.remove(output_path)
-                    return '', 204
-
-                elif options.response_type == 'json':
-                    with open(output_path, 'rb') as f:
-                        file_data = f.read()
-                    os.remove(output_path)
-                    return jsonify({
-                        'file': base64.b64encode(file_data).decode('utf-8'),
-                        'format': options.format
-                    }), 200
-
-                else:  # by_format
-                    mime_type = 'application/pdf' if options.format == 'pdf' else f'image/{options.format}'
-                    with open(output_path, 'rb') as f:
-                        file_data = f.read()
-                    os.remove(output_path)
-
-                    response = await make_response(file_data)
-                    response.headers['Content-Type'] = mime_type
-                    response.headers['Content-Disposition'] = f'attachment; filename=screenshot.{options.format}'
-                    return response
-
-            except Exception as e:
-                if os.path.exists(output_path):
-                    os.remove(output_path)
-                raise e
+            if options.response_type == 'empty':
+                return '', 204, cache_headers
+
+            elif options.response_type == 'json':
+                # Stream the base64 payload so the whole encoded document is never held in memory
+                fields = {'format': options.format}
+                response = await make_response(iter_base64_json(file_data, fields))
+                response.headers['Content-Type'] = 'application/json'
+                response.headers['Content-Length'] = str(base64_json_length(file_data, fields))
+                response.headers.update(cache_headers)
+                return response
+
+            else:  # by_format
+                mime_type = 'application/pdf' if options.format == 'pdf' else f'image/{options.format}'
+                response = await make_response(iter_bytes(file_data))
+                response.headers['Content-Type'] = mime_type
+                response.headers['Content-Length'] = str(len(file_data))
+                response.headers['Content-Disposition'] = f'attachment; filename=screenshot.{options.format}'
+                response.headers.update(cache_headers)
+                return response
+
+        except CapacityExceededException as e:
+            logger.warning(f"Rejecting capture, service is saturated: {str(e)}")
+            response = jsonify({
+                'status': 'error',
+                'message': str(e),
+                'error_type': 'CapacityExceeded',
+                'retry_after': e.retry_after
+            })
+            return response, 503, {'Retry-After': str(e.retry_after)}
 
         except ValueError as e:
             if is_development():
@@ -167,13 +164,47 @@ def register_routes(app):
             memory_usage = process.memory_info().rss / 1024 / 1024  # MB
             cpu_percent = process.cpu_percent()
 
+            checks = {
+                'memory_usage_mb': round(memory_usage, 2),
+                'cpu_percent': round(cpu_percent, 2)
+            }
+
+            container = current_app.config['container']
+            if container.cache_manager and container.cache_manager.enabled:
+                checks['capture_cache'] = await container.cache_manager.stats()
+            admission_controller = container.admission_controller
+            if admission_controller:
+                checks['admission'] = admission_controller.stats()
+
+            capture_service = container.capture_service
+            if isinstance(capture_service, CaptureWorkerPool):
+                checks['capture_workers'] = capture_service.stats()
+
+            context_manager = getattr(capture_service, 'context_manager', None)
+            if context_manager and context_manager.context_cache:
+                checks['browser'] = context_manager.stats()
+                checks['context_cache'] = context_manager.context_cache.stats()
+                checks['page_pool'] = context_manager.page_pool.stats()
+                checks['resource_blocking'] = dict(ResourceBlocker.totals)
+                filter_engine = getattr(capture_service, 'filter_engine', None)
+                if filter_engine:
+                    checks['filter_engine'] = filter_engine.stats()
+                subresource_cache = getattr(capture_service, 'subresource_cache', None)
+                if subresource_cache:
+                    checks['subresource_cache'] = await subresource_cache.stats()
+
+            # Let load balancers route around an instance whose capture queue is full
+            if request.path == '/health/ready' and admission_controller and admission_controller.saturated:
+                return {
+                    'status': 'saturated',
+                    'timestamp': datetime.utcnow().isoformat(),
+                    'checks': checks
+                }, 503, {'Retry-After': str(admission_controller.retry_after())}
+
             return {
                 'status': 'healthy',
                 'timestamp': datetime.utcnow().isoformat(),
-                'checks': {
-                    'memory_usage_mb': round(memory_usage, 2),
-                    'cpu_percent': round(cpu_percent, 2)
-                },
+                'checks': checks,
                 'version': os.getenv('VERSION', '1.0.0')
             }, 200
 
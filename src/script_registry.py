@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import os
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from playwright.async_api import Page
+
+logger = logging.getLogger(__name__)
+
+JS_DIR = os.path.join(os.path.dirname(__file__), 'js')
+
+# Namespace the bundled scripts are installed under in a page
+NAMESPACE = '__pixashot'
+
+# Scripts that must run before the page's own scripts. Their owners install
+# them as init scripts (see ConsentBlocker), so they aren't in the bundle.
+DOCUMENT_START_SCRIPTS = frozenset(('consent-blocker',))
+
+# Calls an installed script, or reports that this document doesn't have this version of it
+INVOKE_SCRIPT = f"""async ([name, hash, arg]) => {{
+    const scripts = window.{NAMESPACE};
+    const script = scripts && scripts[name];
+    if (typeof script !== 'function' || script.hash !== hash) {{
+        return {{installed: false}};
+    }}
+    return {{installed: true, value: await script(arg)}};
+}}"""
+
+
+def minify(source: str) -> str:
+    """Drop comment-only lines, indentation and blank lines. Line breaks are kept so ASI still holds."""
+    lines = []
+    for line in source.splitlines():
+        line = line.strip()
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines)
+
+
+@dataclass(frozen=True)
+class PageScript:
+    name: str
+    source: str
+    hash: str
+
+
+class ScriptRegistry:
+    """
+    The bundled page scripts, read and minified once.
+
+    Each script in `js/` is a function expression taking at most one argument.
+    The first `invoke` in a document installs the bundle of every script that
+    isn't run at document start under `window.__pixashot` and calls the script
+    in the same evaluate, since scripts may call each other. A new document is
+    noticed from the main frame's `framenavigated` event, so there is no probe.
+    Later calls in the same document only send the script's name and hash; a
+    script whose hash doesn't match (a page's own `__pixashot` global, say) is
+    reinstalled rather than called.
+    """
+
+    def __init__(self, directory: str = JS_DIR):
+        self.directory = directory
+        self._by_name: Dict[str, PageScript] = {}
+        self._install_script = None
+        # Whether the current document of each page has the bundle installed
+        self._installed: 'weakref.WeakKeyDictionary[Page, bool]' = weakref.WeakKeyDictionary()
+        self.installs = 0
+
+    def load(self):
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith('.js'):
+                continue
+            with open(os.path.join(self.directory, filename), 'r') as file:
+                source = minify(file.read())
+            name = filename[:-len('.js')]
+            script = PageScript(name, source, hashlib.sha256(source.encode('utf-8')).hexdigest()[:16])
+            self._by_name[name] = script
+
+        installs = '\n'.join(
+            f"scripts[{json.dumps(script.name)}] = Object.assign((\n{script.source}\n), {{hash: {json.dumps(script.hash)}}});"
+            for script in self._by_name.values() if script.name not in DOCUMENT_START_SCRIPTS
+        )
+        self._install_script = (f"async ([name, hash, arg]) => {{\nconst scripts = window.{NAMESPACE} = {{}};\n{installs}\n"
+                                f"return await scripts[name](arg);\n}}")
+        logger.info(f"Loaded {len(self._by_name)} page scripts")
+
+    def _ensure_loaded(self):
+        if self._install_script is None:
+            self.load()
+
+    def get(self, name: str) -> PageScript:
+        self._ensure_loaded()
+        return self._by_name[name]
+
+    @property
+    def install_script(self) -> str:
+        """Function installing the bundle under `window.__pixashot` and calling one of its scripts."""
+        self._ensure_loaded()
+        return self._install_script
+
+    async def invoke(self, page: Page, name: str, arg: Any = None) -> Any:
+        """Call a bundled script in the page's main frame, sending the bundle only if it isn't installed."""
+        script = self.get(name)
+        if self._installed.get(page):
+            result = await page.evaluate(INVOKE_SCRIPT, [name, script.hash, arg])
+            if result and result.get('installed'):
+                return result.get('value')
+        elif page not in self._installed:
+            self._track_documents(page)
+
+        self.installs += 1
+        value = await page.evaluate(self.install_script, [name, script.hash, arg])
+        self._installed[page] = True
+        return value
+
+    def _track_documents(self, page: Page):
+        def on_navigated(frame):
+            if frame.parent_frame is None:
+                self._installed[page] = False
+
+        self._installed[page] = False
+        page.on('framenavigated', on_navigated)
+
+
+script_registry = ScriptRegistry()
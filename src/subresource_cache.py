@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import os
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from playwright.async_api import Page, Route
+
+from blob_store import BlobStore
+
+logger = logging.getLogger(__name__)
+
+# Static subresources worth sharing between captures
+CACHEABLE_RESOURCE_TYPES = frozenset(('stylesheet', 'script', 'font', 'image'))
+
+# Headers that describe the transfer rather than the content: fetched bodies arrive decoded
+HOP_HEADERS = frozenset(('content-encoding', 'content-length', 'transfer-encoding', 'connection',
+                         'keep-alive', 'set-cookie', 'age', 'date'))
+
+# Largest single response kept, so one huge video poster can't flush the cache
+MAX_ENTRY_BYTES = 8 * 1024 * 1024
+
+
+def parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def freshness_lifetime(headers: Dict[str, str]) -> Optional[float]:
+    """
+    Seconds a response may be served from a shared cache, or None if it mustn't be stored.
+
+    Only explicit freshness counts (s-maxage, max-age or Expires); responses
+    that need revalidation, are private or set cookies aren't stored.
+    """
+    if 'set-cookie' in headers:
+        return None
+    directives = parse_cache_control(headers.get('cache-control', ''))
+    if {'no-store', 'no-cache', 'private'} & directives.keys():
+        return None
+
+    age = _to_float(headers.get('age')) or 0.0
+    for name in ('s-maxage', 'max-age'):
+        if name in directives:
+            lifetime = _to_float(directives[name])
+            return lifetime - age if lifetime and lifetime > age else None
+
+    if 'expires' in headers:
+        try:
+            expires = parsedate_to_datetime(headers['expires']).timestamp()
+        except (TypeError, ValueError):
+            return None
+        lifetime = expires - time.time()
+        return lifetime if lifetime > 0 else None
+    return None
+
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class SubresourceCache:
+    """
+    Serve pages' static subresources from a `BlobStore` shared by every worker.
+
+    Installed as a route on each page when SUBRESOURCE_CACHE_DIR is set. GET
+    requests for stylesheets, scripts, fonts and images are answered from the
+    store while fresh. Misses are fetched through Playwright and stored if the
+    response allows a shared cache to keep it. A response with `Vary` is keyed
+    by the request's values for those headers, so a different variant is a miss
+    and never served in its place.
+    """
+
+    def __init__(self, store: BlobStore):
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.bytes_served = 0
+
+    @classmethod
+    def from_config(cls, directory: Optional[str], max_mb: int) -> Optional['SubresourceCache']:
+        if not directory:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        return cls(BlobStore(directory, max_mb * 1024 * 1024))
+
+    async def install(self, page: Page):
+        await page.route('**/*', self._handle)
+
+    @staticmethod
+    def _cacheable_request(request) -> bool:
+        if request.method != 'GET' or request.resource_type not in CACHEABLE_RESOURCE_TYPES:
+            return False
+        headers = request.headers
+        if 'authorization' in headers or 'range' in headers:
+            return False
+        return not {'no-store', 'no-cache'} & parse_cache_control(headers.get('cache-control', '')).keys()
+
+    async def _handle(self, route: Route):
+        request = route.request
+        if not self._cacheable_request(request):
+            await route.fallback()
+            return
+
+        try:
+            cached = await asyncio.to_thread(self.store.get, request.url)
+        except Exception as e:
+            # An unanswered route would stall the request, so a failed read is a miss
+            logger.warning(f"Subresource cache read failed: {str(e)}")
+            cached = None
+        if cached is not None:
+            body, meta = cached
+            if all(request.headers.get(name) == value for name, value in meta.get('vary', {}).items()):
+                self.hits += 1
+                self.bytes_served += len(body)
+                await route.fulfill(status=meta['status'], headers=meta['headers'], body=body)
+                return
+
+        self.misses += 1
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception as e:
+            logger.debug(f"Subresource fetch failed, continuing uncached: {str(e)}")
+            await route.fallback()
+            return
+
+        headers = {name.lower(): value for name, value in response.headers.items()}
+        fulfill_headers = {name: value for name, value in headers.items() if name not in HOP_HEADERS}
+        await route.fulfill(status=response.status, headers=fulfill_headers, body=body)
+
+        if response.status == 200 and len(body) <= MAX_ENTRY_BYTES:
+            self._store(request, headers, fulfill_headers, body)
+
+    def _store(self, request, headers: Dict[str, str], fulfill_headers: Dict[str, str], body: bytes):
+        lifetime = freshness_lifetime(headers)
+        vary = [name.strip().lower() for name in headers.get('vary', '').split(',') if name.strip()]
+        if lifetime is None or '*' in vary:
+            return
+
+        meta = {
+            'status': 200,
+            'headers': fulfill_headers,
+            'vary': {name: request.headers.get(name) for name in vary}
+        }
+        self.stored += 1
+        # Written in the background: the page already has its response
+        task = asyncio.get_running_loop().run_in_executor(None, self.store.put, request.url, body, meta, lifetime)
+        task.add_done_callback(self._log_store_error)
+
+    @staticmethod
+    def _log_store_error(task):
+        if not task.cancelled() and task.exception():
+            logger.warning(f"Failed to store subresource: {str(task.exception())}")
+
+    async def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+            'stored': self.stored,
+            'bytes_served': self.bytes_served,
+            'store': await asyncio.to_thread(self.store.stats)
+        }
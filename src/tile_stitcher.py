@@ -0,0 +1,56 @@
+import io
+from typing import Optional
+
+from PIL import Image
+
+# Largest image height each encoder can write
+FORMAT_MAX_HEIGHT = {
+    'jpeg': 65500,
+    'webp': 16383,
+}
+
+
+class TileStitcher:
+    """
+    Assemble clip-region screenshots of one page into a single image.
+
+    Tiles are added top to bottom. `add` and `encode` do the CPU-heavy Pillow
+    work and are meant to run off the event loop (e.g. `asyncio.to_thread`).
+    """
+
+    def __init__(self, page_height: int, format: str = 'png', transparent: bool = False):
+        self.page_height = page_height
+        self.format = format
+        # JPEG has no alpha channel
+        self.mode = 'RGBA' if transparent and format != 'jpeg' else 'RGB'
+        self.canvas: Optional[Image.Image] = None
+        self.offset = 0
+
+    def add(self, data: bytes, css_height: int):
+        """Decode a tile and paste it below the previous one."""
+        with Image.open(io.BytesIO(data)) as tile:
+            tile = tile.convert(self.mode)
+            if self.canvas is None:
+                # Tiles are in device pixels, the page height is in CSS pixels
+                scale = tile.height / css_height
+                self.canvas = Image.new(self.mode, (tile.width, round(self.page_height * scale)))
+            self.canvas.paste(tile, (0, self.offset))
+            self.offset += tile.height
+
+    def encode(self, quality: Optional[int] = None) -> bytes:
+        """Encode the stitched image in the requested format."""
+        if self.canvas is None:
+            raise ValueError("No tiles were added")
+
+        height = min(self.offset, self.canvas.height, FORMAT_MAX_HEIGHT.get(self.format, self.offset))
+        image = self.canvas
+        if height != image.height:
+            image = image.crop((0, 0, image.width, height))
+
+        params = {}
+        if self.format in ('jpeg', 'webp') and quality is not None:
+            params['quality'] = quality
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=self.format.upper(), **params)
+        return buffer.getvalue()
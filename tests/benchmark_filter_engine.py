@@ -0,0 +1,104 @@
+"""
+Benchmark the filter list engine against a synthetic EasyList-sized list.
+
+    python tests/benchmark_filter_engine.py [--rules 50000] [--urls 20000] [--list easylist.txt ...]
+
+Reports the compile time and the per-URL match time. With `--list`, real
+filter lists are used instead of generated rules. The figures depend on the
+machine (CPU, Python build, load), so compare runs on the same host only.
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from filter_engine import FilterEngine  # noqa: E402
+
+TLDS = ('com', 'net', 'org', 'io', 'co.uk', 'de')
+RESOURCE_TYPES = ('script', 'image', 'stylesheet', 'xhr', 'font', 'media', 'other')
+
+
+def word(rng, low=3, high=10):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+
+def domain(rng):
+    return f"{word(rng)}.{rng.choice(TLDS)}"
+
+
+def generate_rules(rng, count):
+    """Roughly EasyList's mix: mostly host rules, then path patterns, options and exceptions."""
+    rules = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.55:
+            rules.append(f"||{domain(rng)}^")
+        elif kind < 0.65:
+            rules.append(f"||{domain(rng)}^$third-party")
+        elif kind < 0.85:
+            rules.append(f"/{word(rng)}/{word(rng)}_{rng.randint(1, 999)}.")
+        elif kind < 0.92:
+            rules.append(f"||{domain(rng)}/{word(rng)}/*.js$script,domain={domain(rng)}")
+        elif kind < 0.97:
+            rules.append(f"&{word(rng)}_{word(rng, 2, 5)}=")
+        else:
+            rules.append(f"@@||{domain(rng)}/{word(rng)}^")
+    return rules
+
+
+def generate_urls(rng, count, rules):
+    """Mostly unmatched URLs, with some aimed at the generated host rules."""
+    hosts = [rule[2:].split('^')[0].split('/')[0] for rule in rules if rule.startswith('||')]
+    urls = []
+    for _ in range(count):
+        host = rng.choice(hosts) if rng.random() < 0.2 else domain(rng)
+        path = '/'.join(word(rng) for _ in range(rng.randint(1, 4)))
+        query = f"?{word(rng)}={word(rng)}&{word(rng)}={rng.randint(0, 99999)}"
+        urls.append((f"https://{host}/{path}.{rng.choice(('js', 'png', 'css', 'json'))}{query}",
+                     rng.choice(RESOURCE_TYPES), domain(rng)))
+    return urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rules', type=int, default=50000)
+    parser.add_argument('--urls', type=int, default=20000)
+    parser.add_argument('--list', action='append', default=[], help="filter list file (repeatable)")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    if args.list:
+        lines = []
+        for path in args.list:
+            with open(path, 'r', encoding='utf-8', errors='replace') as file:
+                lines.extend(file)
+    else:
+        lines = generate_rules(rng, args.rules)
+
+    start = time.perf_counter()
+    engine = FilterEngine.from_lines(lines)
+    compile_ms = (time.perf_counter() - start) * 1000
+    print(f"compiled {len(engine)} rules from {len(lines)} lines in {compile_ms:.0f}ms")
+    print(f"  host rules: {sum(len(r) for r in engine.blocking.by_domain.values())}, "
+          f"token buckets: {len(engine.blocking.by_token)}, untokenized: {len(engine.blocking.untokenized)}")
+
+    urls = generate_urls(rng, args.urls, [line.strip() for line in lines])
+
+    # Warm-up pass compiles the regexes of rules that get looked at
+    for url, resource_type, source in urls:
+        engine.match(url, resource_type, source)
+
+    start = time.perf_counter()
+    blocked = sum(1 for url, resource_type, source in urls if engine.match(url, resource_type, source))
+    elapsed = time.perf_counter() - start
+    print(f"matched {len(urls)} URLs in {elapsed * 1000:.0f}ms: "
+          f"{elapsed / len(urls) * 1e6:.1f}us per URL, {blocked} blocked")
+
+
+if __name__ == '__main__':
+    main()
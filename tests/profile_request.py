@@ -1,5 +1,4 @@
 import sys
-import os
 from pathlib import Path
 
 # Add the src directory to the Python path
@@ -28,14 +27,11 @@ def profile_screenshot_capture():
         full_page=False
     )
 
-    # Create a temporary file path for the screenshot
-    temp_file_path = project_root / 'temp_screenshot.png'
-
     profiler = cProfile.Profile()
     profiler.enable()
 
     # Perform the screenshot capture
-    capture_service.capture_screenshot(str(temp_file_path), capture_options)
+    capture_service.capture_screenshot(capture_options)
 
     profiler.disable()
 
@@ -46,10 +42,6 @@ def profile_screenshot_capture():
 
     print(s.getvalue())
 
-    # Clean up the temporary file
-    if temp_file_path.exists():
-        os.remove(temp_file_path)
-
 
 if __name__ == '__main__':
     profile_screenshot_capture()
@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+from src.admission_controller import AdmissionController
+from exceptions import CapacityExceededException
+
+
+@pytest.mark.asyncio
+async def test_admits_up_to_max_concurrency():
+    controller = AdmissionController(max_concurrency=2, max_queue=0, max_wait=1)
+
+    async with controller.admit():
+        async with controller.admit():
+            assert controller.stats()['active'] == 2
+
+    assert controller.stats()['admitted'] == 2
+
+
+@pytest.mark.asyncio
+async def test_no_queue_is_only_saturated_while_all_slots_are_taken():
+    controller = AdmissionController(max_concurrency=4, max_queue=0, max_wait=10)
+    assert not controller.saturated
+
+    async with controller.admit(), controller.admit(), controller.admit():
+        assert not controller.saturated
+        async with controller.admit():
+            assert controller.saturated
+
+    assert not controller.saturated
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_is_full():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, max_wait=5)
+    release = asyncio.Event()
+
+    async def hold():
+        async with controller.admit():
+            await release.wait()
+
+    running = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    queued = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+
+    try:
+        assert controller.stats()['queue_depth'] == 1
+        assert controller.saturated
+        with pytest.raises(CapacityExceededException) as exc_info:
+            async with controller.admit():
+                pass
+        assert exc_info.value.retry_after >= 1
+    finally:
+        release.set()
+        await asyncio.gather(running, queued)
+
+    assert controller.stats()['rejected'] == 1
+
+
+@pytest.mark.asyncio
+async def test_rejects_after_max_wait():
+    controller = AdmissionController(max_concurrency=1, max_queue=5, max_wait=0.01)
+    release = asyncio.Event()
+
+    async def hold():
+        async with controller.admit():
+            await release.wait()
+
+    running = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+
+    try:
+        with pytest.raises(CapacityExceededException):
+            async with controller.admit():
+                pass
+    finally:
+        release.set()
+        await running
+    assert controller.stats()['queue_depth'] == 0
+
+
+@pytest.mark.asyncio
+async def test_max_wait_is_capped_by_caller():
+    controller = AdmissionController(max_concurrency=1, max_queue=5, max_wait=5)
+    release = asyncio.Event()
+
+    async def hold():
+        async with controller.admit():
+            await release.wait()
+
+    running = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+
+    try:
+        with pytest.raises(CapacityExceededException):
+            async with controller.admit(max_wait=0.01):
+                pass
+    finally:
+        release.set()
+        await running
@@ -0,0 +1,101 @@
+import os
+import pytest
+from src.blob_store import BlobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = BlobStore(str(tmp_path), max_bytes=100)
+    yield store
+    store.close()
+
+
+def blob_files(store):
+    return [name for _, _, files in os.walk(store.blob_dir) for name in files]
+
+
+def test_put_and_get(store):
+    store.put('a', b'hello', {'type': 'text'})
+
+    assert store.get('a') == (b'hello', {'type': 'text'})
+    assert store.get('missing') is None
+    assert store.stats()['hits'] == 1
+    assert store.stats()['misses'] == 1
+
+
+def test_identical_content_is_stored_once(store):
+    store.put('a', b'x' * 40)
+    store.put('b', b'x' * 40)
+
+    assert len(blob_files(store)) == 1
+    assert store.stats()['bytes'] == 40
+
+
+def test_expired_entries_are_misses(store):
+    store.put('a', b'hello', ttl_seconds=-1)
+
+    assert store.get('a') is None
+
+
+def test_blob_removed_after_lookup_is_a_miss(store):
+    digest = store.put('a', b'hello')
+    os.unlink(store._blob_path(digest))
+
+    assert store.get('a') is None
+    assert store.stats()['misses'] == 1
+
+    store.put('a', b'hello')
+    assert store.get('a') == (b'hello', {})
+
+
+def test_evicts_least_recently_used(store):
+    store.put('a', b'a' * 40)
+    store.put('b', b'b' * 40)
+    store.get('a')
+    store._db.execute("UPDATE entries SET last_access = 0 WHERE key = 'b'")
+
+    store.put('c', b'c' * 40)
+
+    assert store.get('b') is None
+    assert store.get('a') is not None
+    assert store.get('c') is not None
+    assert store.stats()['bytes'] == 80
+    assert len(blob_files(store)) == 2
+
+
+def test_replacing_a_key_releases_its_blob(store):
+    store.put('a', b'old')
+    store.put('a', b'new')
+
+    assert store.get('a')[0] == b'new'
+    assert store.stats()['bytes'] == 3
+    assert len(blob_files(store)) == 1
+
+
+def test_values_larger_than_the_store_are_not_kept(store):
+    assert store.put('a', b'x' * 101) == ''
+    assert store.get('a') is None
+
+
+def test_shared_between_instances(store, tmp_path):
+    store.put('a', b'hello')
+
+    other = BlobStore(str(tmp_path), max_bytes=100)
+    try:
+        assert other.get('a')[0] == b'hello'
+    finally:
+        other.close()
+
+
+def test_sweep_removes_orphaned_files(store):
+    orphan = os.path.join(store.blob_dir, 'ab', 'abcdef')
+    os.makedirs(os.path.dirname(orphan))
+    with open(orphan, 'wb') as file:
+        file.write(b'partial')
+    os.utime(orphan, (0, 0))
+    store.put('a', b'kept')
+
+    store.sweep()
+
+    assert not os.path.exists(orphan)
+    assert store.get('a')[0] == b'kept'
@@ -0,0 +1,151 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.blob_store import BlobStore
+from src.cache_manager import CacheManager
+from src.capture_request import CaptureRequest
+
+
+def make_request(**kwargs):
+    return CaptureRequest(url='https://example.com', **kwargs)
+
+
+def test_key_ignores_defaults_response_type_and_cache_controls():
+    key = CacheManager.cache_key(make_request())
+
+    assert CacheManager.cache_key(make_request(window_width=1920, format='png')) == key
+    assert CacheManager.cache_key(make_request(response_type='json', cache='refresh', cache_ttl=5)) == key
+    assert CacheManager.cache_key(make_request(window_width=800)) != key
+
+
+def test_key_matches_get_style_string_values():
+    assert (CacheManager.cache_key(CaptureRequest(url='https://example.com', window_width='800', full_page='true')) ==
+            CacheManager.cache_key(make_request(window_width=800, full_page=True)))
+
+
+def test_byte_bounded_lru():
+    cache = CacheManager(max_bytes=10)
+    cache.set('a', b'aaaa')
+    cache.set('b', b'bbbb')
+    cache.get('a')
+    cache.set('c', b'cccc')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == b'aaaa'
+    assert cache.get('c') == b'cccc'
+    assert cache.bytes == 8
+    assert cache.evictions == 1
+
+
+def test_entry_limit():
+    cache = CacheManager(max_bytes=100, max_entries=1)
+    cache.set('a', b'a')
+    cache.set('b', b'b')
+
+    assert cache.get('a') is None
+    assert cache.get('b') == b'b'
+
+
+def test_ttl_expiry():
+    cache = CacheManager(max_bytes=100, default_ttl=60)
+    with patch('src.cache_manager.time.monotonic', return_value=1000):
+        cache.set('a', b'a')
+        cache.set('b', b'b', ttl=5)
+    with patch('src.cache_manager.time.monotonic', return_value=1010):
+        assert cache.get('a') == b'a'
+        assert cache.get('b') is None
+    assert cache.bytes == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_hit_miss_refresh_and_bypass():
+    cache = CacheManager(max_bytes=100)
+    capture = AsyncMock(return_value=b'png')
+
+    assert await cache.fetch(make_request(), capture) == (b'png', 'MISS')
+    assert await cache.fetch(make_request(response_type='json'), capture) == (b'png', 'HIT')
+    assert await cache.fetch(make_request(cache='refresh'), capture) == (b'png', 'REFRESH')
+    assert await cache.fetch(make_request(cache='bypass'), capture) == (b'png', 'BYPASS')
+    assert capture.await_count == 3
+    assert (await cache.stats())['hit_ratio'] == 0.333
+
+
+@pytest.mark.asyncio
+async def test_fetch_bypasses_when_disabled():
+    cache = CacheManager(max_bytes=0)
+    capture = AsyncMock(return_value=b'png')
+
+    assert await cache.fetch(make_request(), capture) == (b'png', 'BYPASS')
+    assert await cache.fetch(make_request(), capture) == (b'png', 'BYPASS')
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_capture():
+    cache = CacheManager(max_bytes=100)
+    release = asyncio.Event()
+
+    async def capture():
+        await release.wait()
+        return b'png'
+
+    first = asyncio.create_task(cache.fetch(make_request(), capture))
+    second = asyncio.create_task(cache.fetch(make_request(), AsyncMock(side_effect=AssertionError)))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await first == (b'png', 'MISS')
+    assert await second == (b'png', 'HIT')
+
+
+@pytest.mark.asyncio
+async def test_failed_captures_are_not_cached():
+    cache = CacheManager(max_bytes=100)
+
+    with pytest.raises(RuntimeError):
+        await cache.fetch(make_request(), AsyncMock(side_effect=RuntimeError('crashed')))
+
+    assert await cache.fetch(make_request(), AsyncMock(return_value=b'png')) == (b'png', 'MISS')
+
+
+@pytest.fixture
+def disk_store(tmp_path):
+    store = BlobStore(str(tmp_path), max_bytes=1024)
+    yield store
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_is_shared_between_workers(disk_store):
+    worker_a = CacheManager(max_bytes=100, disk_store=disk_store)
+    worker_b = CacheManager(max_bytes=100, disk_store=disk_store)
+
+    assert await worker_a.fetch(make_request(), AsyncMock(return_value=b'png')) == (b'png', 'MISS')
+    capture = AsyncMock()
+    assert await worker_b.fetch(make_request(), capture) == (b'png', 'HIT')
+    capture.assert_not_awaited()
+    assert (await worker_b.stats())['disk_hits'] == 1
+
+    # Promoted to worker B's memory tier
+    assert await worker_b.fetch(make_request(), capture) == (b'png', 'HIT')
+    assert (await worker_b.stats())['memory_hits'] == 1
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_without_memory_tier(disk_store):
+    cache = CacheManager(max_bytes=0, disk_store=disk_store)
+
+    assert cache.enabled
+    await cache.fetch(make_request(format='html'), AsyncMock(return_value='<html></html>'))
+    assert await cache.fetch(make_request(format='html'), AsyncMock()) == ('<html></html>', 'HIT')
+    assert cache.bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_refresh_replaces_the_disk_entry(disk_store):
+    await CacheManager(max_bytes=100, disk_store=disk_store).fetch(make_request(), AsyncMock(return_value=b'old'))
+    await CacheManager(max_bytes=100, disk_store=disk_store).fetch(
+        make_request(cache='refresh'), AsyncMock(return_value=b'new')
+    )
+
+    cache = CacheManager(max_bytes=100, disk_store=disk_store)
+    assert await cache.fetch(make_request(), AsyncMock()) == (b'new', 'HIT')
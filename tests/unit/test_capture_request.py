@@ -27,7 +27,7 @@ def test_capture_request_default_values():
     assert request.full_page == False
     assert request.image_quality == 90
     assert request.pixel_density == 1.0
-    assert request.wait_for_network == "idle"
+    assert request.wait_for_network == "stable"
 
 
 def test_capture_request_invalid_url():
@@ -179,4 +179,8 @@ def test_valid_custom_headers():
 
 def test_invalid_custom_headers():
     with pytest.raises(ValidationError):
-        CaptureRequest(url="https://example.com", custom_headers={"Invalid:Header": "Value"})
\ No newline at end of file
+        CaptureRequest(url="https://example.com", custom_headers={"Invalid:Header": "Value"})
+
+def test_block_resources_from_query_string():
+    request = CaptureRequest(url="https://example.com", block_resources="image, font")
+    assert request.block_resources == ["image", "font"]
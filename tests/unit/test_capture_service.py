@@ -1,8 +1,11 @@
+import asyncio
 import pytest
-from unittest.mock import Mock, patch, call
+from unittest.mock import AsyncMock, Mock, patch, call
 from src.capture_service import CaptureService
 from src.exceptions import ScreenshotServiceException
 from src.capture_request import CaptureRequest, Geolocation
+# The service raises the exception classes imported through the src path on sys.path
+import exceptions as service_exceptions
 
 
 @pytest.fixture
@@ -41,7 +44,7 @@ async def test_capture_screenshot(capture_service, mock_context, mock_page, mock
     with patch.object(capture_service.context_manager, 'get_context', return_value=mock_context):
         mock_context.new_page.return_value = mock_page
 
-        await capture_service.capture_screenshot("output.png", mock_options)
+        await capture_service.capture_screenshot(mock_options)
 
         mock_page.goto.assert_called_with(
             "https://example.com",
@@ -62,10 +65,9 @@ async def test_capture_full_page_screenshot(capture_service, mock_context, mock_
         # Mock the evaluate method to return a valid height
         mock_page.evaluate.return_value = 10000
 
-        await capture_service.capture_screenshot("output.png", mock_options)
+        await capture_service.capture_screenshot(mock_options)
 
         mock_page.screenshot.assert_called_with(
-            path="output.png",
             full_page=True,
             quality=None,
             omit_background=False,
@@ -80,7 +82,7 @@ async def test_capture_element_screenshot(capture_service, mock_context, mock_pa
         mock_element = Mock()
         mock_page.query_selector.return_value = mock_element
 
-        await capture_service.capture_screenshot("output.png", mock_options)
+        await capture_service.capture_screenshot(mock_options)
 
         mock_page.query_selector.assert_called_with("#element")
         mock_element.screenshot.assert_called()
@@ -91,7 +93,7 @@ async def test_capture_pdf(capture_service, mock_context, mock_page, mock_option
         mock_context.new_page.return_value = mock_page
         mock_options.format = "pdf"
 
-        await capture_service.capture_screenshot("output.pdf", mock_options)
+        await capture_service.capture_screenshot(mock_options)
 
         mock_page.pdf.assert_called()
 
@@ -104,7 +106,7 @@ async def test_perform_interactions(capture_service, mock_context, mock_page, mo
             {"action": "type", "selector": "#input", "text": "Hello"}
         ]
 
-        await capture_service.capture_screenshot("output.png", mock_options)
+        await capture_service.capture_screenshot(mock_options)
 
         mock_page.click.assert_called_with("#button")
         mock_page.fill.assert_called_with("#input", "Hello")
@@ -131,7 +133,7 @@ async def test_user_agent_spoofing(capture_service, mock_context, mock_page, moc
     with patch.object(capture_service.context_manager, 'get_context', return_value=mock_context):
         mock_context.new_page.return_value = mock_page
 
-        await capture_service.capture_screenshot("output.png", mock_options)
+        await capture_service.capture_screenshot(mock_options)
 
         # Verify that ua_generator was called with correct parameters
         mock_ua_generator.generate.assert_called_once_with(
@@ -154,7 +156,7 @@ async def test_user_agent_spoofing_disabled(capture_service, mock_context, mock_
     with patch.object(capture_service.context_manager, 'get_context', return_value=mock_context):
         mock_context.new_page.return_value = mock_page
 
-        await capture_service.capture_screenshot("output.png", mock_options)
+        await capture_service.capture_screenshot(mock_options)
 
         # Verify that set_extra_http_headers was not called
         mock_page.set_extra_http_headers.assert_not_called()
@@ -170,7 +172,7 @@ async def test_user_agent_spoofing_with_custom_headers(capture_service, mock_con
     with patch.object(capture_service.context_manager, 'get_context', return_value=mock_context):
         mock_context.new_page.return_value = mock_page
 
-        await capture_service.capture_screenshot("output.png", mock_options)
+        await capture_service.capture_screenshot(mock_options)
 
         # Verify that both the generated user agent and custom headers were set
         mock_page.set_extra_http_headers.assert_called_once_with({
@@ -178,4 +180,105 @@ async def test_user_agent_spoofing_with_custom_headers(capture_service, mock_con
             'Accept-Language': 'en-US,en;q=0.9',
             'Accept-Encoding': 'gzip, deflate, br',
             'X-Custom-Header': 'CustomValue'
-        })
\ No newline at end of file
+        })
+
+@pytest.fixture
+def crash_service():
+    service = CaptureService()
+    service.context_manager = Mock()
+    service.context_manager.browser.is_connected.return_value = True
+    service.context_manager.wait_until_ready = AsyncMock()
+    return service
+
+
+@pytest.mark.asyncio
+async def test_capture_retried_once_after_browser_crash(crash_service, mock_options):
+    crash_service._capture = AsyncMock(side_effect=[service_exceptions.BrowserCrashedException("Target crashed"), b'image'])
+
+    result = await crash_service.capture_screenshot(mock_options)
+
+    assert result == b'image'
+    assert crash_service._capture.call_count == 2
+    crash_service.context_manager.wait_until_ready.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_failed_retry_reports_retry_attempts(crash_service, mock_options):
+    crash_service._capture = AsyncMock(side_effect=service_exceptions.BrowserCrashedException("Target crashed"))
+
+    with pytest.raises(service_exceptions.ScreenshotServiceException) as exc_info:
+        await crash_service.capture_screenshot(mock_options)
+
+    details = exc_info.value.args[0]
+    assert crash_service._capture.call_count == 2
+    assert details['type'] == 'BrowserCrashedException'
+    assert [attempt['attempt'] for attempt in details['retry_attempts']] == [1, 2]
+    assert details['retry_attempts'][0]['error'] == 'Target crashed'
+
+
+@pytest.mark.asyncio
+async def test_other_errors_are_not_retried(crash_service, mock_options):
+    crash_service._capture = AsyncMock(side_effect=ValueError("bad selector"))
+
+    with pytest.raises(service_exceptions.ScreenshotServiceException, match="bad selector"):
+        await crash_service.capture_screenshot(mock_options)
+
+    assert crash_service._capture.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_capture_returns_before_the_page_and_context_are_reset(mock_options):
+    from src.context_manager import ContextManager
+    from src.context_pool import ContextCache
+
+    def make_context(profile):
+        context = Mock(pages=[])
+        for name in ('clear_cookies', 'clear_permissions', 'set_geolocation', 'close'):
+            setattr(context, name, AsyncMock())
+
+        async def new_page():
+            page = Mock(viewport_size={'width': 1280, 'height': 720}, frames=[])
+            page.is_closed.return_value = False
+            for name in ('goto', 'close', 'unroute_all', 'set_extra_http_headers', 'set_viewport_size'):
+                setattr(page, name, AsyncMock())
+            context.pages.append(page)
+            return page
+
+        context.new_page = new_page
+        return context
+
+    async def factory(profile):
+        return make_context(profile)
+
+    reset_started, finish_reset = asyncio.Event(), asyncio.Event()
+
+    async def slow_restore(pooled):
+        reset_started.set()
+        await finish_reset.wait()
+        await service.context_manager.page_pool.restore(pooled)
+
+    service = CaptureService()
+    service.main_controller = AsyncMock()
+    service.screenshot_controller = AsyncMock()
+    service.screenshot_controller.take_screenshot.return_value = b'image'
+    service.context_manager = ContextManager()
+    page_pool = service.context_manager.page_pool
+    cache = ContextCache(factory, pool_size=1, on_create=page_pool.warm, on_release=slow_restore)
+    service.context_manager.context_cache = cache
+
+    assert await service.capture_screenshot(mock_options) == b'image'
+
+    # The response is ready while the reset is still waiting to run
+    await asyncio.wait_for(reset_started.wait(), 1)
+    pool = next(iter(cache._pools.values()))
+    (task,) = pool._returning
+    assert pool.idle_count == 0
+
+    finish_reset.set()
+    await task
+
+    assert pool.idle_count == 1
+    pooled = pool._idle.get_nowait()
+    assert pooled.released_pages == []
+    assert len(pooled.idle_pages) == 1
+    pooled.idle_pages[0].goto.assert_called_with('about:blank')
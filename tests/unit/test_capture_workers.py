@@ -0,0 +1,115 @@
+import asyncio
+import queue
+import time
+import pytest
+from unittest.mock import Mock, patch
+from src.capture_workers import CaptureWorkerPool, _read_shared_bytes, _share_bytes, _take_job, worker_pool_size
+from src.deadline import Deadline
+from exceptions import TimeoutException
+
+
+def test_shared_memory_round_trip():
+    data = b'\x89PNG' + bytes(range(256)) * 100
+    handle = _share_bytes(data)
+
+    assert handle['size'] == len(data)
+    assert _read_shared_bytes(handle['name'], handle['size']) == data
+
+
+@pytest.mark.asyncio
+async def test_dispatch_resolves_pending_job():
+    pool = CaptureWorkerPool(1)
+    pool._loop = asyncio.get_running_loop()
+    future = pool._loop.create_future()
+    pool._pending['job'] = future
+
+    pool._dispatch('started', 'job', 0)
+    pool._dispatch('done', 'job', b'image')
+
+    assert await future == b'image'
+    assert pool._running['job'] == 0
+    assert pool.stats()['completed'] == 1
+
+
+@pytest.mark.asyncio
+async def test_worker_crash_fails_only_its_jobs():
+    pool = CaptureWorkerPool(2)
+    loop = asyncio.get_running_loop()
+    crashed, healthy = loop.create_future(), loop.create_future()
+    pool._pending.update({'a': crashed, 'b': healthy})
+    pool._running.update({'a': 0, 'b': 1})
+
+    pool._fail_running(0, "Capture worker 0 crashed")
+
+    with pytest.raises(Exception, match="crashed"):
+        await crashed
+    assert not healthy.done()
+
+
+@pytest.mark.asyncio
+async def test_capture_wait_is_bounded_by_deadline():
+    pool = CaptureWorkerPool(1)
+    pool._loop = asyncio.get_running_loop()
+    pool._jobs = Mock()
+    pool._controls = {0: Mock(), 1: Mock()}
+
+    before = time.time()
+    with pytest.raises(TimeoutException, match='worker'):
+        await pool.capture_screenshot(Mock(model_dump=Mock(return_value={})), Deadline(50))
+    assert pool._pending == {}
+
+    # The job carries an absolute expiry, and every worker is told the supervisor gave up on it
+    job_id, _, expires_at = pool._jobs.put.call_args.args[0]
+    assert before < expires_at <= time.time() + 0.05
+    for control in pool._controls.values():
+        control.put.assert_called_once_with((job_id, expires_at))
+
+
+def test_dequeued_job_is_reported_before_it_runs():
+    jobs, results = queue.Queue(), queue.Queue()
+    expires_at = time.time() + 10
+    jobs.put(('job', {}, expires_at))
+    jobs.put(None)
+
+    assert _take_job(3, jobs, results) == ('job', {}, expires_at)
+    assert results.get_nowait() == ('started', 'job', 3)
+    assert _take_job(3, jobs, results) is None
+    assert results.empty()
+
+
+def test_expired_and_cancelled_jobs_are_dropped():
+    jobs, results = queue.Queue(), queue.Queue()
+    jobs.put(('expired', {}, time.time() - 1))
+    jobs.put(('cancelled', {}, time.time() + 10))
+    jobs.put(('job', {}, None))
+
+    assert _take_job(0, jobs, results, {'cancelled': None}) == ('job', {}, None)
+
+    kind, job_id, payload = results.get_nowait()
+    assert (kind, job_id, payload['type']) == ('error', 'expired', 'TimeoutException')
+    assert results.get_nowait() == ('started', 'job', 0)
+    assert results.empty()
+
+
+@pytest.mark.asyncio
+async def test_queued_jobs_fail_when_no_worker_starts():
+    pool = CaptureWorkerPool(1)
+    loop = asyncio.get_running_loop()
+    queued, running = loop.create_future(), loop.create_future()
+    pool._pending.update({'queued': queued, 'running': running})
+    pool._running['running'] = 0
+
+    pool._fail_queued("Capture workers are failing to start")
+
+    with pytest.raises(Exception, match="failing to start"):
+        await queued
+    assert not running.done()
+
+
+def test_cores_are_split_between_workers():
+    with patch('src.capture_workers.config.CONTEXT_POOL_SIZE', 0), \
+            patch('src.capture_workers.default_pool_size', return_value=8):
+        assert worker_pool_size(4) == 2
+        assert worker_pool_size(16) == 1
+    with patch('src.capture_workers.config.CONTEXT_POOL_SIZE', 3):
+        assert worker_pool_size(4) == 3
@@ -0,0 +1,92 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, Mock
+from src.consent_blocker import ConsentBlocker
+
+
+def script_rules(blocker):
+    # The init script calls the blocker function with the rules as its only argument
+    return json.loads(blocker.init_script[blocker.init_script.rindex(')({') + 2:-2])
+
+
+def test_init_script_embeds_rules():
+    blocker = ConsentBlocker()
+
+    assert blocker.init_script.startswith('((rules) =>')
+    rules = script_rules(blocker)
+    assert '#onetrust-consent-sdk' in rules['cookies']['hide']
+    assert 'popups' in rules
+
+
+def test_disabled_blockers_are_left_out():
+    rules = script_rules(ConsentBlocker(cookies=True, popups=False))
+
+    assert 'cookies' in rules
+    assert 'popups' not in rules
+
+
+def test_reject_buttons_are_tried_first():
+    rules = ConsentBlocker().rules()
+
+    assert rules['cookies']['click']['#onetrust-consent-sdk'][0] == '#onetrust-reject-all-handler'
+
+
+@pytest.mark.asyncio
+async def test_install_only_when_enabled():
+    context = Mock(add_init_script=AsyncMock())
+
+    await ConsentBlocker(cookies=False, popups=False).install(context)
+    context.add_init_script.assert_not_awaited()
+
+    blocker = ConsentBlocker()
+    await blocker.install(context)
+    context.add_init_script.assert_awaited_once_with(script=blocker.init_script)
+
+
+BANNER = """
+<div id="onetrust-consent-sdk">
+  <div id="onetrust-banner-sdk">
+    We use cookies
+    <button id="onetrust-reject-all-handler" onclick="window.consent = 'rejected'">Reject all</button>
+    <button id="onetrust-accept-btn-handler" onclick="window.consent = 'accepted'">Accept all</button>
+  </div>
+</div>
+"""
+
+# The banner is in the markup, or added by a consent script once the page has loaded
+BANNER_PAGES = {
+    'static': f"<html><body><p>Article</p>{BANNER}</body></html>",
+    'injected': ("<html><body><p>Article</p><script>"
+                 f"addEventListener('load', () => setTimeout(() => document.body.insertAdjacentHTML('beforeend', {json.dumps(BANNER)}), 200));"
+                 "</script></body></html>"),
+}
+
+
+@pytest.fixture
+async def browser():
+    from playwright.async_api import async_playwright
+    async with async_playwright() as playwright:
+        try:
+            browser = await playwright.chromium.launch()
+        except Exception as e:
+            pytest.skip(f"Chromium is not available: {str(e).splitlines()[0]}")
+        yield browser
+        await browser.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('variant', sorted(BANNER_PAGES))
+async def test_reject_button_is_clicked_in_a_page(browser, variant):
+    context = await browser.new_context()
+    await ConsentBlocker().install(context)
+    page = await context.new_page()
+    await page.route('https://news.example/', lambda route: route.fulfill(
+        body=BANNER_PAGES[variant], content_type='text/html'))
+
+    await page.goto('https://news.example/')
+    await page.wait_for_function('window.consent !== undefined', timeout=5000)
+
+    assert await page.evaluate('window.consent') == 'rejected'
+    assert await page.evaluate('window.__pixashotConsent.clicked') == 1
+    assert not await page.is_visible('#onetrust-banner-sdk')
+    await context.close()
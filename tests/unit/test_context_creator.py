@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import Mock, patch
-from src.context_manager import ContextManager
+from src.context_manager import ContextManager, get_browser_args
 from src.capture_request import CaptureRequest
 
 
@@ -34,9 +34,9 @@ def test_get_extensions(context_manager, mock_options):
     assert any('dont-care-cookies' in ext for ext in extensions)
 
 
-def test_get_browser_args(context_manager):
+def test_get_browser_args():
     extensions = ['/path/to/extension1', '/path/to/extension2']
-    args = context_manager._get_browser_args(extensions)
+    args = get_browser_args(extensions)
     assert '--disable-extensions-except=/path/to/extension1,/path/to/extension2' in args
     assert '--load-extension=/path/to/extension1' in args
     assert '--load-extension=/path/to/extension2' in args
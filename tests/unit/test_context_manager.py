@@ -0,0 +1,144 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from src.context_manager import ContextManager
+
+
+def make_browser():
+    browser = Mock()
+    browser.new_context = AsyncMock(
+        side_effect=lambda **kwargs: Mock(pages=[], close=AsyncMock(), add_init_script=AsyncMock())
+    )
+    browser.close = AsyncMock()
+    return browser
+
+
+@pytest.fixture
+def playwright():
+    playwright = Mock()
+    playwright.chromium.launch = AsyncMock(side_effect=lambda **kwargs: make_browser())
+    playwright.chromium.connect_over_cdp = AsyncMock(side_effect=lambda endpoint: make_browser())
+    return playwright
+
+
+@pytest.fixture
+def context_manager():
+    manager = ContextManager()
+    manager.page_pool.size = 0
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_initialize_launches_browser(context_manager, playwright):
+    with patch('src.context_manager.config.BROWSER_CDP_ENDPOINT', None):
+        await context_manager.initialize(playwright)
+
+    playwright.chromium.launch.assert_called_once()
+    playwright.chromium.connect_over_cdp.assert_not_called()
+    context_manager.browser.on.assert_called_with('disconnected', context_manager._on_disconnected)
+
+
+@pytest.mark.asyncio
+async def test_contexts_only_get_document_start_scripts(context_manager, playwright):
+    with patch('src.context_manager.config.BROWSER_CDP_ENDPOINT', None):
+        await context_manager.initialize(playwright)
+
+    async with context_manager.acquire_context() as pooled:
+        scripts = [call.kwargs['script'] for call in pooled.context.add_init_script.call_args_list]
+    assert scripts == [context_manager.consent_blocker.init_script]
+
+
+@pytest.mark.asyncio
+async def test_extensions_replace_the_headless_blocker(playwright):
+    with patch.dict('os.environ', {'USE_BROWSER_EXTENSIONS': 'true'}):
+        manager = ContextManager()
+    manager.page_pool.size = 0
+    with patch('src.context_manager.config.BROWSER_CDP_ENDPOINT', None):
+        await manager.initialize(playwright)
+
+    assert not manager.consent_blocker.enabled
+    assert playwright.chromium.launch.call_args.kwargs['headless'] is False
+    assert any(arg.startswith('--load-extension=') for arg in playwright.chromium.launch.call_args.kwargs['args'])
+
+
+@pytest.mark.asyncio
+async def test_initialize_connects_to_shared_browser(context_manager, playwright):
+    with patch('src.context_manager.config.BROWSER_CDP_ENDPOINT', 'http://127.0.0.1:9222'):
+        await context_manager.initialize(playwright)
+
+    playwright.chromium.connect_over_cdp.assert_called_once_with('http://127.0.0.1:9222')
+    playwright.chromium.launch.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_reconnects_when_browser_disconnects(context_manager, playwright):
+    with patch('src.context_manager.config.BROWSER_CDP_ENDPOINT', 'http://127.0.0.1:9222'):
+        await context_manager.initialize(playwright)
+        dead_browser = context_manager.browser
+        old_cache = context_manager.context_cache
+
+        context_manager._on_disconnected(dead_browser)
+        await context_manager._reconnect_task
+
+    assert context_manager.browser is not dead_browser
+    assert context_manager.context_cache is not old_cache
+    assert playwright.chromium.connect_over_cdp.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_no_reconnect_after_close(context_manager, playwright):
+    with patch('src.context_manager.config.BROWSER_CDP_ENDPOINT', None):
+        await context_manager.initialize(playwright)
+        await context_manager.close()
+        context_manager._on_disconnected(context_manager.browser)
+
+    assert context_manager._reconnect_task is None
+    assert playwright.chromium.launch.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_recycles_browser_after_max_pages(context_manager, playwright):
+    with patch('src.context_manager.config.BROWSER_CDP_ENDPOINT', None), \
+            patch('src.context_manager.config.BROWSER_MAX_PAGES', 2), \
+            patch('src.context_manager.config.BROWSER_MAX_RSS_MB', 0):
+        await context_manager.initialize(playwright)
+        old_browser = context_manager.browser
+
+        for _ in range(2):
+            async with context_manager.acquire_context():
+                pass
+        await context_manager._recycle_task
+
+    assert context_manager.browser is not old_browser
+    assert context_manager.pages_served == 0
+    assert context_manager.stats()['recycles'] == 1
+    old_browser.close.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_recycle_drains_in_flight_captures(context_manager, playwright):
+    with patch('src.context_manager.config.BROWSER_CDP_ENDPOINT', None):
+        await context_manager.initialize(playwright)
+        old_browser = context_manager.browser
+
+        async with context_manager.context_cache.acquire(context_manager.get_profile()):
+            recycle = asyncio.create_task(context_manager._recycle("test"))
+            await asyncio.sleep(0.05)
+            # The replacement is live but the old browser waits for the running capture
+            assert context_manager.browser is not old_browser
+            old_browser.close.assert_not_called()
+
+        await recycle
+
+    old_browser.close.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_shared_browser_is_not_recycled(context_manager, playwright):
+    with patch('src.context_manager.config.BROWSER_CDP_ENDPOINT', 'http://127.0.0.1:9222'), \
+            patch('src.context_manager.config.BROWSER_MAX_PAGES', 1):
+        await context_manager.initialize(playwright)
+        async with context_manager.acquire_context():
+            pass
+
+    assert context_manager._recycle_task is None
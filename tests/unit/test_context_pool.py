@@ -0,0 +1,265 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+from src.context_pool import ContextCache, ContextPool, request_origin
+from exceptions import TimeoutException
+
+
+def make_context():
+    context = Mock()
+    context.pages = []
+    context.close = AsyncMock()
+    context.clear_cookies = AsyncMock()
+    context.clear_permissions = AsyncMock()
+    context.set_geolocation = AsyncMock()
+    context.new_cdp_session = AsyncMock(return_value=Mock(send=AsyncMock(), detach=AsyncMock()))
+    return context
+
+
+async def settle():
+    # Let contexts returned in the background finish their reset
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def load_document(pooled, url):
+    pooled._on_request(Mock(resource_type='document', url=url))
+
+
+@pytest.fixture
+def factory():
+    return AsyncMock(side_effect=lambda: make_context())
+
+
+@pytest.mark.asyncio
+async def test_warm_creates_idle_contexts(factory):
+    pool = ContextPool(factory, size=3)
+    await pool.warm()
+
+    assert factory.call_count == 3
+    assert pool.idle_count == 3
+
+
+@pytest.mark.asyncio
+async def test_context_is_reset_and_reused(factory):
+    pool = ContextPool(factory, size=1)
+    await pool.warm()
+
+    async with pool.acquire() as first:
+        assert pool.in_use_count == 1
+    async with pool.acquire() as second:
+        pass
+
+    assert first is second
+    assert factory.call_count == 1
+    first.context.clear_cookies.assert_called()
+    first.context.clear_permissions.assert_called()
+    first.context.set_geolocation.assert_called_with(None)
+
+
+def test_request_origin():
+    assert request_origin('https://user@Example.com:8443/a?b') == 'https://example.com:8443'
+    assert request_origin('http://example.com/') == 'http://example.com'
+    assert request_origin('about:blank') is None
+    assert request_origin('data:text/html,hi') is None
+
+
+@pytest.mark.asyncio
+async def test_storage_of_visited_origins_is_cleared(factory):
+    pool = ContextPool(factory, size=1)
+
+    async with pool.acquire() as pooled:
+        pooled.idle_pages.append(Mock())
+        load_document(pooled, 'https://example.com/page')
+        load_document(pooled, 'https://ads.example.net/frame')
+        pooled._on_request(Mock(resource_type='script', url='https://cdn.example.org/app.js'))
+    await settle()
+
+    session = pooled.context.new_cdp_session.return_value
+    cleared = {call.args[1]['origin'] for call in session.send.call_args_list
+               if call.args[0] == 'Storage.clearDataForOrigin'}
+    assert cleared == {'https://example.com', 'https://ads.example.net'}
+    session.send.assert_any_call('Network.clearBrowserCache')
+    session.detach.assert_called_once()
+    assert pooled.origins == set()
+    assert pool.idle_count == 1
+
+
+@pytest.mark.asyncio
+async def test_context_without_page_is_recycled_after_storage_use(factory):
+    pool = ContextPool(factory, size=1)
+
+    async with pool.acquire() as pooled:
+        load_document(pooled, 'https://example.com/')
+    await settle()
+
+    pooled.context.close.assert_called_once()
+    pooled.context.new_cdp_session.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_context_recycled_after_max_uses(factory):
+    pool = ContextPool(factory, size=1, max_uses=2)
+
+    async with pool.acquire() as first:
+        pass
+    async with pool.acquire() as second:
+        pass
+    await settle()
+
+    assert first is second
+    first.context.close.assert_called_once()
+    async with pool.acquire() as third:
+        assert third is not first
+
+
+@pytest.mark.asyncio
+async def test_lease_ends_before_the_reset_and_holds_the_slot(factory):
+    pool = ContextPool(factory, size=1)
+    reset_started, finish_reset = asyncio.Event(), asyncio.Event()
+
+    async def slow_release(pooled):
+        reset_started.set()
+        await finish_reset.wait()
+
+    pool.on_release = slow_release
+    async with pool.acquire() as first:
+        pass
+    await reset_started.wait()
+
+    assert pool.idle_count == 0
+    with pytest.raises(TimeoutException):
+        async with pool.acquire(timeout=0.01):
+            pass
+    finish_reset.set()
+    async with pool.acquire(timeout=1) as second:
+        assert second is first
+
+
+@pytest.mark.asyncio
+async def test_reset_that_overruns_its_timeout_discards_context(factory):
+    async def hung_release(pooled):
+        await asyncio.sleep(1)
+
+    pool = ContextPool(factory, size=1, reset_timeout=0.01, on_release=hung_release)
+
+    async with pool.acquire() as pooled:
+        pass
+    await asyncio.sleep(0.05)
+
+    pooled.context.close.assert_called_once()
+    assert pool.idle_count == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrency_bounded_by_pool_size(factory):
+    pool = ContextPool(factory, size=2)
+    active = 0
+    peak = 0
+
+    async def capture():
+        nonlocal active, peak
+        async with pool.acquire():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(capture() for _ in range(6)))
+
+    assert peak == 2
+    assert factory.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_acquire_times_out_when_pool_is_exhausted(factory):
+    pool = ContextPool(factory, size=1)
+
+    async with pool.acquire():
+        with pytest.raises(TimeoutException):
+            async with pool.acquire(timeout=0.05):
+                pass
+
+
+@pytest.mark.asyncio
+async def test_slow_context_creation_times_out_and_is_kept(factory):
+    created = make_context()
+
+    async def slow_factory():
+        await asyncio.sleep(0.1)
+        return created
+
+    pool = ContextPool(slow_factory, size=1)
+    with pytest.raises(TimeoutException):
+        async with pool.acquire(timeout=0.01):
+            pass
+    await asyncio.sleep(0.15)
+
+    assert pool.idle_count == 1
+    async with pool.acquire(timeout=0.01) as pooled:
+        assert pooled.context is created
+
+
+@pytest.mark.asyncio
+async def test_failed_reset_discards_context(factory):
+    pool = ContextPool(factory, size=1)
+
+    async with pool.acquire() as pooled:
+        pooled.context.clear_cookies.side_effect = Exception("context closed")
+    await settle()
+
+    pooled.context.close.assert_called_once()
+    assert pool.idle_count == 0
+
+
+@pytest.mark.asyncio
+async def test_context_cache_reuses_contexts_per_profile():
+    factory = AsyncMock(side_effect=lambda profile: make_context())
+    cache = ContextCache(factory, pool_size=2)
+
+    async with cache.acquire('retina') as first:
+        pass
+    await settle()
+    async with cache.acquire('retina') as second:
+        pass
+    async with cache.acquire('desktop') as third:
+        pass
+
+    assert first is second
+    assert third is not first
+    assert [c.args[0] for c in factory.call_args_list] == ['retina', 'desktop']
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+@pytest.mark.asyncio
+async def test_context_cache_evicts_least_recently_used_profile():
+    factory = AsyncMock(side_effect=lambda profile: make_context())
+    cache = ContextCache(factory, pool_size=1, max_profiles=2)
+
+    async with cache.acquire('a') as evicted:
+        pass
+    async with cache.acquire('b'):
+        pass
+    async with cache.acquire('c'):
+        pass
+    await asyncio.sleep(0)
+
+    assert cache.stats()['profiles'] == 2
+    assert cache.stats()['evictions'] == 1
+    evicted.context.close.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_context_cache_evicts_idle_profiles():
+    factory = AsyncMock(side_effect=lambda profile: make_context())
+    cache = ContextCache(factory, pool_size=1, idle_timeout=0)
+
+    async with cache.acquire('a'):
+        pass
+    await asyncio.sleep(0.001)
+    async with cache.acquire('b'):
+        pass
+
+    assert cache.stats()['profiles'] == 1
+    assert cache.stats()['evictions'] == 1
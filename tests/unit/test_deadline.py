@@ -0,0 +1,55 @@
+import asyncio
+import math
+import pytest
+from src.deadline import Deadline
+from exceptions import TimeoutException
+
+
+def test_budget_is_capped_by_stage_limit():
+    deadline = Deadline(10000)
+
+    assert deadline.budget(500) == 500
+    assert 9000 < deadline.budget() <= 10000
+
+
+def test_budget_is_capped_by_remaining_time():
+    deadline = Deadline(200)
+
+    assert deadline.budget(5000) <= 200
+
+
+def test_expired_deadline_still_gives_a_positive_timeout():
+    deadline = Deadline(0)
+
+    assert deadline.expired
+    assert deadline.budget(5000) == 1
+
+
+def test_check_raises_once_expired():
+    Deadline(1000).check('navigation')
+
+    with pytest.raises(TimeoutException, match='navigation'):
+        Deadline(0).check('navigation')
+
+
+def test_unlimited_deadline():
+    deadline = Deadline.unlimited()
+
+    assert not deadline.expired
+    assert math.isinf(deadline.remaining_ms())
+    assert deadline.budget(500) == 500
+    assert deadline.budget() == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_for_raises_once_budget_runs_out():
+    never = asyncio.get_running_loop().create_future()
+
+    with pytest.raises(TimeoutException, match='page preparation'):
+        await Deadline(50).wait_for(never, 'page preparation')
+    assert never.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_wait_for_returns_result_within_budget():
+    assert await Deadline.unlimited().wait_for(asyncio.sleep(0, 'done'), 'stage') == 'done'
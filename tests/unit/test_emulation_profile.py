@@ -0,0 +1,43 @@
+from src.capture_request import CaptureRequest
+from src.emulation_profile import EmulationProfile
+
+
+def test_profile_from_mobile_template():
+    options = CaptureRequest(url="https://example.com", template="mobile", dark_mode=True)
+    profile = EmulationProfile.from_options(options)
+
+    context_options = profile.to_context_options()
+    assert context_options['viewport'] == {'width': 375, 'height': 667}
+    assert context_options['device_scale_factor'] == 2.0
+    assert context_options['is_mobile'] is True
+    assert context_options['color_scheme'] == 'dark'
+    assert 'user_agent' not in context_options
+
+
+def test_equivalent_requests_share_a_profile():
+    first = CaptureRequest(url="https://example.com", pixel_density=2)
+    second = CaptureRequest(url="https://example.org", pixel_density=2.0, full_page=True)
+    third = CaptureRequest(url="https://example.com", pixel_density=1)
+
+    assert EmulationProfile.from_options(first) == EmulationProfile.from_options(second)
+    assert EmulationProfile.from_options(first) != EmulationProfile.from_options(third)
+
+
+def test_profile_includes_proxy_and_user_agent():
+    options = CaptureRequest(url="https://example.com", use_random_user_agent=True, user_agent_device='mobile')
+    profile = EmulationProfile.from_options(options, {'server': 'proxy:8080'})
+
+    context_options = profile.to_context_options()
+    assert context_options['proxy'] == {'server': 'proxy:8080'}
+    assert context_options['user_agent']
+    hash(profile)
+
+
+def test_profile_emulates_media_features():
+    options = CaptureRequest(url="https://example.com", reduced_motion=True, forced_colors=True)
+    profile = EmulationProfile.from_options(options)
+
+    context_options = profile.to_context_options()
+    assert context_options['reduced_motion'] == 'reduce'
+    assert context_options['forced_colors'] == 'active'
+    assert profile != EmulationProfile.from_options(CaptureRequest(url="https://example.com"))
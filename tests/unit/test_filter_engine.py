@@ -0,0 +1,92 @@
+import pytest
+from src.filter_engine import FilterEngine, base_domain, hostname, parse_rule, pattern_tokens
+
+RULES = """
+! Title: test list
+[Adblock Plus 2.0]
+||ads.example.com^
+||tracker.net^$third-party
+/banner/*/ad_
+&ad_type=
+@@||ads.example.com/allowed^
+||cdn.site.com/ads/*.js$script,domain=news.com|~sports.news.com
+||important.net^$important
+@@||important.net^
+example.com##.ad-banner
+||popup.com^$popup
+/ads[0-9]+/
+""".splitlines()
+
+
+@pytest.fixture
+def engine():
+    return FilterEngine.from_lines(RULES)
+
+
+def test_skips_comments_cosmetic_and_unsupported_rules(engine):
+    assert parse_rule('! comment') is None
+    assert parse_rule('example.com##.ad-banner') is None
+    assert parse_rule('||popup.com^$popup') is None
+    assert parse_rule('/ads[0-9]+/') is None
+    assert len(engine) == 8
+
+
+def test_host_rules_use_the_domain_table(engine):
+    assert 'ads.example.com' in engine.blocking.by_domain
+    assert engine.match('https://ads.example.com/x.js', 'script', 'news.com')
+    assert engine.match('https://sub.ads.example.com/x', 'image', 'news.com')
+    assert engine.match('https://notads.example.com/x', 'image', 'news.com') is None
+
+
+def test_exception_rules(engine):
+    assert engine.match('https://ads.example.com/allowed/x', 'image', 'news.com') is None
+    assert engine.excepted == 1
+
+
+def test_important_overrides_exceptions(engine):
+    assert engine.match('https://important.net/x', 'image', 'news.com')
+
+
+def test_third_party_option(engine):
+    assert engine.match('https://tracker.net/p', 'image', 'tracker.net') is None
+    assert engine.match('https://cdn.tracker.net/p', 'image', 'www.tracker.net') is None
+    assert engine.match('https://tracker.net/p', 'image', 'news.com')
+
+
+def test_type_and_domain_options(engine):
+    url = 'https://cdn.site.com/ads/a.js'
+    assert engine.match(url, 'script', 'news.com')
+    assert engine.match(url, 'script', 'www.news.com')
+    assert engine.match(url, 'script', 'sports.news.com') is None
+    assert engine.match(url, 'image', 'news.com') is None
+    assert engine.match(url, 'script', 'other.com') is None
+
+
+def test_wildcard_and_separator_patterns(engine):
+    assert engine.match('https://x.com/banner/1/ad_2.gif', 'image', 'x.com')
+    assert engine.match('https://q.com/?x=1&ad_type=2', 'xhr', 'q.com')
+    assert engine.match('https://q.com/?x=1&bad_type=2', 'xhr', 'q.com') is None
+
+
+def test_pattern_tokens_skip_partial_tokens():
+    assert pattern_tokens('||ads.example.com/banner') == ['ads', 'example', 'com']
+    assert pattern_tokens('/banner/*/ad_') == ['banner', 'ad']
+    assert pattern_tokens('/banner*') == []
+    assert pattern_tokens('&ad_type=') == ['ad', 'type']
+
+
+def test_url_helpers():
+    assert hostname('https://user:pw@cdn.example.com:8443/a?b#c') == 'cdn.example.com'
+    assert base_domain('a.b.example.co.uk') == 'example.co.uk'
+    assert base_domain('www.example.com') == 'example.com'
+
+
+def test_stats_count_rule_hits(engine):
+    engine.match('https://ads.example.com/1', 'image', 'news.com')
+    engine.match('https://ads.example.com/2', 'image', 'news.com')
+    engine.match('https://clean.com/', 'image', 'news.com')
+
+    stats = engine.stats()
+    assert stats['checked'] == 3
+    assert stats['blocked'] == 2
+    assert stats['top_rules'] == [{'rule': '||ads.example.com^', 'hits': 2}]
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.controllers.interaction_controller import InteractionController
+
+
+def make_page(expire=True):
+    handlers = {}
+    session = MagicMock()
+    session.on.side_effect = lambda event, handler: handlers.setdefault(event, handler)
+    session.detach = AsyncMock()
+
+    async def send(method, params=None):
+        if method == 'Emulation.setVirtualTimePolicy' and params.get('budget') and expire:
+            asyncio.get_running_loop().call_soon(handlers['Emulation.virtualTimeBudgetExpired'], {})
+
+    session.send = AsyncMock(side_effect=send)
+    page = MagicMock()
+    page.context.new_cdp_session = AsyncMock(return_value=session)
+    return page, session
+
+
+@pytest.mark.asyncio
+async def test_advance_virtual_time_waits_for_budget_to_expire():
+    page, session = make_page()
+
+    assert await InteractionController().advance_virtual_time(page, 5000, timeout=1000)
+
+    session.send.assert_any_await('Emulation.setVirtualTimePolicy', {
+        'policy': 'pauseIfNetworkFetchesPending',
+        'budget': 5000
+    })
+    session.send.assert_awaited_with('Emulation.setVirtualTimePolicy', {'policy': 'advance'})
+    session.detach.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_advance_virtual_time_gives_up_after_timeout():
+    page, session = make_page(expire=False)
+
+    assert not await InteractionController().advance_virtual_time(page, 5000, timeout=20)
+
+    session.send.assert_awaited_with('Emulation.setVirtualTimePolicy', {'policy': 'advance'})
+
+
+@pytest.mark.asyncio
+async def test_advance_virtual_time_without_cdp():
+    page = MagicMock()
+    page.context.new_cdp_session = AsyncMock(side_effect=Exception("CDP session is only available in Chromium"))
+
+    assert not await InteractionController().advance_virtual_time(page, 5000, timeout=1000)
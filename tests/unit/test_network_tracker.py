@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from src.network_tracker import NetworkTracker
+
+
+@pytest.fixture
+def page():
+    page = MagicMock()
+    handlers = {}
+    page.on.side_effect = lambda event, handler: handlers.setdefault(event, handler)
+    page.handlers = handlers
+    return page
+
+
+def test_attach_subscribes_to_request_events(page):
+    tracker = NetworkTracker.attach(page)
+
+    assert set(page.handlers) == {'request', 'requestfinished', 'requestfailed'}
+    assert NetworkTracker.for_page(page) is tracker
+
+
+def test_in_flight_counter(page):
+    tracker = NetworkTracker.attach(page)
+
+    page.handlers['request'](MagicMock())
+    page.handlers['request'](MagicMock())
+    page.handlers['requestfinished'](MagicMock())
+    assert tracker.in_flight == 1
+
+    page.handlers['requestfailed'](MagicMock())
+    page.handlers['requestfailed'](MagicMock())
+    assert tracker.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_for_idle_returns_after_quiet_period(page):
+    tracker = NetworkTracker.attach(page)
+    page.handlers['request'](MagicMock())
+
+    async def finish_request():
+        await asyncio.sleep(0.02)
+        page.handlers['requestfinished'](MagicMock())
+
+    asyncio.create_task(finish_request())
+    assert await tracker.wait_for_idle(quiet_ms=10, timeout_ms=1000)
+    assert tracker.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_for_idle_times_out_with_requests_in_flight(page):
+    tracker = NetworkTracker.attach(page)
+    page.handlers['request'](MagicMock())
+
+    assert not await tracker.wait_for_idle(quiet_ms=10, timeout_ms=30)
+
+
+@pytest.mark.asyncio
+async def test_reset_clears_in_flight_requests(page):
+    tracker = NetworkTracker.attach(page)
+    page.handlers['request'](MagicMock())
+
+    tracker.reset()
+
+    assert tracker.in_flight == 0
+    assert await tracker.wait_for_idle(quiet_ms=10, timeout_ms=1000)
+
+
+@pytest.mark.asyncio
+async def test_mostly_idle_allows_a_few_requests_in_flight(page):
+    tracker = NetworkTracker.attach(page)
+    page.handlers['request'](MagicMock())
+    page.handlers['request'](MagicMock())
+
+    assert await tracker.wait_for_mostly_idle(timeout_ms=100, idle_threshold=2)
+
+
+@pytest.mark.asyncio
+async def test_mostly_idle_resolves_when_requests_finish(page):
+    tracker = NetworkTracker.attach(page)
+    for _ in range(3):
+        page.handlers['request'](MagicMock())
+
+    async def finish_request():
+        await asyncio.sleep(0.02)
+        page.handlers['requestfinished'](MagicMock())
+
+    asyncio.create_task(finish_request())
+    assert await tracker.wait_for_mostly_idle(timeout_ms=1000, idle_threshold=2, window_ms=10)
+
+
+@pytest.mark.asyncio
+async def test_mostly_idle_waits_for_burst_to_age_out(page):
+    tracker = NetworkTracker.attach(page)
+    for _ in range(3):
+        page.handlers['request'](MagicMock())
+        page.handlers['requestfinished'](MagicMock())
+
+    assert tracker.recent_completion_count(window_ms=1000) == 3
+    assert not await tracker.wait_for_mostly_idle(timeout_ms=20, idle_threshold=2, window_ms=200)
+    assert await tracker.wait_for_mostly_idle(timeout_ms=1000, idle_threshold=2, window_ms=50)
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_removed_after_resolving(page):
+    tracker = NetworkTracker.attach(page)
+
+    await tracker.wait_for_mostly_idle(timeout_ms=100)
+    await tracker.wait_for_idle(quiet_ms=0, timeout_ms=100)
+
+    assert not tracker._waiters
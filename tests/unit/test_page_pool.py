@@ -0,0 +1,109 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from src.context_pool import PooledContext
+from src.page_pool import PagePool
+
+
+def make_page():
+    page = Mock()
+    page.is_closed.return_value = False
+    page.viewport_size = {'width': 1280, 'height': 720}
+    page.goto = AsyncMock()
+    page.close = AsyncMock()
+    page.unroute_all = AsyncMock()
+    page.set_extra_http_headers = AsyncMock()
+    page.set_viewport_size = AsyncMock()
+    page.frames = [Mock(evaluate=AsyncMock())]
+    return page
+
+
+@pytest.fixture
+def pooled():
+    context = Mock()
+    context.new_page = AsyncMock(side_effect=lambda: make_page())
+    return PooledContext(context)
+
+
+@pytest.mark.asyncio
+async def test_warm_precreates_pages(pooled):
+    pool = PagePool(size=1)
+    await pool.warm(pooled)
+
+    page = await pool.acquire(pooled)
+
+    assert pooled.context.new_page.call_count == 1
+    assert pool.stats()['reused'] == 1
+    assert page.viewport_size == {'width': 1280, 'height': 720}
+
+
+@pytest.mark.asyncio
+async def test_released_page_is_reset_and_reused(pooled):
+    pool = PagePool(size=1)
+    page = await pool.acquire(pooled)
+    page.viewport_size = {'width': 1280, 'height': 16384}
+
+    pool.release(pooled, page)
+    await pool.restore(pooled)
+    again = await pool.acquire(pooled)
+
+    assert again is page
+    page.goto.assert_called_with('about:blank')
+    page.unroute_all.assert_called_once()
+    page.set_extra_http_headers.assert_called_with({})
+    page.set_viewport_size.assert_called_with({'width': 1280, 'height': 720})
+    page.frames[0].evaluate.assert_called_with('() => sessionStorage.clear()')
+    page.close.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_page_marked_not_reusable_is_discarded(pooled):
+    pool = PagePool(size=1)
+    page = await pool.acquire(pooled)
+    PagePool.mark_not_reusable(page)
+
+    pool.release(pooled, page)
+    await pool.restore(pooled)
+
+    page.close.assert_called_once()
+    assert pooled.idle_pages == []
+
+
+@pytest.mark.asyncio
+async def test_crashed_page_is_discarded(pooled):
+    pool = PagePool(size=1)
+    page = await pool.acquire(pooled)
+    page._pixashot_crashed = True
+
+    pool.release(pooled, page)
+    await pool.restore(pooled)
+
+    page.close.assert_called_once()
+    assert pool.stats()['discarded'] == 1
+
+
+@pytest.mark.asyncio
+async def test_pooling_disabled_closes_pages(pooled):
+    pool = PagePool(size=0)
+    page = await pool.acquire(pooled)
+
+    pool.release(pooled, page)
+    await pool.restore(pooled)
+
+    page.close.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_release_defers_the_reset_to_restore(pooled):
+    pool = PagePool(size=1)
+    page = await pool.acquire(pooled)
+
+    pool.release(pooled, page)
+
+    page.goto.assert_not_called()
+    assert pooled.released_pages == [page]
+    assert pooled.idle_pages == []
+
+    await pool.restore(pooled)
+
+    assert pooled.released_pages == []
+    assert pooled.idle_pages == [page]
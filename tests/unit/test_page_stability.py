@@ -0,0 +1,44 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.network_tracker import NetworkTracker
+from src.page_stability import wait_for_page_stable
+
+
+@pytest.fixture
+def page():
+    page = MagicMock()
+    page._pixashot_network = None
+    page.evaluate = AsyncMock(return_value={'stable': True, 'elapsed': 50})
+    return page
+
+
+@pytest.mark.asyncio
+async def test_stable_page(page):
+    assert await wait_for_page_stable(page, 1000)
+
+    _, (name, _, args) = page.evaluate.call_args.args
+    assert name == 'page-stability'
+    assert args['quietMs'] == 50
+
+
+@pytest.mark.asyncio
+async def test_unstable_dom(page):
+    page.evaluate.return_value = {'stable': False, 'elapsed': 1000}
+
+    assert not await wait_for_page_stable(page, 1000)
+
+
+@pytest.mark.asyncio
+async def test_waits_for_network_tracker(page):
+    tracker = NetworkTracker()
+    tracker.in_flight = 1
+    page._pixashot_network = tracker
+
+    assert not await wait_for_page_stable(page, 50)
+
+
+@pytest.mark.asyncio
+async def test_evaluate_failure_is_not_fatal(page):
+    page.evaluate.side_effect = Exception("Execution context was destroyed")
+
+    assert not await wait_for_page_stable(page, 1000)
@@ -0,0 +1,108 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.capture_request import CaptureRequest
+from src.controllers.main_controller import MainBrowserController
+from src.deadline import Deadline
+from src.preparation_plan import PreparationPlan
+
+
+def test_plan_follows_request_flags():
+    options = CaptureRequest(url="https://example.com", dark_mode=True, dark_mode_fallback=True,
+                             custom_js="document.title = 'x'",
+                             wait_for_selector="#main", wait_for_animation=True, wait_for_timeout=3000)
+
+    plan = PreparationPlan.from_options(options, Deadline.unlimited(), scroll={'maxHeight': 100})
+
+    assert plan.to_script_arg() == {
+        'preventOverflow': True,
+        'darkMode': True,
+        'customJs': "document.title = 'x'",
+        'waitForSelector': '#main',
+        'selectorTimeoutMs': 3000,
+        'waitForAnimationsMs': 2000,
+        'freezeAnimations': False,
+        'scroll': {'maxHeight': 100}
+    }
+
+
+def test_plan_waits_are_clipped_to_deadline():
+    options = CaptureRequest(url="https://example.com", wait_for_selector="#main", wait_for_animation=True)
+
+    plan = PreparationPlan.from_options(options, Deadline(100))
+
+    assert plan.selector_timeout_ms <= 100
+    assert plan.wait_for_animations_ms <= 100
+    assert plan.scroll is None
+
+
+def test_frozen_animations_are_not_waited_for():
+    options = CaptureRequest(url="https://example.com", wait_for_animation=True, freeze_animations=True)
+
+    plan = PreparationPlan.from_options(options, Deadline.unlimited())
+
+    assert plan.freeze_animations
+    assert plan.wait_for_animations_ms == 0
+
+
+def test_dark_mode_script_is_opt_in():
+    options = CaptureRequest(url="https://example.com", dark_mode=True)
+
+    assert not PreparationPlan.from_options(options, Deadline.unlimited()).dark_mode
+
+
+@pytest.mark.asyncio
+async def test_prepare_page_runs_plan_in_one_call():
+    page = MagicMock()
+    page.evaluate = AsyncMock(return_value={
+        'applied': ['prevent_overflow', 'dark_mode'], 'errors': {}, 'height': 2400, 'elapsed': 3
+    })
+    options = CaptureRequest(url="https://example.com", dark_mode=True, dark_mode_fallback=True)
+
+    result = await MainBrowserController().prepare_page(page, options)
+
+    assert result['height'] == 2400
+    page.evaluate.assert_awaited_once()
+    _, (name, _, arg) = page.evaluate.call_args.args
+    assert name == 'prepare-page'
+    assert arg['darkMode']
+
+
+@pytest.mark.asyncio
+async def test_custom_js_blocked_in_page_is_retried_through_playwright():
+    page = MagicMock()
+    page.evaluate = AsyncMock(side_effect=[
+        {'applied': [], 'errors': {'custom_js': 'EvalError: unsafe-eval'}, 'evalBlocked': True, 'height': 900},
+        None
+    ])
+    options = CaptureRequest(url="https://example.com", custom_js="document.title = 'x'")
+
+    await MainBrowserController().prepare_page(page, options)
+
+    page.evaluate.assert_awaited_with("document.title = 'x'")
+
+
+@pytest.mark.asyncio
+async def test_custom_js_that_fails_in_page_is_not_run_again():
+    page = MagicMock()
+    page.evaluate = AsyncMock(return_value={
+        'applied': [], 'errors': {'custom_js': 'boom'}, 'evalBlocked': False, 'height': 900
+    })
+    options = CaptureRequest(url="https://example.com", custom_js="counter++; throw new Error('boom')")
+
+    await MainBrowserController().prepare_page(page, options)
+
+    page.evaluate.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_non_css_selector_falls_back_to_playwright():
+    page = MagicMock()
+    page.evaluate = AsyncMock(return_value={
+        'applied': [], 'errors': {'wait_for_selector': "'text=Hi' is not a valid selector."}, 'height': 900
+    })
+    page.wait_for_selector = AsyncMock()
+    options = CaptureRequest(url="https://example.com", wait_for_selector="text=Hi")
+
+    await MainBrowserController().prepare_page(page, options)
+
+    page.wait_for_selector.assert_awaited_once_with("text=Hi", timeout=5000)
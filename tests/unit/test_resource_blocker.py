@@ -0,0 +1,139 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.resource_blocker import ResourceBlocker
+
+
+def make_options(block_media=False, block_resources=None):
+    return MagicMock(block_media=block_media, block_resources=block_resources)
+
+
+def make_route(resource_type):
+    route = MagicMock()
+    route.request.resource_type = resource_type
+    route.abort = AsyncMock()
+    route.fallback = AsyncMock()
+    return route
+
+
+def test_no_blocker_without_blocked_types():
+    assert ResourceBlocker.from_options(make_options()) is None
+    assert ResourceBlocker.from_options(make_options(block_resources=[])) is None
+
+
+def test_block_media_blocks_images_and_media():
+    blocker = ResourceBlocker.from_options(make_options(block_media=True, block_resources=['font']))
+
+    assert blocker.blocked_types == {'image', 'media', 'font'}
+
+
+def test_beacon_maps_to_playwright_ping():
+    blocker = ResourceBlocker.from_options(make_options(block_resources=['beacon']))
+
+    assert 'ping' in blocker.blocked_types
+
+
+def make_page():
+    page = MagicMock()
+    page.route = AsyncMock()
+    page.route_web_socket = AsyncMock()
+    session = MagicMock(send=AsyncMock(), detach=AsyncMock())
+    page.context.new_cdp_session = AsyncMock(return_value=session)
+    return page, session
+
+
+@pytest.mark.asyncio
+async def test_blocked_types_are_intercepted_in_the_browser_only():
+    page, session = make_page()
+    blocker = ResourceBlocker.from_options(make_options(block_resources=['image', 'font', 'beacon']))
+
+    await blocker.install(page)
+
+    session.send.assert_awaited_once_with('Fetch.enable', {'patterns': [
+        {'resourceType': 'Font', 'requestStage': 'Request'},
+        {'resourceType': 'Image', 'requestStage': 'Request'},
+        {'resourceType': 'Ping', 'requestStage': 'Request'},
+    ]})
+    session.on.assert_called_once_with('Fetch.requestPaused', blocker._on_request_paused)
+    page.route.assert_not_awaited()
+    page.route_web_socket.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_paused_requests_are_failed_and_counted():
+    page, session = make_page()
+    blocker = ResourceBlocker.from_options(make_options(block_resources=['image', 'font']))
+    await blocker.install(page)
+
+    for request_id, resource_type in (('1', 'Image'), ('2', 'Font'), ('3', 'Image')):
+        await blocker._on_request_paused({'requestId': request_id, 'resourceType': resource_type})
+
+    session.send.assert_awaited_with('Fetch.failRequest', {'requestId': '3', 'errorReason': 'BlockedByClient'})
+    stats = blocker.stats()
+    assert stats['blocked'] == 3
+    assert stats['blocked_by_type'] == {'image': 2, 'font': 1}
+
+
+@pytest.mark.asyncio
+async def test_uninstall_detaches_the_session():
+    page, session = make_page()
+    blocker = ResourceBlocker.from_options(make_options(block_resources=['stylesheet']))
+    await blocker.install(page)
+
+    await blocker.uninstall(page)
+    await blocker._on_request_paused({'requestId': '1', 'resourceType': 'Stylesheet'})
+
+    session.detach.assert_awaited_once()
+    assert blocker.stats()['blocked'] == 0
+
+
+@pytest.mark.asyncio
+async def test_websocket_blocking_makes_page_single_use():
+    page, session = make_page()
+    blocker = ResourceBlocker.from_options(make_options(block_resources=['websocket']))
+
+    await blocker.install(page)
+
+    page.route_web_socket.assert_awaited_once_with('**/*', blocker._handle_web_socket)
+    assert page._pixashot_reusable is False
+
+
+@pytest.mark.asyncio
+async def test_block_ads_uses_the_filter_engine():
+    from src.filter_engine import FilterEngine
+    engine = FilterEngine.from_lines(['||ads.example.com^'])
+    options = make_options()
+    options.block_ads = True
+    options.url = 'https://news.com/'
+    blocker = ResourceBlocker.from_options(options, engine)
+    ad, content = make_route('script'), make_route('script')
+    ad.request.url = 'https://ads.example.com/ad.js'
+    content.request.url = 'https://news.com/app.js'
+
+    await blocker._handle(ad)
+    await blocker._handle(content)
+
+    ad.abort.assert_awaited_once_with('blockedbyclient')
+    content.fallback.assert_awaited_once()
+    assert blocker.stats()['blocked_by_filter'] == 1
+
+
+@pytest.mark.asyncio
+async def test_block_ads_routes_the_page():
+    from src.filter_engine import FilterEngine
+    page, session = make_page()
+    options = make_options()
+    options.block_ads = True
+    options.url = 'https://news.com/'
+    blocker = ResourceBlocker.from_options(options, FilterEngine.from_lines(['||ads.example.com^']))
+
+    await blocker.install(page)
+
+    page.route.assert_awaited_once_with('**/*', blocker._handle)
+    page.context.new_cdp_session.assert_not_awaited()
+
+
+def test_block_ads_without_filter_lists_is_a_no_op():
+    options = make_options()
+    options.block_ads = True
+
+    assert ResourceBlocker.from_options(options, None) is None
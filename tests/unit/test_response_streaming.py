@@ -0,0 +1,38 @@
+import base64
+import json
+import pytest
+from src.response_streaming import base64_json_length, iter_base64_json, iter_bytes
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+@pytest.mark.parametrize('size', [0, 1, 2, 3, 1000, 3 * 16 * 1024 + 1])
+@pytest.mark.asyncio
+async def test_base64_json_matches_full_encoding(size):
+    data = bytes(i % 251 for i in range(size))
+
+    chunks = await collect(iter_base64_json(data, {'format': 'png'}, chunk_size=1024))
+    document = b''.join(chunks)
+
+    assert json.loads(document) == {'file': base64.b64encode(data).decode('ascii'), 'format': 'png'}
+    assert len(document) == base64_json_length(data, {'format': 'png'})
+
+
+@pytest.mark.asyncio
+async def test_base64_json_chunks_are_bounded():
+    data = b'x' * 100_000
+
+    chunks = await collect(iter_base64_json(data, {'format': 'png'}, chunk_size=3000))
+
+    assert max(len(chunk) for chunk in chunks) == 4000
+
+
+@pytest.mark.asyncio
+async def test_iter_bytes_splits_into_chunks():
+    data = b'0123456789'
+
+    chunks = await collect(iter_bytes(data, chunk_size=4))
+
+    assert chunks == [b'0123', b'4567', b'89']
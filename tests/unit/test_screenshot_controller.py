@@ -0,0 +1,61 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.controllers.screenshot_controller import ScreenshotController
+
+
+@pytest.fixture
+def page():
+    page = MagicMock()
+    page.evaluate = AsyncMock(return_value={'height': 5000, 'steps': 5, 'reason': 'bottom', 'elapsed': 120})
+    page.set_viewport_size = AsyncMock()
+    return page
+
+
+@pytest.fixture(autouse=True)
+def stable_page():
+    with patch('src.controllers.screenshot_controller.wait_for_page_stable', AsyncMock(return_value=True)):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_scroll_through_page_passes_budget(page):
+    controller = ScreenshotController()
+
+    result = await controller.scroll_through_page(page)
+
+    _, (name, _, args) = page.evaluate.call_args.args
+    assert name == 'lazy-load-scroller'
+    assert args['maxHeight'] == controller.SCROLL_MAX_HEIGHT
+    assert args['timeoutMs'] == controller.SCROLL_TIMEOUT_MS
+    assert result['reason'] == 'bottom'
+
+
+@pytest.mark.asyncio
+async def test_full_page_uses_scrolled_height(page):
+    controller = ScreenshotController()
+
+    height = await controller.prepare_for_full_page_screenshot(page, 1280)
+
+    assert height == 5000
+    page.set_viewport_size.assert_called_once_with({'width': 1280, 'height': 5000})
+
+
+@pytest.mark.asyncio
+async def test_full_page_tiled_keeps_viewport(page):
+    controller = ScreenshotController()
+
+    height = await controller.prepare_for_full_page_screenshot(page, 1280, 'tiled')
+
+    assert height == 5000
+    page.set_viewport_size.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_full_page_scroll_failure_falls_back_to_max_height(page):
+    controller = ScreenshotController()
+    page.evaluate.side_effect = Exception("Execution context was destroyed")
+
+    height = await controller.prepare_for_full_page_screenshot(page, 1280)
+
+    assert height == controller.MAX_VIEWPORT_HEIGHT
+    page.set_viewport_size.assert_called_once_with({'width': 1280, 'height': controller.MAX_VIEWPORT_HEIGHT})
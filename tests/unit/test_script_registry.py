@@ -0,0 +1,95 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.script_registry import INVOKE_SCRIPT, ScriptRegistry, minify
+
+
+@pytest.fixture
+def registry(tmp_path):
+    (tmp_path / 'greet.js').write_text("// File: greet.js\n\n(name) => {\n    // Say hello\n    return `hello ${name}`;\n}\n")
+    (tmp_path / 'notes.txt').write_text("not a script")
+    return ScriptRegistry(str(tmp_path))
+
+
+def test_minify_drops_comments_and_indentation():
+    assert minify("// header\n\n() => {\n    // comment\n    return 1;\n}\n") == "() => {\nreturn 1;\n}"
+
+
+def test_scripts_are_keyed_by_name_with_a_content_hash(registry):
+    script = registry.get('greet')
+
+    assert script.source.startswith('(name) =>')
+    assert len(script.hash) == 16
+    assert f'{{hash: "{script.hash}"}}' in registry.install_script
+    assert 'notes' not in registry.install_script
+
+
+def test_document_start_scripts_are_left_out_of_the_bundle(registry, tmp_path):
+    (tmp_path / 'consent-blocker.js').write_text("(rules) => rules\n")
+
+    assert registry.get('consent-blocker').source == '(rules) => rules'
+    assert 'consent-blocker' not in registry.install_script
+    assert 'scripts["greet"] = Object.assign((' in registry.install_script
+
+
+def make_page(*results):
+    page = MagicMock()
+    page.evaluate = AsyncMock(side_effect=list(results))
+    return page
+
+
+def navigate(page, frame):
+    for call in page.on.call_args_list:
+        if call.args[0] == 'framenavigated':
+            call.args[1](frame)
+
+
+@pytest.mark.asyncio
+async def test_first_invoke_in_a_document_installs_and_calls_at_once(registry):
+    page = make_page('hello you')
+    script = registry.get('greet')
+
+    assert await registry.invoke(page, 'greet', 'you') == 'hello you'
+    page.evaluate.assert_awaited_once_with(registry.install_script, ['greet', script.hash, 'you'])
+    assert registry.installs == 1
+
+
+@pytest.mark.asyncio
+async def test_later_invokes_call_the_installed_script(registry):
+    page = make_page('hello you', {'installed': True, 'value': 'hello again'})
+    await registry.invoke(page, 'greet', 'you')
+
+    assert await registry.invoke(page, 'greet', 'again') == 'hello again'
+    page.evaluate.assert_awaited_with(INVOKE_SCRIPT, ['greet', registry.get('greet').hash, 'again'])
+    assert registry.installs == 1
+
+
+@pytest.mark.asyncio
+async def test_main_frame_navigation_reinstalls_the_bundle(registry):
+    page = make_page('hello you', 'hello again', {'installed': True, 'value': 'hello there'})
+    await registry.invoke(page, 'greet', 'you')
+
+    navigate(page, MagicMock(parent_frame=None))
+    await registry.invoke(page, 'greet', 'again')
+    navigate(page, MagicMock(parent_frame=MagicMock()))
+    await registry.invoke(page, 'greet', 'there')
+
+    calls = [call.args[0] for call in page.evaluate.await_args_list]
+    assert calls == [registry.install_script, registry.install_script, INVOKE_SCRIPT]
+    assert registry.installs == 2
+
+
+@pytest.mark.asyncio
+async def test_invoke_reinstalls_a_missing_or_stale_bundle(registry):
+    page = make_page('hello you', {'installed': False}, 'hello again')
+    await registry.invoke(page, 'greet', 'you')
+
+    assert await registry.invoke(page, 'greet', 'again') == 'hello again'
+    page.evaluate.assert_awaited_with(registry.install_script, ['greet', registry.get('greet').hash, 'again'])
+    assert registry.installs == 2
+
+
+def test_bundled_scripts_load():
+    registry = ScriptRegistry()
+
+    for name in ('dark-mode', 'freeze-animations', 'lazy-load-scroller', 'page-stability', 'prepare-page', 'prevent-horizontal-overflow'):
+        assert registry.get(name).source
@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.blob_store import BlobStore
+from src.subresource_cache import SubresourceCache, freshness_lifetime
+
+
+@pytest.fixture
+def cache(tmp_path):
+    store = BlobStore(str(tmp_path), max_bytes=1024 * 1024)
+    yield SubresourceCache(store)
+    store.close()
+
+
+def make_route(url='https://cdn.example.com/app.css', resource_type='stylesheet', headers=None, method='GET'):
+    route = MagicMock()
+    route.request.url = url
+    route.request.method = method
+    route.request.resource_type = resource_type
+    route.request.headers = headers or {}
+    route.fallback = AsyncMock()
+    route.fulfill = AsyncMock()
+    response = MagicMock(status=200, headers={'Cache-Control': 'max-age=600', 'Content-Type': 'text/css',
+                                              'Content-Encoding': 'gzip'})
+    response.body = AsyncMock(return_value=b'body { color: red }')
+    route.fetch = AsyncMock(return_value=response)
+    return route
+
+
+async def settle():
+    # Let the background store finish
+    for _ in range(20):
+        await asyncio.sleep(0.01)
+
+
+def test_freshness_lifetime():
+    assert freshness_lifetime({'cache-control': 'public, max-age=600'}) == 600
+    assert freshness_lifetime({'cache-control': 'max-age=600, s-maxage=60'}) == 60
+    assert freshness_lifetime({'cache-control': 'max-age=600', 'age': '100'}) == 500
+    assert freshness_lifetime({'cache-control': 'private, max-age=600'}) is None
+    assert freshness_lifetime({'cache-control': 'no-cache'}) is None
+    assert freshness_lifetime({'cache-control': 'max-age=600', 'set-cookie': 'a=b'}) is None
+    assert freshness_lifetime({'expires': 'Thu, 01 Jan 1970 00:00:00 GMT'}) is None
+    assert freshness_lifetime({}) is None
+
+
+@pytest.mark.asyncio
+async def test_miss_then_hit(cache):
+    first = make_route()
+    await cache._handle(first)
+    await settle()
+
+    first.fetch.assert_awaited_once()
+    headers = first.fulfill.call_args.kwargs['headers']
+    assert 'content-encoding' not in headers
+
+    second = make_route()
+    await cache._handle(second)
+
+    second.fetch.assert_not_awaited()
+    second.fulfill.assert_awaited_once_with(status=200, headers=headers, body=b'body { color: red }')
+    assert (await cache.stats())['hits'] == 1
+    assert (await cache.stats())['misses'] == 1
+
+
+@pytest.mark.asyncio
+async def test_uncacheable_requests_fall_back(cache):
+    for route in (make_route(resource_type='document'), make_route(method='POST'),
+                  make_route(headers={'authorization': 'Bearer x'})):
+        await cache._handle(route)
+        route.fallback.assert_awaited_once()
+        route.fetch.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_vary_keys_on_request_headers(cache):
+    first = make_route(headers={'accept': 'text/css'})
+    first.fetch.return_value.headers['Vary'] = 'Accept'
+    await cache._handle(first)
+    await settle()
+
+    other_variant = make_route(headers={'accept': 'text/plain'})
+    await cache._handle(other_variant)
+    other_variant.fetch.assert_awaited_once()
+
+    same_variant = make_route(headers={'accept': 'text/css'})
+    await cache._handle(same_variant)
+    same_variant.fetch.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_responses_without_freshness_are_not_stored(cache):
+    first = make_route()
+    first.fetch.return_value.headers = {'Content-Type': 'text/css'}
+    await cache._handle(first)
+    await settle()
+
+    assert (await cache.stats())['stored'] == 0
+    assert cache.store.stats()['entries'] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_store_read_is_a_miss(cache):
+    cache.store.get = MagicMock(side_effect=OSError("disk gone"))
+    route = make_route()
+
+    await cache._handle(route)
+
+    route.fetch.assert_awaited_once()
+    route.fulfill.assert_awaited_once()
+    assert cache.misses == 1
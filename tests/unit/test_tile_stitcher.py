@@ -0,0 +1,119 @@
+import io
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from PIL import Image
+from src.tile_stitcher import TileStitcher
+from src.controllers.screenshot_controller import ScreenshotController
+
+
+def make_tile(width, height, color, mode='RGB'):
+    buffer = io.BytesIO()
+    Image.new(mode, (width, height), color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def test_tiles_are_stacked_in_order():
+    stitcher = TileStitcher(30, 'png')
+    stitcher.add(make_tile(10, 20, (255, 0, 0)), 20)
+    stitcher.add(make_tile(10, 10, (0, 0, 255)), 10)
+
+    image = Image.open(io.BytesIO(stitcher.encode()))
+
+    assert image.size == (10, 30)
+    assert image.getpixel((5, 19)) == (255, 0, 0)
+    assert image.getpixel((5, 20)) == (0, 0, 255)
+
+
+def test_device_scale_factor_is_taken_from_tiles():
+    stitcher = TileStitcher(15, 'png')
+    stitcher.add(make_tile(20, 20, (0, 255, 0)), 10)
+    stitcher.add(make_tile(20, 10, (0, 255, 0)), 5)
+
+    image = Image.open(io.BytesIO(stitcher.encode()))
+
+    assert image.size == (20, 30)
+
+
+def test_jpeg_drops_transparency():
+    stitcher = TileStitcher(10, 'jpeg', transparent=True)
+    stitcher.add(make_tile(10, 10, (0, 0, 0, 0), mode='RGBA'), 10)
+
+    image = Image.open(io.BytesIO(stitcher.encode(quality=80)))
+
+    assert image.format == 'JPEG'
+    assert image.mode == 'RGB'
+
+
+def test_encode_without_tiles_fails():
+    with pytest.raises(ValueError):
+        TileStitcher(10).encode()
+
+
+def test_use_tiles():
+    controller = ScreenshotController()
+
+    assert controller.use_tiles('tiled', 100)
+    assert not controller.use_tiles('viewport', controller.MAX_VIEWPORT_HEIGHT * 2)
+    assert not controller.use_tiles('auto', controller.MAX_VIEWPORT_HEIGHT)
+    assert controller.use_tiles('auto', controller.MAX_VIEWPORT_HEIGHT + 1)
+
+
+@pytest.mark.asyncio
+async def test_take_tiled_screenshot_captures_clip_regions():
+    controller = ScreenshotController()
+    controller.TILE_HEIGHT = 40
+    page = MagicMock()
+    page.viewport_size = {'width': 10, 'height': 40}
+
+    async def screenshot(**kwargs):
+        return make_tile(10, kwargs['clip']['height'], (kwargs['clip']['y'], 0, 0))
+
+    page.screenshot = AsyncMock(side_effect=screenshot)
+
+    data = await controller.take_tiled_screenshot(page, 100, {'format': 'png'})
+
+    clips = [call.kwargs['clip'] for call in page.screenshot.call_args_list]
+    assert clips == [
+        {'x': 0, 'y': 0, 'width': 10, 'height': 40},
+        {'x': 0, 'y': 40, 'width': 10, 'height': 40},
+        {'x': 0, 'y': 80, 'width': 10, 'height': 20},
+    ]
+    image = Image.open(io.BytesIO(data))
+    assert image.size == (10, 100)
+    assert image.getpixel((0, 85)) == (80, 0, 0)
+
+
+def test_tiled_height_limit_scales_with_pixel_density():
+    controller = ScreenshotController()
+    controller.MAX_TILED_PIXELS = 1920 * 32768
+
+    assert controller.tiled_height_limit(1920, 1, 'png') == 32768
+    assert controller.tiled_height_limit(1920, 2, 'png') == 8192
+    # WebP can't be taller than 16383 device pixels
+    assert controller.tiled_height_limit(1920, 2, 'webp') == 8191
+
+
+@pytest.mark.asyncio
+async def test_take_tiled_screenshot_truncates_high_dpr_pages_and_logs_it(caplog):
+    controller = ScreenshotController()
+    controller.TILE_HEIGHT = 40
+    controller.MAX_TILED_PIXELS = 10 * 50 * 2 ** 2
+    page = MagicMock()
+    page.url = 'https://example.com/long'
+    page.viewport_size = {'width': 10, 'height': 40}
+
+    async def screenshot(**kwargs):
+        clip = kwargs['clip']
+        return make_tile(clip['width'] * 2, clip['height'] * 2, (clip['y'], 0, 0))
+
+    page.screenshot = AsyncMock(side_effect=screenshot)
+
+    data = await controller.take_tiled_screenshot(page, 100, {'format': 'png', 'pixel_density': 2.0})
+
+    clips = [call.kwargs['clip'] for call in page.screenshot.call_args_list]
+    assert clips == [
+        {'x': 0, 'y': 0, 'width': 10, 'height': 40},
+        {'x': 0, 'y': 40, 'width': 10, 'height': 10},
+    ]
+    assert Image.open(io.BytesIO(data)).size == (20, 100)
+    assert 'https://example.com/long from 100px to 50px' in caplog.text